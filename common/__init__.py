@@ -0,0 +1,3 @@
+# common/ – kod współdzielony przez scraping/ i processing/.
+# Skrypty uruchamiane z własnego katalogu dopisują korzeń repo do sys.path:
+#   sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,103 @@
+# common/logs.py
+# Logowanie strukturalne dla gorących ścieżek (scrape_offer, worker geokodera):
+#   log = get_logger("scraper")
+#   log.info("✅ [%s] %s", oid, adres, extra=kv(offer_id=oid, stage="offer", duration_ms=812))
+# Pętla asyncio tylko wrzuca rekord do kolejki (QueueHandler); formatowanie i zapis
+# na terminal/do pliku robi QueueListener w osobnym wątku.
+#   terminal – krótka linia (domyślnie INFO, szczegóły oferty dopiero przy --log-level DEBUG),
+#   plik     – ../data/logs/<komponent>.jsonl, jeden JSON na rekord ze wszystkimi polami.
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from pathlib import Path
+from typing import Optional
+
+LOG_DIR = "../data/logs"
+ROOT_LOGGER = "apartament"
+CONSOLE_LEVEL = "INFO"
+FILE_LEVEL = "DEBUG"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def kv(**fields) -> dict:
+    """Pola strukturalne rekordu: extra=kv(offer_id=..., stage=..., duration_ms=...)."""
+    return {"fields": fields}
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name.removeprefix(ROOT_LOGGER + "."),
+            "msg": record.getMessage(),
+        }
+        out.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """HH:MM:SS + wiadomość; poziom tylko dla WARNING i wyżej."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        ts = datetime.datetime.fromtimestamp(record.created).strftime("%H:%M:%S")
+        level = f"[{record.levelname}] " if record.levelno >= logging.WARNING else ""
+        line = f"{ts} {level}{record.getMessage()}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def setup_logging(component: str, level: str = CONSOLE_LEVEL, log_dir: Optional[str] = LOG_DIR
+                  ) -> logging.handlers.QueueListener:
+    """Podpina kolejkę pod logger "apartament" i startuje wątek zapisu. Wołane raz na proces
+    (kolejne wywołanie zatrzymuje poprzedni listener – np. kilka runów w jednym benchmarku)."""
+    global _listener
+    shutdown_logging()
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(level.upper())
+    console.setFormatter(ConsoleFormatter())
+    handlers = [console]
+    if log_dir:
+        path = Path(log_dir) / f"{component}.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(path, encoding="utf-8")
+        file_handler.setLevel(FILE_LEVEL)
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers[:] = [logging.handlers.QueueHandler(q)]
+    root.setLevel(min(logging.getLevelName(level.upper()), logging.getLevelName(FILE_LEVEL))
+                  if log_dir else level.upper())
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Dopisuje resztę kolejki i zamyka pliki (też przez atexit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for h in _listener.handlers:
+            h.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
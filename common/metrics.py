@@ -0,0 +1,207 @@
+# common/metrics.py
+# Liczniki i histogramy czasów dla scrapera i geokodera (zamiast samych printów):
+#   with METRICS.timer("scrape_stage_seconds", stage="navigation"): await page.goto(...)
+#   METRICS.inc("geocode_cache_total", result="hit")
+# Eksport: jedna linia JSON na serię na koniec runu (../data/metrics/<komponent>.jsonl)
+# i opcjonalnie tekst Prometheusa pod http://host:port/metrics (--metrics-port).
+# Histogram ma stałe kubełki – pamięć nie rośnie z liczbą pomiarów.
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+METRICS_DIR = "../data/metrics"
+# górne granice kubełków w sekundach (od zapytań do cache po nawigację Chromium)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Dokładny kwantyl z interpolacją liniową (benchmarki – wszystkie próbki w pamięci);
+       histogram niżej daje tylko przybliżenie z kubełków."""
+    if not values:
+        return 0.0
+    s = sorted(values)
+    idx = (len(s) - 1) * q
+    lo, hi = int(idx), min(int(idx) + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (idx - lo)
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)     # ostatni = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Przybliżenie z kubełków (interpolacja liniowa wewnątrz kubełka)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else self.max
+                lo, hi = max(lo, self.min), min(hi, self.max)
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "min": round(self.min, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            "p50": round(self.quantile(0.50), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "buckets": {str(b): c for b, c in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+
+class Metrics:
+    def __init__(self, component: str = "app"):
+        self.component = component
+        self.started = time.time()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()      # serwer Prometheusa czyta z osobnego wątku
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = Histogram()
+            h.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Czas ściany bloku (także z await w środku); liczony również przy wyjątku."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def reset(self, component: Optional[str] = None):
+        with self._lock:
+            self.component = component or self.component
+            self.started = time.time()
+            self.counters.clear()
+            self.histograms.clear()
+
+    # --- eksport ---
+    def records(self) -> List[dict]:
+        run = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started))
+        out = []
+        with self._lock:
+            for (name, labels), v in sorted(self.counters.items()):
+                out.append({"run": run, "component": self.component, "type": "counter",
+                            "name": name, "labels": dict(labels), "value": v})
+            for (name, labels), h in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                out.append({"run": run, "component": self.component, "type": "histogram",
+                            "name": name, "labels": dict(labels), **h.to_dict()})
+        return out
+
+    def export_jsonl(self, out_dir: str = METRICS_DIR) -> Path:
+        """Dopisuje serie tego runu do <out_dir>/<komponent>.jsonl."""
+        path = Path(out_dir) / f"{self.component}.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            for r in self.records():
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        return path
+
+    def prometheus_text(self) -> str:
+        def fmt(labels: Labels, extra: Labels = ()) -> str:
+            items = labels + extra
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines: List[str] = []
+        typed = set()
+        with self._lock:
+            for (name, labels), v in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{fmt(labels)} {v}")
+            for (name, labels), h in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cum = 0
+                for b, c in zip(h.buckets + ("+Inf",), h.counts):
+                    cum += c
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', str(b)),))} {cum}")
+                lines.append(f"{name}_sum{fmt(labels)} {h.sum}")
+                lines.append(f"{name}_count{fmt(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Endpoint /metrics w wątku w tle (żyje tyle, co proces)."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def summary(self, name: str) -> List[str]:
+        """Krótkie linie do printu na koniec runu: seria → n, p50, p95."""
+        out = []
+        with self._lock:
+            items = sorted((k, h) for k, h in self.histograms.items() if k[0] == name)
+        for (_, labels), h in items:
+            tag = ",".join(v for _, v in labels) or name
+            out.append(f"{tag}: n={h.count} p50={h.quantile(0.5):.3f}s p95={h.quantile(0.95):.3f}s")
+        return out
+
+
+# domyślny rejestr procesu – scraper i geokoder to osobne procesy
+METRICS = Metrics()
@@ -0,0 +1,239 @@
+# common/profiling.py
+# Tryb --profile dla scrapera i geokodera:
+#   asyncio.run(run_profiled("scraper", main(...), enabled=args.profile))
+# W trakcie runu:
+#   - profiler funkcji: yappi (świadomy korutyn, zegar wall – czas korutyny razem z await),
+#     a bez yappi cProfile z zegarem CPU (time.process_time),
+#   - próbkowanie stosu wątku pętli co SAMPLE_MS → plik .folded (flamegraph.pl / speedscope);
+#     próbki, w których pętla czeka w select(), to czas bezczynności, reszta to CPU pętli,
+#   - loop.set_debug + slow_callback_duration: callbacki blokujące pętlę dłużej niż SLOW_CALLBACK_MS,
+#   - tracemalloc: snapshot co `every` ofert/adresów (tick()), różnice względem poprzedniego.
+# Wyniki: ../data/profile/<komponent>.{pstats,folded,json}
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import yappi
+except ImportError:  # opcjonalna zależność – bez niej cProfile (tylko CPU, bez czasu korutyn na await)
+    yappi = None
+
+PROFILE_DIR = "../data/profile"
+SNAPSHOT_EVERY = 50          # co ile tick() (ofert / adresów) snapshot tracemalloc
+SLOW_CALLBACK_MS = 100       # próg asyncio dla "Executing <Task…> took X seconds"
+SAMPLE_MS = 5                # okres próbkowania stosu
+TOP_N = 30
+TRACEMALLOC_FRAMES = 1       # raportujemy per linia – głębszy traceback tylko spowalnia snapshoty
+
+_active: Optional["Profiler"] = None
+
+
+def tick(n: int = 1):
+    """Wołane z gorącej pętli (oferta / adres) – bez aktywnego profilera nic nie robi."""
+    if _active is not None:
+        _active.tick(n)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """Łapie ostrzeżenia debug-mode asyncio o wolnych callbackach."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.items: List[dict] = []
+
+    def emit(self, record: logging.LogRecord):
+        msg = record.getMessage()
+        if msg.startswith("Executing ") and " took " in msg:
+            try:
+                seconds = float(msg.rsplit(" took ", 1)[1].split()[0])
+            except ValueError:
+                seconds = None
+            self.items.append({"callback": msg.split(" took ")[0][len("Executing "):][:300],
+                               "seconds": seconds})
+
+
+class Profiler:
+    def __init__(self, component: str, out_dir: str = PROFILE_DIR, every: int = SNAPSHOT_EVERY,
+                 slow_ms: float = SLOW_CALLBACK_MS, sample_ms: float = SAMPLE_MS):
+        self.component = component
+        self.out_dir = Path(out_dir)
+        self.every = max(1, every)
+        self.slow_ms = slow_ms
+        self.sample_ms = sample_ms
+        self.ticks = 0
+        self.samples: Counter = Counter()
+        self.snapshots: List[dict] = []
+        self._prev_snapshot = None
+        self._slow = _SlowCallbackHandler()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+
+    # --- start/stop ---
+    def start(self):
+        global _active
+        loop = asyncio.get_running_loop()
+        loop.set_debug(True)
+        loop.slow_callback_duration = self.slow_ms / 1000
+        logging.getLogger("asyncio").addHandler(self._slow)
+
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._t0, self._cpu0 = time.perf_counter(), time.process_time()
+        if yappi is not None:
+            yappi.set_clock_type("wall")
+            yappi.start(builtins=False)
+        else:
+            print("⚠️ Brak yappi (pip install yappi) – profil funkcji tylko z czasem CPU (cProfile), "
+                  "bez czasu korutyn na await")
+            self._cprofile = cProfile.Profile(time.process_time)
+            self._cprofile.enable()
+
+        self._loop_thread = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+        self._sampler.start()
+        _active = self
+
+    def stop(self) -> Dict[str, str]:
+        global _active
+        _active = None
+        wall, cpu = time.perf_counter() - self._t0, time.process_time() - self._cpu0
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self._pause(True)
+        self._snapshot()
+        tracemalloc.stop()
+        logging.getLogger("asyncio").removeHandler(self._slow)
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        base = self.out_dir / self.component
+        paths = {"pstats": str(base) + ".pstats", "folded": str(base) + ".folded",
+                 "report": str(base) + ".json"}
+        if yappi is not None:
+            yappi.stop()
+            stats = yappi.get_func_stats()
+            stats.save(paths["pstats"], type="pstat")
+            top = self._yappi_top(stats)
+            yappi.clear_stats()
+        else:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(paths["pstats"])
+            top = self._cprofile_top(pstats.Stats(self._cprofile))
+
+        with open(paths["folded"], "w", encoding="utf-8") as f:
+            for stack, n in self.samples.most_common():
+                f.write(f"{stack} {n}\n")
+
+        total = sum(self.samples.values()) or 1
+        idle = sum(n for s, n in self.samples.items() if s.rsplit(";", 1)[-1].startswith(("select ", "poll ")))
+        report = {
+            "component": self.component,
+            "profiler": "yappi (wall, coroutine-aware)" if yappi is not None else "cProfile (cpu)",
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu, 3),
+            "ticks": self.ticks,
+            "samples": sum(self.samples.values()),
+            "loop_busy_pct": round(100 * (total - idle) / total, 1),
+            "top_functions": top,
+            "top_stacks": [{"stack": s.split(";")[-3:], "samples": n} for s, n in self.samples.most_common(10)],
+            "slow_callbacks": sorted(self._slow.items, key=lambda x: -(x["seconds"] or 0))[:TOP_N],
+            "slow_callbacks_total": len(self._slow.items),
+            "memory": self.snapshots,
+        }
+        with open(paths["report"], "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return paths
+
+    # --- próbkowanie stosu ---
+    def _sample_loop(self):
+        period = self.sample_ms / 1000
+        while not self._stop.wait(period):
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    # --- pamięć ---
+    def tick(self, n: int = 1):
+        before = self.ticks // self.every
+        self.ticks += n
+        if self.ticks // self.every != before:
+            # sam snapshot (grupowanie w Pythonie) nie powinien zawyżać profilu funkcji
+            self._pause(True)
+            self._snapshot()
+            self._pause(False)
+
+    def _pause(self, paused: bool):
+        if yappi is not None:
+            yappi.stop() if paused else yappi.start(builtins=False)
+        elif self._cprofile is not None:
+            self._cprofile.disable() if paused else self._cprofile.enable()
+
+    def _snapshot(self):
+        if not tracemalloc.is_tracing():
+            return
+        t0 = time.perf_counter()
+        # bez filter_traces – filtr w Pythonie po wszystkich śladach blokował pętlę na sekundy
+        snap = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        entry = {"tick": self.ticks, "current_mb": round(current / 2**20, 2), "peak_mb": round(peak / 2**20, 2)}
+        if self._prev_snapshot is not None:
+            diffs = snap.compare_to(self._prev_snapshot, "lineno")[:10]
+            entry["growth"] = [{"where": str(d.traceback[0]), "size_kb": round(d.size / 1024, 1),
+                                "diff_kb": round(d.size_diff / 1024, 1)} for d in diffs]
+        else:
+            entry["top"] = [{"where": str(s.traceback[0]), "size_kb": round(s.size / 1024, 1)}
+                            for s in snap.statistics("lineno")[:10]]
+        self._prev_snapshot = snap
+        entry["snapshot_ms"] = round((time.perf_counter() - t0) * 1000, 1)   # widoczne też jako wolny callback
+        self.snapshots.append(entry)
+
+    # --- top funkcji ---
+    @staticmethod
+    def _yappi_top(stats) -> List[dict]:
+        stats.sort("ttot", "desc")
+        out = []
+        for s in list(stats)[:TOP_N]:
+            out.append({"func": f"{s.name} ({os.path.basename(s.module)}:{s.lineno})", "calls": s.ncall,
+                        "total_s": round(s.ttot, 4), "own_s": round(s.tsub, 4)})
+        return out
+
+    @staticmethod
+    def _cprofile_top(stats: pstats.Stats) -> List[dict]:
+        rows = sorted(stats.stats.items(), key=lambda kv: -kv[1][3])[:TOP_N]
+        return [{"func": f"{func} ({os.path.basename(file)}:{line})", "calls": nc,
+                 "total_s": round(ct, 4), "own_s": round(tt, 4)}
+                for (file, line, func), (cc, nc, tt, ct, callers) in rows]
+
+
+async def run_profiled(component: str, coro, enabled: bool = True, **kwargs):
+    """Uruchamia korutynę (np. main()) pod profilerem; bez `enabled` – po prostu ją await-uje."""
+    if not enabled:
+        return await coro
+    prof = Profiler(component, **kwargs)
+    prof.start()
+    print(f"🔬 Profilowanie: {prof.component} ({'yappi' if yappi is not None else 'cProfile'}, "
+          f"snapshot pamięci co {prof.every}, wolne callbacki > {prof.slow_ms:.0f} ms)")
+    try:
+        return await coro
+    finally:
+        paths = prof.stop()
+        print(f"🔬 Raport profilu → {paths['report']} (flamegraph: {paths['folded']}, pstats: {paths['pstats']})")
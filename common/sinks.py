@@ -0,0 +1,365 @@
+# common/sinks.py
+# Strumieniowy zapis wierszy do jednego lub kilku formatów naraz:
+#   csv     – jak dotąd (dopisywanie, nagłówek tylko dla nowego pliku),
+#   jsonl   – jeden JSON na linię,
+#   parquet – kolumnowy, typowany (pyarrow),
+#   sqlite  – tabela z kluczem id (INSERT OR REPLACE), WAL.
+# Wiersze buforowane do `batch_size`, flush = zapis + fsync – pamięć nie rośnie z długością runu.
+#
+# Tryb "a" (scraper): dopisywanie; parquet jako katalog part-*.parquet (czytany przez pd.read_parquet),
+#   każdy flush = osobny, ZAMKNIĘTY plik (ze stopką) – ubity scraper nie psuje katalogu.
+# Tryb "w" (pipeline): pełne nadpisanie przez plik tymczasowy + atomowy replace przy close().
+import csv
+import json
+import math
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SINK_KINDS = ("csv", "jsonl", "parquet", "sqlite")
+SINK_SUFFIX = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet", "sqlite": ".sqlite"}
+DEFAULT_BATCH = 50
+SQLITE_TABLE = "offers"
+
+# typy kolumn: "str" | "float" | "int"
+Schema = Dict[str, str]
+
+
+def schema_from_frame(df: pd.DataFrame) -> Schema:
+    out: Schema = {}
+    for col, dtype in df.dtypes.items():
+        if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+            out[str(col)] = "int"
+        elif pd.api.types.is_float_dtype(dtype):
+            out[str(col)] = "float"
+        else:
+            out[str(col)] = "str"
+    return out
+
+
+def _clean(value, kind: str):
+    """Ujednolica wartość do typu kolumny; NaN/''/None → None."""
+    if value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NA:
+        return None
+    if kind == "str":
+        return value if isinstance(value, str) else str(value)
+    if value == "":
+        return None
+    try:
+        return int(value) if kind == "int" else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class Sink:
+    def __init__(self, path: Path, schema: Schema, mode: str = "a", batch_size: int = DEFAULT_BATCH):
+        assert mode in ("a", "w")
+        self.path = Path(path)
+        self.schema = dict(schema)
+        self.fields = list(schema)
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self.buffer: List[dict] = []
+        self.written = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def target(self) -> Path:
+        """Plik, do którego faktycznie piszemy (w trybie "w" – tymczasowy)."""
+        return self.path.with_name(self.path.name + ".tmp") if self.mode == "w" else self.path
+
+    def write(self, rows: Iterable[dict]):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def write_frame(self, df: pd.DataFrame, chunk: int = 5000):
+        for start in range(0, len(df), chunk):
+            self.write(df.iloc[start:start + chunk].to_dict("records"))
+
+    def flush(self):
+        if not self.buffer:
+            return
+        rows = [{k: _clean(r.get(k), t) for k, t in self.schema.items()} for r in self.buffer]
+        self._write_rows(rows)
+        self.written += len(rows)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self._close()
+        if self.mode == "w" and self.target.exists():
+            os.replace(self.target, self.path)
+
+    def _write_rows(self, rows: List[dict]):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvSink(Sink):
+    def _write_rows(self, rows):
+        target = self.target
+        header = not target.exists() or target.stat().st_size == 0
+        with target.open("a", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=self.fields)
+            if header:
+                w.writeheader()
+            w.writerows(rows)
+            _fsync(f)
+
+    def _close(self):
+        # tryb "w" bez żadnego wiersza – i tak zostaw sam nagłówek
+        if self.mode == "w" and not self.target.exists():
+            with self.target.open("w", newline="", encoding="utf-8") as f:
+                csv.DictWriter(f, fieldnames=self.fields).writeheader()
+
+
+class JsonlSink(Sink):
+    def _write_rows(self, rows):
+        with self.target.open("a", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            _fsync(f)
+
+    def _close(self):
+        if self.mode == "w" and not self.target.exists():
+            self.target.touch()
+
+
+class ParquetSink(Sink):
+    ARROW_TYPES = {"str": "string", "float": "float64", "int": "int64"}
+
+    def __init__(self, path, schema, mode="a", batch_size=DEFAULT_BATCH):
+        super().__init__(path, schema, mode, batch_size)
+        self.arrow_schema = pa.schema([(k, getattr(pa, self.ARROW_TYPES[t])()) for k, t in self.schema.items()])
+        self.writer = None
+
+        self.parts = 0
+        self.run_id = f"{int(time.time())}-{os.getpid()}-{os.urandom(3).hex()}"   # unikalny per sink
+        if mode == "a":
+            self.path.mkdir(parents=True, exist_ok=True)
+            repair_parquet_dir(self.path)
+
+    @property
+    def target(self) -> Path:
+        if self.mode == "w":
+            return self.path.with_name(self.path.name + ".tmp")
+        # dopisywanie: katalog-zbiór, jeden plik na flush
+        return self.path / f"part-{self.run_id}-{self.parts:05d}.parquet"
+
+    def _write_rows(self, rows):
+        table = pa.Table.from_pylist(rows, schema=self.arrow_schema)
+        if self.mode == "a":
+            # plik roboczy z kropką (pd.read_parquet go pomija) → zamknięcie, fsync, atomowy rename
+            final = self.target
+            tmp = final.with_name("." + final.name + ".tmp")
+            pq.write_table(table, str(tmp))
+            with open(tmp, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp, final)
+            self.parts += 1
+            return
+        if self.writer is None:
+            self._file = self.target
+            self.writer = pq.ParquetWriter(str(self._file), self.arrow_schema)
+        self.writer.write_table(table)
+
+    def _close(self):
+        if self.writer is not None:
+            self.writer.close()
+            with open(self._file, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(self._file, self.path)
+        elif self.mode == "w":
+            pq.write_table(self.arrow_schema.empty_table(), str(self.path))
+
+
+def repair_parquet_dir(path: Path) -> List[Path]:
+    """Sprząta katalog part-*.parquet po ubitym procesie: usuwa niedokończone pliki robocze,
+       a część bez stopki (PAR1 na końcu) odkłada jako .part-*.broken
+       (kropka – pd.read_parquet pomija). Zwraca odłożone pliki."""
+    moved = []
+    for tmp in path.glob(".part-*.parquet.tmp"):
+        tmp.unlink()
+    for part in sorted(path.glob("part-*.parquet")):
+        with open(part, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            ok = f.tell() >= 8
+            if ok:
+                f.seek(-4, os.SEEK_END)
+                ok = f.read(4) == b"PAR1"
+        if not ok:
+            broken = part.with_name("." + part.name + ".broken")
+            os.replace(part, broken)
+            print(f"⚠️ {part}: brak stopki parquet (przerwany zapis) → {broken.name}")
+            moved.append(broken)
+    return moved
+
+
+class SqliteSink(Sink):
+    SQL_TYPES = {"str": "TEXT", "float": "REAL", "int": "INTEGER"}
+
+    def __init__(self, path, schema, mode="a", batch_size=DEFAULT_BATCH, table: str = SQLITE_TABLE):
+        super().__init__(path, schema, mode, batch_size)
+        self.table = table
+        # tryb "w": piszemy do tabeli roboczej, podmiana w jednej transakcji przy close()
+        self.work_table = f"{table}__new" if mode == "w" else table
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")     # commit = fsync
+        cols = ", ".join(f'"{k}" {self.SQL_TYPES[t]}{" PRIMARY KEY" if k == "id" else ""}'
+                         for k, t in self.schema.items())
+        with self.conn:
+            if mode == "w":
+                self.conn.execute(f'DROP TABLE IF EXISTS "{self.work_table}"')
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.work_table}" ({cols})')
+            existing = {r[1] for r in self.conn.execute(f'PRAGMA table_info("{self.work_table}")')}
+            for k, t in self.schema.items():
+                if k not in existing:       # nowe kolumny z pipeline'u (np. dist_*_m)
+                    self.conn.execute(f'ALTER TABLE "{self.work_table}" ADD COLUMN "{k}" {self.SQL_TYPES[t]}')
+        placeholders = ", ".join("?" for _ in self.fields)
+        names = ", ".join(f'"{k}"' for k in self.fields)
+        self.insert_sql = f'INSERT OR REPLACE INTO "{self.work_table}" ({names}) VALUES ({placeholders})'
+
+    @property
+    def target(self) -> Path:
+        return self.path           # transakcja zamiast pliku tymczasowego
+
+    def _write_rows(self, rows):
+        with self.conn:
+            self.conn.executemany(self.insert_sql, [tuple(r[k] for k in self.fields) for r in rows])
+
+    def _close(self):
+        if self.mode == "w":
+            with self.conn:
+                self.conn.execute(f'DROP TABLE IF EXISTS "{self.table}"')
+                self.conn.execute(f'ALTER TABLE "{self.work_table}" RENAME TO "{self.table}"')
+        self.conn.close()
+
+
+class MultiSink:
+    """Ten sam strumień wierszy do kilku sinków."""
+
+    def __init__(self, sinks: List[Sink]):
+        self.sinks = sinks
+
+    @property
+    def written(self) -> int:
+        return max((s.written for s in self.sinks), default=0)
+
+    @property
+    def pending(self) -> int:
+        return max((len(s.buffer) for s in self.sinks), default=0)
+
+    def write(self, rows: Iterable[dict]):
+        rows = list(rows)
+        for s in self.sinks:
+            s.write(rows)
+
+    def write_frame(self, df: pd.DataFrame):
+        for s in self.sinks:
+            s.write_frame(df)
+
+    def flush(self):
+        for s in self.sinks:
+            s.flush()
+
+    def close(self):
+        for s in self.sinks:
+            s.close()
+
+    def describe(self) -> str:
+        return ", ".join(str(s.path) for s in self.sinks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+SINK_CLASSES = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink, "sqlite": SqliteSink}
+
+
+def parse_kinds(spec: str) -> List[str]:
+    kinds = [k.strip().lower() for k in (spec or "csv").split(",") if k.strip()]
+    bad = [k for k in kinds if k not in SINK_KINDS]
+    if bad:
+        raise ValueError(f"nieznany sink: {', '.join(bad)} (dostępne: {', '.join(SINK_KINDS)})")
+    return kinds
+
+
+def sink_path(base: str, kind: str) -> Path:
+    """../data/otodom_results.csv + parquet → ../data/otodom_results.parquet"""
+    return Path(base).with_suffix(SINK_SUFFIX[kind])
+
+
+def open_sinks(spec: str, schema: Schema, base: str, mode: str = "a",
+               batch_size: int = DEFAULT_BATCH, table: Optional[str] = None) -> MultiSink:
+    sinks: List[Sink] = []
+    for kind in parse_kinds(spec):
+        cls = SINK_CLASSES[kind]
+        kw = {"table": table} if kind == "sqlite" and table else {}
+        sinks.append(cls(sink_path(base, kind), schema, mode=mode, batch_size=batch_size, **kw))
+    return MultiSink(sinks)
+
+
+SNAPSHOT_ORDER = ("parquet", "sqlite", "csv")   # typowane najpierw, CSV na końcu
+SNAPSHOT_SLACK_S = 5.0   # sinki jednego runu flushują po kolei – ich mtime różnią się o ułamki sekundy
+
+
+def _sink_mtime(path: Path) -> Optional[float]:
+    """Czas ostatniego zapisu: katalog parquet (tryb "a") → najnowszy part, sqlite → także plik -wal."""
+    if path.is_dir():
+        return max((p.stat().st_mtime for p in path.glob("part-*.parquet")), default=None)
+    files = [path, path.with_name(path.name + "-wal")]
+    return max((p.stat().st_mtime for p in files if p.is_file()), default=None)
+
+
+def snapshot_path(base: str) -> Path:
+    """Źródło do odczytu danych zapisanych pod `base` – zarówno pełnego snapshotu z pipeline'u (tryb "w"),
+       jak i wyników scrapera (tryb "a": katalog part-*.parquet, tabela sqlite, CSV).
+       Wygrywa pierwszy z SNAPSHOT_ORDER, który nie jest starszy od najświeższego sinka."""
+    found = {}
+    for kind in SNAPSHOT_ORDER:
+        path = sink_path(base, kind)
+        mtime = _sink_mtime(path) if path.exists() else None
+        if mtime is not None:
+            found[kind] = (path, mtime)
+    if not found:
+        return sink_path(base, "csv")
+    newest = max(mtime for _, mtime in found.values())
+    return next(path for kind, (path, mtime) in found.items() if mtime >= newest - SNAPSHOT_SLACK_S)
+
+
+def read_snapshot(base: str, table: str = SQLITE_TABLE) -> pd.DataFrame:
+    """Typowany odczyt z parquet/sqlite (bez parsowania tekstu), a gdy ich nie ma – CSV."""
+    path = snapshot_path(base)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    if path.suffix == ".sqlite":
+        conn = sqlite3.connect(str(path))
+        try:
+            return pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
+        finally:
+            conn.close()
+    return pd.read_csv(path)
@@ -0,0 +1,234 @@
+# processing/api_server.py
+# API zapytań dla mapy: zamiast wysyłać cały oferty_geo.csv do przeglądarki,
+# serwer trzyma kolumnowy indeks (offers_index.py) i zwraca tylko pasujące wiersze,
+# stronicowane i kompresowane gzipem.
+#
+#   GET /api/offers?price_min=&price_max=&area_min=&area_max=&district=&bbox=minLon,minLat,maxLon,maxLat
+#                   &coords=1&page=1&page_size=500
+#   GET /api/clusters?bbox=...&zoom=13&(te same filtry)  → klastry siatki + pojedyncze oferty
+#   GET /api/near?lat=&lon=|poi=agh &radius_m=1500|k=20  → oferty w promieniu / k najbliższych
+#   GET /api/pois
+#   GET /api/districts
+#   /api/offers i /api/clusters przyjmują też near=agh:1500,rynek:2000 (max. odległość od kilku POI naraz)
+# /src/... i /data/... serwuje static_server.py (ETag, Range, gzip/br, Cache-Control).
+import argparse
+import gzip
+import math
+from pathlib import Path
+from typing import Optional
+
+from flask import Flask, Response, jsonify, request
+
+from offers_index import MAX_CLUSTER_ZOOM, POINTS_ZOOM, OffersIndex
+from spatial_index import POI_FILE, load_pois
+from static_server import register_static
+
+try:
+    from waitress import serve as waitress_serve
+except ImportError:  # opcjonalna zależność – bez niej wielowątkowy serwer werkzeug
+    waitress_serve = None
+
+DATA_FILE = "../data/oferty_geo.csv"
+STATIC_ROOT = ".."          # korzeń repo: /src/index.html, /data/...
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_NEAREST_K = 20
+MAX_PAGE_SIZE = 2000
+GZIP_MIN_BYTES = 1024       # mniejszych odpowiedzi nie opłaca się kompresować
+GZIP_LEVEL = 6
+THREADS = 8
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _float_arg(name: str) -> Optional[float]:
+    raw = request.args.get(name, "").strip()
+    if not raw:
+        return None
+    try:
+        return float(raw.replace(",", "."))
+    except ValueError:
+        raise BadRequest(f"{name}: oczekiwano liczby, dostałem {raw!r}")
+
+
+def _int_arg(name: str, default: int, lo: int, hi: int) -> int:
+    raw = request.args.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return max(lo, min(hi, int(raw)))
+    except ValueError:
+        raise BadRequest(f"{name}: oczekiwano liczby całkowitej, dostałem {raw!r}")
+
+
+def _bbox_arg():
+    raw = request.args.get("bbox", "").strip()
+    if not raw:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(x) for x in raw.split(","))
+    except ValueError:
+        raise BadRequest("bbox: oczekiwano minLon,minLat,maxLon,maxLat")
+    return min(min_lon, max_lon), min(min_lat, max_lat), max(min_lon, max_lon), max(min_lat, max_lat)
+
+
+def _near_arg():
+    raw = request.args.get("near", "").strip()
+    if not raw:
+        return None
+    out = {}
+    try:
+        for part in raw.split(","):
+            key, radius = part.split(":")
+            out[key.strip()] = float(radius)
+    except ValueError:
+        raise BadRequest("near: oczekiwano poi:metry[,poi:metry...]")
+    return out
+
+
+def create_app(data_file: str = DATA_FILE) -> Flask:
+    app = Flask(__name__)
+    app.json.ensure_ascii = False
+    index = OffersIndex(data_file)
+    app.config["OFFERS_INDEX"] = index
+    pois = {p["key"]: p for p in load_pois(Path(POI_FILE))}
+    print(f"📦 Indeks ofert: {index.current().n} wierszy z {data_file}")
+
+    @app.before_request
+    def _reload():
+        if request.path.startswith("/api/") and index.maybe_reload():
+            print(f"🔄 Przeładowano indeks: {index.current().n} wierszy")
+
+    @app.errorhandler(BadRequest)
+    def _bad_request(e):
+        return jsonify({"error": str(e)}), 400
+
+    # każde żądanie bierze snapshot indeksu RAZ – przeładowanie w innym wątku go nie podmieni w połowie
+    def filtered(snap, coords_only: bool):
+        near = _near_arg()
+        unknown = sorted(set(near or ()) - set(snap.poi_dist))
+        if unknown:
+            raise BadRequest(f"near: nieznane POI (brak kolumn dist_*_m): {', '.join(unknown)}")
+        return snap.query(
+            price_min=_float_arg("price_min"),
+            price_max=_float_arg("price_max"),
+            area_min=_float_arg("area_min"),
+            area_max=_float_arg("area_max"),
+            district=request.args.get("district", "").strip() or None,
+            bbox=_bbox_arg(),
+            coords_only=coords_only,
+            near=near,
+        )
+
+    @app.get("/api/offers")
+    def offers():
+        snap = index.current()
+        idx = filtered(snap, request.args.get("coords") == "1")
+        page_size = _int_arg("page_size", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        total = int(idx.size)
+        pages = max(1, -(-total // page_size))
+        page = _int_arg("page", 1, 1, pages)
+        start = (page - 1) * page_size
+        return jsonify({
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "pages": pages,
+            "rows": snap.rows(idx[start:start + page_size]),
+        })
+
+    @app.get("/api/clusters")
+    def clusters():
+        zoom = _int_arg("zoom", 12, 0, 22)
+        snap = index.current()
+        idx = filtered(snap, True)
+        # przy dużym zoomie pojedyncze oferty – o ile w widoku nie ma ich absurdalnie dużo
+        if zoom >= POINTS_ZOOM and idx.size <= MAX_PAGE_SIZE:
+            return jsonify({"zoom": zoom, "total": int(idx.size), "clusters": [], "points": snap.rows(idx)})
+        groups = snap.clusters(idx, min(zoom, MAX_CLUSTER_ZOOM))
+        singles = [g.pop("row") for g in groups if g["count"] == 1]
+        for g in groups:
+            g.pop("row", None)
+        return jsonify({
+            "zoom": zoom,
+            "total": int(idx.size),
+            "clusters": [g for g in groups if g["count"] > 1],
+            "points": snap.rows(singles),
+        })
+
+    @app.get("/api/near")
+    def near():
+        poi = request.args.get("poi", "").strip()
+        if poi:
+            if poi not in pois:
+                raise BadRequest(f"poi: nieznany punkt {poi!r}")
+            lat, lon = pois[poi]["lat"], pois[poi]["lon"]
+        else:
+            lat, lon = _float_arg("lat"), _float_arg("lon")
+            if lat is None or lon is None:
+                raise BadRequest("podaj lat i lon albo poi")
+            # float() przepuszcza też 'nan' / 'inf'
+            if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+                raise BadRequest("lat/lon: oczekiwano współrzędnych (-90..90, -180..180)")
+        radius = _float_arg("radius_m")
+        if radius is not None and not (math.isfinite(radius) and radius > 0):
+            raise BadRequest("radius_m: oczekiwano dodatniej liczby metrów")
+        snap = index.current()
+        if radius is not None:
+            rows, dist = snap.spatial.within(lat, lon, radius)
+            rows, dist = rows[:MAX_PAGE_SIZE], dist[:MAX_PAGE_SIZE]
+        else:
+            rows, dist = snap.spatial.nearest(lat, lon, _int_arg("k", DEFAULT_NEAREST_K, 1, MAX_PAGE_SIZE))
+        out = snap.rows(rows)
+        for row, d in zip(out, dist):
+            row["distance_m"] = round(float(d), 1)
+        return jsonify({"lat": lat, "lon": lon, "radius_m": radius, "total": len(out), "rows": out})
+
+    @app.get("/api/pois")
+    def list_pois():
+        return jsonify(list(pois.values()))
+
+    @app.get("/api/districts")
+    def districts():
+        snap = index.current()
+        return jsonify({
+            "total_offers": snap.n,
+            "districts": [{"name": n, "offers": c} for n, c in snap.district_counts()],
+        })
+
+    register_static(app, STATIC_ROOT)
+
+    @app.after_request
+    def _gzip(resp: Response) -> Response:
+        if (resp.status_code != 200 or resp.direct_passthrough
+                or "Content-Encoding" in resp.headers
+                or "gzip" not in request.headers.get("Accept-Encoding", "").lower()
+                or not resp.mimetype == "application/json"):
+            return resp
+        body = resp.get_data()
+        if len(body) < GZIP_MIN_BYTES:
+            return resp
+        resp.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+        resp.headers["Content-Encoding"] = "gzip"
+        resp.headers["Content-Length"] = str(len(resp.get_data()))
+        resp.vary.add("Accept-Encoding")
+        return resp
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API zapytań o oferty (indeks kolumnowy)")
+    parser.add_argument("--data", default=DATA_FILE)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--threads", type=int, default=THREADS, help="wątki waitress")
+    args = parser.parse_args()
+    app = create_app(args.data)
+    if waitress_serve is not None:
+        print(f"🚀 waitress: http://{args.host}:{args.port}/ ({args.threads} wątków)")
+        waitress_serve(app, host=args.host, port=args.port, threads=args.threads)
+    else:
+        print(f"🚀 werkzeug (threaded): http://{args.host}:{args.port}/ – pip install waitress dla produkcji")
+        app.run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,131 @@
+# processing/data_bundle.py
+# Paczka danych dla frontu publikowana po każdym przebiegu pipeline'u:
+#   ../data/bundle/offers.<hash>.json (+ .gz, + .br)
+#   ../data/bundle/stats.<hash>.json  (+ .gz, + .br)
+#   ../data/bundle/manifest.json      – mały, jedyny plik rewalidowany przez przeglądarkę
+# Pliki z hashem w nazwie nigdy się nie zmieniają → przeglądarka może je cache'ować bez końca.
+#
+# offers.*.json jest kolumnowy: liczby już sparsowane (null = brak), unikalne ID,
+# bez ofert zdjętych z otodom, dzielnica jako kod do słownika.
+import argparse
+import datetime
+import gzip
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import brotli
+import numpy as np
+import pandas as pd
+
+from stats_aggregate import write_stats
+
+BUNDLE_DIR = "../data/bundle"
+MANIFEST_NAME = "manifest.json"
+BUNDLE_VERSION = 1
+KEEP_GENERATIONS = 3        # ile starszych wersji zostawić dla otwartych kart z poprzednim manifestem
+HASH_LEN = 12
+
+STRING_COLUMNS = ("id", "title", "ulica", "url", "alias_ids")
+NUMBER_COLUMNS = {          # kolumna → liczba miejsc po przecinku
+    "najem_pln": 0, "czynsz_adm_pln": 0, "metraz_m2": 2,
+    "lat": 7, "lon": 7, "fair_price_pln": 0, "deal_score": 1,
+}
+
+
+def _numbers(s: pd.Series, nd: int) -> List[Optional[float]]:
+    a = np.round(pd.to_numeric(s, errors="coerce").to_numpy(float), nd)
+    out = [None if np.isnan(v) else v for v in a.tolist()]
+    return [int(v) if v is not None and nd == 0 else v for v in out]
+
+
+def build_offers(df: pd.DataFrame) -> Dict[str, object]:
+    o = df.drop_duplicates("id")
+    if "status" in o.columns:
+        o = o[o["status"] != "delisted"]
+    cols: Dict[str, list] = {}
+    for c in STRING_COLUMNS:
+        cols[c] = [None if pd.isna(v) or v == "" else str(v) for v in o[c]] if c in o.columns else [None] * len(o)
+    for c, nd in NUMBER_COLUMNS.items():
+        cols[c] = _numbers(o[c], nd) if c in o.columns else [None] * len(o)
+    for c in [c for c in o.columns if c.startswith("dist_") and c.endswith("_m")]:
+        cols[c] = _numbers(o[c], 0)
+    # dzielnica: słownik + kody (-1 = brak) – kilkanaście nazw zamiast tysięcy powtórzeń
+    dz = o["dzielnica"].fillna("").astype(str)
+    names = sorted(n for n in dz.unique() if n)
+    pos = {n: i for i, n in enumerate(names)}
+    cols["dzielnica"] = [pos.get(n, -1) for n in dz]
+    return {
+        "version": BUNDLE_VERSION,
+        "count": len(o),
+        "dicts": {"dzielnica": names},
+        "columns": cols,
+    }
+
+
+def _encode(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _write_hashed(out_dir: Path, stem: str, body: bytes) -> Dict[str, object]:
+    digest = hashlib.sha256(body).hexdigest()[:HASH_LEN]
+    name = f"{stem}.{digest}.json"
+    path = out_dir / name
+    entry: Dict[str, object] = {"file": name, "hash": digest, "bytes": len(body)}
+    if path.exists():                # ta sama treść = ten sam plik; touch, żeby _prune go nie usunął
+        path.touch()
+    else:
+        path.write_bytes(body)
+    gz, br = out_dir / f"{name}.gz", out_dir / f"{name}.br"
+    if not gz.exists():
+        gz.write_bytes(gzip.compress(body, compresslevel=9, mtime=0))
+    if not br.exists():              # też dla paczek z czasów, gdy brotli było opcjonalne
+        br.write_bytes(brotli.compress(body, quality=11))
+    entry["gzip_bytes"] = gz.stat().st_size
+    entry["br_bytes"] = br.stat().st_size
+    return entry
+
+
+def _prune(out_dir: Path, stem: str, keep: int):
+    """Zostawia `keep` najnowszych wersji danego pliku (z ich .gz/.br)."""
+    versions = sorted(out_dir.glob(f"{stem}.*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in versions[keep:]:
+        for p in (old, old.with_name(old.name + ".gz"), old.with_name(old.name + ".br")):
+            p.unlink(missing_ok=True)
+
+
+def write_bundle(df: pd.DataFrame, stats: Optional[dict], out_dir: Path) -> Dict[str, object]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest: Dict[str, object] = {
+        "version": BUNDLE_VERSION,
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    offers = build_offers(df)
+    manifest["offers"] = dict(_write_hashed(out_dir, "offers", _encode(offers)), count=offers["count"])
+    if stats is not None:
+        manifest["stats"] = _write_hashed(out_dir, "stats", _encode(stats))
+    # manifest podmieniany atomowo – przeglądarka nigdy nie zobaczy połowy pliku
+    tmp = out_dir / f"{MANIFEST_NAME}.tmp"
+    tmp.write_bytes(_encode(manifest))
+    tmp.replace(out_dir / MANIFEST_NAME)
+    for stem in ("offers", "stats"):
+        _prune(out_dir, stem, KEEP_GENERATIONS)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Przelicza stats.json i publikuje skompresowaną paczkę danych dla frontu")
+    parser.add_argument("--data", default="../data/oferty_geo.csv")
+    parser.add_argument("--stats", default="../data/stats.json")
+    parser.add_argument("--out", default=BUNDLE_DIR)
+    args = parser.parse_args()
+
+    # bez geokodowania: stats.json i paczka przeliczone z gotowego oferty_geo.csv (oba poza gitem)
+    df = pd.read_csv(args.data)
+    stats = write_stats(df, Path(args.stats))
+    print(f"📈 Agregaty statystyk ({stats['total_offers']} ofert) → {args.stats}")
+    m = write_bundle(df, stats, Path(args.out))
+    o = m["offers"]
+    print(f"📦 {o['file']}: {o['count']} ofert, {o['bytes']} B → gzip {o['gzip_bytes']} B"
+          + (f", br {o['br_bytes']} B" if "br_bytes" in o else ""))
@@ -0,0 +1,159 @@
+# processing/deal_model.py
+# Model hedoniczny "ile POWINNO kosztować to mieszkanie" – najmniejsze kwadraty w NumPy:
+#   najem ~ 1 + metraż + odległość od centrum + czynsz adm. + dzielnica (one-hot)
+# deal_score = o ile % oferta jest tańsza od ceny godziwej (dodatni = okazja).
+#
+# Uczony od zera na bieżącej ramce przy każdym przebiegu (XᵀX/Xᵀy jednym mnożeniem – tysiące ofert
+# to milisekundy), więc zmiana ceny czy zdjęcie oferty od razu zmienia model. ../data/deal_model.json
+# to tylko zapis wyniku (współczynniki) do podglądu.
+import argparse
+import datetime
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from stats_aggregate import KRAKOW_CENTER, haversine_km
+
+MODEL_FILE = "../data/deal_model.json"
+MODEL_VERSION = 2
+BASE_FEATURES = ("intercept", "metraz_m2", "dist_center_km", "czynsz_adm_pln")
+RIDGE = 1.0                 # lekka regularyzacja – dzielnica z 1–2 ofertami nie wywraca układu
+MIN_FIT_ROWS = 30           # poniżej – brak wyceny (za mało danych)
+# wiersze do uczenia: realne mieszkania, bez literówek typu 35000 zł za kawalerkę
+FIT_RENT_RANGE = (500, 20000)
+FIT_AREA_RANGE = (10, 250)
+
+
+class DealModel:
+    def __init__(self, districts: Optional[List[str]] = None):
+        self.districts: List[str] = list(districts or [])
+        k = self.n_features
+        self.xtx = np.zeros((k, k))
+        self.xty = np.zeros(k)
+        self.n = 0
+        self.coef: Optional[np.ndarray] = None
+
+    @property
+    def features(self) -> List[str]:
+        return list(BASE_FEATURES) + [f"dz:{d}" for d in self.districts]
+
+    @property
+    def n_features(self) -> int:
+        return len(BASE_FEATURES) + len(self.districts)
+
+    # --- cechy ---
+    def design(self, df: pd.DataFrame) -> np.ndarray:
+        """Macierz cech (n × k) dla całego DataFrame jednym przebiegiem."""
+        area = pd.to_numeric(df["metraz_m2"], errors="coerce").to_numpy(float)
+        admin = np.nan_to_num(pd.to_numeric(df["czynsz_adm_pln"], errors="coerce").to_numpy(float))
+        lat = pd.to_numeric(df["lat"], errors="coerce").to_numpy(float)
+        lon = pd.to_numeric(df["lon"], errors="coerce").to_numpy(float)
+        dist = haversine_km(KRAKOW_CENTER[0], KRAKOW_CENTER[1], lat, lon)
+
+        x = np.zeros((len(df), self.n_features))
+        x[:, 0] = 1.0
+        x[:, 1] = area
+        x[:, 2] = dist
+        x[:, 3] = admin
+        pos = {d: i for i, d in enumerate(self.districts)}
+        dz = df["dzielnica"].fillna("").astype(str).to_numpy()
+        col = np.array([pos.get(d, -1) for d in dz], dtype=np.int64)
+        has = np.flatnonzero(col >= 0)
+        x[has, len(BASE_FEATURES) + col[has]] = 1.0
+        return x
+
+    @staticmethod
+    def trainable(df: pd.DataFrame) -> np.ndarray:
+        rent = pd.to_numeric(df["najem_pln"], errors="coerce").to_numpy(float)
+        area = pd.to_numeric(df["metraz_m2"], errors="coerce").to_numpy(float)
+        ok = (rent >= FIT_RENT_RANGE[0]) & (rent <= FIT_RENT_RANGE[1])
+        ok &= (area >= FIT_AREA_RANGE[0]) & (area <= FIT_AREA_RANGE[1])
+        ok &= pd.to_numeric(df["lat"], errors="coerce").notna().to_numpy()
+        ok &= pd.to_numeric(df["lon"], errors="coerce").notna().to_numpy()
+        if "status" in df.columns:
+            ok &= (df["status"] != "delisted").to_numpy()
+        return ok
+
+    # --- uczenie ---
+    def fit(self, df: pd.DataFrame) -> int:
+        """Uczy model od zera na wierszach `df` nadających się do uczenia. Zwraca ich liczbę."""
+        # to samo ID dwa razy w jednej ramce liczymy raz – z ostatnią (najnowszą) ceną
+        ok = self.trainable(df) & ~df["id"].astype(str).duplicated(keep="last").to_numpy()
+        part = df[ok]
+        self.districts = sorted(set(part["dzielnica"].dropna().astype(str)) - {""})
+        x = self.design(part)
+        y = pd.to_numeric(part["najem_pln"], errors="coerce").to_numpy(float)
+        self.xtx = x.T @ x
+        self.xty = x.T @ y
+        self.n = len(part)
+        self.solve()
+        return self.n
+
+    def solve(self):
+        if self.n < MIN_FIT_ROWS:
+            self.coef = None
+            return
+        penalty = np.full(self.n_features, RIDGE)
+        penalty[0] = 0.0                       # wyrazu wolnego nie karzemy
+        self.coef = np.linalg.solve(self.xtx + np.diag(penalty), self.xty)
+
+    # --- wycena ---
+    def score(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Dokleja fair_price_pln i deal_score (% poniżej ceny godziwej) dla wszystkich wierszy."""
+        if self.coef is None:
+            df["fair_price_pln"] = np.nan
+            df["deal_score"] = np.nan
+            return df
+        fair = self.design(df) @ self.coef
+        rent = pd.to_numeric(df["najem_pln"], errors="coerce").to_numpy(float)
+        area = pd.to_numeric(df["metraz_m2"], errors="coerce").to_numpy(float)
+        valid = (fair > 0) & (rent > 0) & (area > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = np.where(valid, (fair - rent) / fair * 100, np.nan)
+        df["fair_price_pln"] = np.where(valid, np.round(fair), np.nan)
+        df["deal_score"] = np.round(score, 1)
+        return df
+
+    # --- zapis ---
+    def to_json(self) -> dict:
+        return {
+            "version": MODEL_VERSION,
+            "updated": datetime.datetime.now().isoformat(timespec="seconds"),
+            "features": self.features,
+            "districts": self.districts,
+            "n": self.n,
+            "coef": None if self.coef is None else dict(zip(self.features, np.round(self.coef, 4).tolist())),
+        }
+
+
+def save_model(path: Path, model: DealModel):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(model.to_json(), f, ensure_ascii=False, indent=2)
+
+
+def apply_deal_model(df: pd.DataFrame, path: Path) -> Dict[str, object]:
+    """Uczy model na bieżących ofertach, zapisuje go i dokleja kolumny wyceny do df (w miejscu)."""
+    model = DealModel()
+    model.fit(df)
+    model.score(df)
+    save_model(path, model)
+    return {"n": model.n, "fitted": model.coef is not None}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wycena hedoniczna i deal_score dla oferty_geo.csv")
+    parser.add_argument("--data", default="../data/oferty_geo.csv")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    info = apply_deal_model(df, Path(MODEL_FILE))
+    df.to_csv(args.data, index=False, encoding="utf-8")
+    print(f"🧮 Model: uczony na {info['n']} ofertach → {MODEL_FILE}")
+    if info["fitted"]:
+        top = df.dropna(subset=["deal_score"]).drop_duplicates("id").nlargest(5, "deal_score")
+        for _, r in top.iterrows():
+            print(f"   💎 {r['deal_score']:+.1f}%  {r['najem_pln']:.0f} zł vs {r['fair_price_pln']:.0f} zł  {r['ulica']}")
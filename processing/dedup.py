@@ -0,0 +1,205 @@
+# processing/dedup.py
+# Łączenie duplikatów: to samo mieszkanie wystawione kilka razy pod różnymi ID
+# (agencja + właściciel, ponowne wystawienie). Etap po ekstrakcji, PRZED geokodowaniem:
+#   1) blocking – klucz (znormalizowana ulica, metraż, pasmo ceny); każdy wiersz trafia też
+#      do sąsiedniego kubełka metrażu i ceny, więc 49.6 m² / 1990 zł i 50 m² / 2010 zł się spotkają,
+#   2) porównanie par tylko wewnątrz bloków (cena, metraż, czynsz, podobieństwo tytułu); sama zgodność
+#      ceny i metrażu nie wystarcza – potrzebny wspólny tytuł albo ten sam numer domu, a różna liczba
+#      pokoi w tytułach wyklucza parę (bliźniacze mieszkania w jednym budynku),
+#   3) complete-link: pary od najpodobniejszej, grupy łączymy tylko gdy KAŻDA para między nimi
+#      jest duplikatem (bez łańcuchów A~B~C); zostaje jeden kanoniczny wiersz, reszta ID → alias_ids.
+import argparse
+import re
+import unicodedata
+from collections import defaultdict
+from itertools import combinations
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+AREA_BUCKET_M2 = 1.0
+PRICE_BAND_PLN = 250
+RENT_TOL = 0.05             # maks. względna różnica najmu
+AREA_TOL = 0.03             # maks. względna różnica metrażu
+ADMIN_TOL_PLN = 10          # czynsz adm. (gdy podany w obu) – inny czynsz = inny lokal, tolerujemy tylko zaokrąglenia
+MIN_SIMILARITY = 0.55
+MIN_TITLE_JACCARD = 0.3     # bez tego samego numeru domu tytuły muszą mieć tyle wspólnego
+ALIAS_SEP = ";"
+
+STREET_PREFIX_RE = re.compile(r"^(ul|al|aleja|os|osiedle|pl|plac|rondo)\.?\s+")
+HOUSE_NO_RE = re.compile(r"\s(\d+[a-z]?)(?:[/\s].*)?$")
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+ROOMS_RE = re.compile(r"\b([1-6])\s*-?\s*(?:pok|pokoj)")
+ROOM_WORDS = {"kawalerka": 1, "jednopokojowe": 1, "dwupokojowe": 2, "trzypokojowe": 3,
+              "czteropokojowe": 4, "pieciopokojowe": 5}
+STOPWORDS = {"mieszkanie", "wynajem", "wynajme", "do", "na", "w", "z", "i", "od", "m2", "pokoje",
+             "pokojowe", "pok", "krakow", "ul", "przy", "dla", "nowe", "mieszkania",
+             # marketing wklejany do tytułów każdej oferty – nie jest dowodem, że to ten sam lokal
+             "bez", "prowizji", "posrednikow", "pets", "friendly", "zaraz", "promo", "bezposrednio",
+             "wynajecia", "oferta", "okazja"}
+ESTATE_RE = re.compile(r"^\s*(os\.?|osiedle)\s", re.I)
+
+
+def _ascii(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s.replace("ł", "l").replace("Ł", "L"))
+    return "".join(c for c in s if not unicodedata.combining(c)).lower()
+
+
+def norm_street(address) -> Tuple[str, Optional[str]]:
+    """'ul. Józefa Dietla 12/4' → ('jozefa dietla', '12'). Pusty string, gdy brak adresu."""
+    if not isinstance(address, str):
+        return "", None
+    t = _ascii(address.split(",")[0]).strip()
+    t = STREET_PREFIX_RE.sub("", t)
+    m = HOUSE_NO_RE.search(t)
+    house = m.group(1) if m else None
+    if m:
+        t = t[:m.start()]
+    t = re.sub(r"[^a-z0-9 ]+", " ", t)
+    return re.sub(r"\s+", " ", t).strip(), house
+
+
+def title_tokens(title) -> Set[str]:
+    if not isinstance(title, str):
+        return set()
+    return {t for t in TOKEN_RE.findall(_ascii(title)) if t not in STOPWORDS and len(t) > 1}
+
+
+def title_rooms(title) -> Optional[int]:
+    """'2-pok. z ogródkiem' / '3 Pokojowe' / 'Kawalerka' → 2 / 3 / 1; brak → None."""
+    if not isinstance(title, str):
+        return None
+    t = _ascii(title)
+    m = ROOMS_RE.search(t)
+    if m:
+        return int(m.group(1))
+    return next((n for w, n in ROOM_WORDS.items() if w in t), None)
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def similarity(i: int, j: int, rent: np.ndarray, area: np.ndarray, admin: np.ndarray,
+               houses: List[Optional[str]], tokens: List[Set[str]], rooms: List[Optional[int]],
+               estate: List[bool], titles: List[str]) -> float:
+    """0..1; 0 = na pewno różne mieszkania (twarde warunki), powyżej MIN_SIMILARITY = duplikat."""
+    if houses[i] and houses[j] and houses[i] != houses[j]:
+        return 0.0
+    if rooms[i] and rooms[j] and rooms[i] != rooms[j]:
+        return 0.0
+    same_house = bool(houses[i] and houses[i] == houses[j])
+    jac = _jaccard(tokens[i], tokens[j])
+    if not same_house and jac < MIN_TITLE_JACCARD:
+        return 0.0                       # sama cena + metraż to jeszcze nie to samo mieszkanie
+    if not same_house and estate[i] and estate[j] and titles[i] != titles[j]:
+        return 0.0                       # osiedle bez numeru (np. Resi4Rent): identyczne lokale, różne ogłoszenia
+    rent_d = abs(rent[i] - rent[j]) / max(rent[i], rent[j])
+    area_d = abs(area[i] - area[j]) / max(area[i], area[j])
+    if rent_d > RENT_TOL or area_d > AREA_TOL:
+        return 0.0
+    if not (np.isnan(admin[i]) or np.isnan(admin[j])) and abs(admin[i] - admin[j]) > ADMIN_TOL_PLN:
+        return 0.0
+    return (0.35 * (1 - rent_d / RENT_TOL) + 0.35 * (1 - area_d / AREA_TOL)
+            + 0.3 * jac + (0.1 if same_house else 0.0))
+
+
+def dedup_offers(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Zwraca (df z jednym wierszem na mieszkanie + kolumna alias_ids, statystyki)."""
+    rows_in = len(df)
+    df = df.drop_duplicates("id").reset_index(drop=True)
+    n = len(df)
+    rent = pd.to_numeric(df["najem_pln"], errors="coerce").to_numpy(float)
+    area = pd.to_numeric(df["metraz_m2"], errors="coerce").to_numpy(float)
+    admin = pd.to_numeric(df["czynsz_adm_pln"], errors="coerce").to_numpy(float)
+    streets = [norm_street(a) for a in df["ulica"]]
+    houses = [h for _, h in streets]
+    tokens = [title_tokens(t) for t in df["title"]]
+    rooms = [title_rooms(t) for t in df["title"]]
+    titles = [_ascii(t).strip() if isinstance(t, str) else "" for t in df["title"]]
+    estate = [bool(isinstance(a, str) and ESTATE_RE.match(a)) for a in df["ulica"]]
+
+    # --- blocking ---
+    blocks: Dict[tuple, List[int]] = defaultdict(list)
+    usable = (rent > 0) & (area > 0)
+    for i in np.flatnonzero(usable):
+        street = streets[i][0]
+        if not street:
+            continue
+        a = int(area[i] // AREA_BUCKET_M2)
+        p = int(rent[i] // PRICE_BAND_PLN)
+        for da in (0, 1):
+            for dp in (0, 1):
+                blocks[(street, a + da, p + dp)].append(int(i))
+
+    # --- pary w blokach ---
+    seen_pairs: Set[Tuple[int, int]] = set()
+    scores: Dict[Tuple[int, int], float] = {}
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        for i, j in combinations(members, 2):
+            if (i, j) in seen_pairs:
+                continue
+            seen_pairs.add((i, j))
+            sc = similarity(i, j, rent, area, admin, houses, tokens, rooms, estate, titles)
+            if sc >= MIN_SIMILARITY:
+                scores[(i, j)] = sc
+
+    # --- complete-link: od najpodobniejszej pary, łączymy tylko gdy wszystkie pary między grupami pasują ---
+    cluster_of = list(range(n))
+    groups: Dict[int, List[int]] = {i: [i] for i in range(n)}
+
+    def _dup(a: int, b: int) -> bool:
+        return (min(a, b), max(a, b)) in scores
+
+    for (i, j), _ in sorted(scores.items(), key=lambda kv: -kv[1]):
+        ci, cj = cluster_of[i], cluster_of[j]
+        if ci == cj or not all(_dup(a, b) for a in groups[ci] for b in groups[cj]):
+            continue
+        for b in groups[cj]:
+            cluster_of[b] = ci
+        groups[ci].extend(groups.pop(cj))
+
+    # kanoniczny = najpełniejszy wiersz (najmniej braków), przy remisie – pierwszy w pliku
+    filled = df.notna().sum(axis=1).to_numpy()
+    keep, aliases = [], {}
+    ids = df["id"].astype(str).to_numpy()
+    for members in groups.values():
+        canon = max(members, key=lambda i: (filled[i], -i))
+        keep.append(canon)
+        others = [ids[i] for i in members if i != canon]
+        if others:
+            aliases[canon] = ALIAS_SEP.join(others)
+
+    keep.sort()
+    out = df.iloc[keep].copy()
+    out["alias_ids"] = [aliases.get(i) for i in keep]
+    info = {
+        "rows_in": rows_in,
+        "unique_ids": n,
+        "rows_out": len(out),
+        "merged": n - len(out),
+        "groups_with_aliases": len(aliases),
+        "blocks": sum(1 for m in blocks.values() if len(m) > 1),
+        "pairs_compared": len(seen_pairs),
+    }
+    return out.reset_index(drop=True), info
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Raport duplikatów w wynikach scrapera (bez zapisu)")
+    parser.add_argument("--input", default="../data/otodom_results.csv")
+    parser.add_argument("--show", type=int, default=10, help="ile grup pokazać")
+    args = parser.parse_args()
+
+    src = pd.read_csv(args.input)
+    out, info = dedup_offers(src)
+    print("🧬 DEDUPLIKACJA:")
+    for k, v in info.items():
+        print(f"   • {k}: {v}")
+    for _, r in out[out["alias_ids"].notna()].head(args.show).iterrows():
+        print(f"   🔗 {r['id']} ({r['ulica']}, {r['metraz_m2']} m², {r['najem_pln']} zł) ← {r['alias_ids']}")
@@ -1,21 +1,41 @@
 # geo_processing.py  (poprawiona wersja)
+import argparse
 import asyncio
 import aiohttp
 import pandas as pd
 import json
 import re
+import sys
 import time
 import datetime
 from pathlib import Path
 from typing import Dict, Optional, Tuple, List
 
-INPUT_FILE   = "../data/otodom_results.csv"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.logs import LOG_DIR, get_logger, kv, setup_logging
+from common.metrics import METRICS, METRICS_DIR
+from common.profiling import PROFILE_DIR, SNAPSHOT_EVERY, run_profiled, tick as profile_tick
+from common.sinks import SINK_KINDS, open_sinks, read_snapshot, schema_from_frame, snapshot_path
+from data_bundle import BUNDLE_DIR, write_bundle
+from dedup import dedup_offers
+from deal_model import MODEL_FILE as DEAL_MODEL_FILE, apply_deal_model
+from spatial_index import POI_FILE, add_poi_distances, load_pois
+from stats_aggregate import write_stats
+from street_lexicon import STREETS_FILE, StreetLexicon
+
+INPUT_FILE   = "../data/otodom_results.csv"   # czytany najświeższy z .parquet / .sqlite / .csv (--sinks scrapera)
 OUTPUT_FILE  = "../data/oferty_geo.csv"
 CACHE_FILE   = "../data/geocode_cache.json"
+LIVENESS_FILE = "../data/liveness.json"  # z scraping/liveness.py (opcjonalny)
+STATS_FILE   = "../data/stats.json"       # agregaty dla statistics.html
+OUTPUT_SINKS = "csv"                      # np. "csv,parquet,sqlite" – obok OUTPUT_FILE
+SINK_BATCH   = 2000
+LOG_LEVEL    = "INFO"                     # terminal; pełne rekordy → ../data/logs/geocoder.jsonl
 
 # Publiczny Nominatim – nie przekraczamy 1 rps (podnieś tylko dla prywatnego/komercyjnego)
 MAX_RPS      = 1.0
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+MAX_5XX_RETRIES = 3
 CITY = "Kraków"
 COUNTRY = "Polska"
 
@@ -140,6 +160,7 @@ def make_cache_entry(item: dict, dz: Optional[str], method: str, bounded: Option
         "addresstype": item.get("addresstype"),
         "class": item.get("class"),
         "type": item.get("type"),
+        "road": (item.get("address") or {}).get("road"),   # nazwa ulicy wg Nominatim → street_lexicon
         "query": query,
         "method": method,
         "bounded": bool(bounded) if bounded is not None else None,
@@ -239,16 +260,43 @@ class RateLimiter:
                 await asyncio.sleep(self.min_interval - delta)
             self._last = time.monotonic()
 
+def attach_liveness(df: pd.DataFrame, path: Path) -> pd.DataFrame:
+    """Dokleja first_seen/last_seen/status z przebiegu liveness (brak pliku → kolumny puste)."""
+    offers = {}
+    if path.exists():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                offers = json.load(f).get("offers", {})
+        except (json.JSONDecodeError, ValueError, AttributeError) as e:
+            print(f"⚠️ Błąd w pliku liveness {path}: {e}")
+
+    def _date(ts):
+        return datetime.date.fromtimestamp(ts).isoformat() if ts else None
+
+    ids = df["id"].astype(str)
+    df["first_seen"] = ids.map(lambda i: _date(offers.get(i, {}).get("first_seen")))
+    df["last_seen"] = ids.map(lambda i: _date(offers.get(i, {}).get("last_seen")))
+    df["status"] = ids.map(lambda i: offers.get(i, {}).get("status"))
+    return df
+
 # ---------------- geocoding core ----------------
 
-async def fetch_json(session: aiohttp.ClientSession, params: dict, limiter: RateLimiter) -> list:
+async def fetch_json(session: aiohttp.ClientSession, params: dict, limiter: RateLimiter,
+                     attempt: int = 0) -> list:
     await limiter.wait()
     headers = {"User-Agent": "OtodomScraper/1.0 (kontakt@example.com)", "Accept-Language": "pl"}
+    t0 = time.perf_counter()
     async with session.get(NOMINATIM_URL, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=25)) as resp:
+        METRICS.observe("nominatim_request_seconds", time.perf_counter() - t0)
+        METRICS.inc("nominatim_requests_total", status=resp.status)
         if resp.status == 429:
             # prosty backoff
             await asyncio.sleep(2.0)
-            return await fetch_json(session, params, limiter)
+            return await fetch_json(session, params, limiter, attempt)
+        if resp.status >= 500 and attempt < MAX_5XX_RETRIES:
+            # chwilowa awaria serwera – nie wywracaj całego run() przez jeden adres
+            await asyncio.sleep(2.0 * (attempt + 1))
+            return await fetch_json(session, params, limiter, attempt + 1)
         resp.raise_for_status()
         return await resp.json()
 
@@ -287,100 +335,99 @@ async def try_q(session, limiter, q: str,
         return it, dz  # zwracamy cały item + dzielnicę
     return None
 
-async def geocode_one(session: aiohttp.ClientSession, limiter: RateLimiter, raw_address: str, cache: dict
-                     ) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+# kolejność prób: (metoda, viewbox, bounded) – od najcelniejszej
+STRATEGIES_WITH_NUMBER = (
+    ("structured", True, True),     # a) structured + viewbox + bounded=1 (najcelniej)
+    ("q", True, True),              # b) q + viewbox + bounded=1
+    ("structured", True, False),    # c) structured + viewbox (bounded=0)
+    ("q", False, None),             # d) q bez viewboxu (globalne)
+)
+STRATEGIES_NO_NUMBER = (
+    ("q", True, False),             # a) q + viewbox (bounded=0) – bias na Kraków
+    ("q", False, None),             # b) q bez viewboxu – globalnie
+    ("structured", True, False),    # c) structured + viewbox (bounded=0)
+)
+
+
+def strategy_name(method: str, viewbox: bool, bounded: Optional[bool]) -> str:
+    """("structured", True, True) → "structured+vb+bounded" (etykieta metryk)."""
+    return method + ("+vb" if viewbox else "") + ("+bounded" if bounded else "")
+
+
+def plan_attempts(strategies, variants: List[str], lexicon_hit: bool) -> List[Tuple[tuple, int, str]]:
+    """[(strategia, nr_wariantu, wariant)] w kolejności prób. Trafienie w leksykonie (wariant 0 to
+       forma z cache) idzie przez WSZYSTKIE strategie, zanim spróbujemy innych odmian."""
+    if lexicon_hit:
+        return [(s, 0, variants[0]) for s in strategies] + \
+               [(s, vi, v) for s in strategies for vi, v in enumerate(variants) if vi]
+    return [(s, vi, v) for s in strategies for vi, v in enumerate(variants)]
+
+
+async def geocode_one(session: aiohttp.ClientSession, limiter: RateLimiter, raw_address: str, cache: dict,
+                      lexicon: Optional[StreetLexicon] = None
+                      ) -> Tuple[Optional[float], Optional[float], Optional[str]]:
     street = split_street(apply_corrections(raw_address))
     variants = gen_street_variants(street)
-    with_number = has_housenumber(street)
-
-    if with_number:
-        # a) structured + viewbox + bounded=1 (najcelniej)
-        for v in variants:
-            result = await try_structured(session, limiter, v, True, True)
-            if result:
-                it, dz = result
-                if inside_viewbox(float(it["lat"]), float(it["lon"])):
-                    entry = make_cache_entry(it, dz, "structured", True, True, f"{v}, {CITY}")
-                    cache[norm_key(raw_address)] = entry
-                    return float(it["lat"]), float(it["lon"]), dz
-        # b) q + viewbox + bounded=1
-        for v in variants:
-            result = await try_q(session, limiter, f"{v}, {CITY}", True, True)
-            if result:
-                it, dz = result
-                if inside_viewbox(float(it["lat"]), float(it["lon"])):
-                    entry = make_cache_entry(it, dz, "q", True, True, f"{v}, {CITY}")
-                    cache[norm_key(raw_address)] = entry
-                    return float(it["lat"]), float(it["lon"]), dz
-        # c) structured + viewbox (bounded=0)
-        for v in variants:
-            result = await try_structured(session, limiter, v, True, False)
-            if result:
-                it, dz = result
-                if inside_viewbox(float(it["lat"]), float(it["lon"])):
-                    entry = make_cache_entry(it, dz, "structured", False, True, f"{v}, {CITY}")
-                    cache[norm_key(raw_address)] = entry
-                    return float(it["lat"]), float(it["lon"]), dz
-        # d) q bez viewboxu (globalne)
-        for v in variants:
-            result = await try_q(session, limiter, f"{v}, {CITY}", False, None)
-            if result:
-                it, dz = result
-                if inside_viewbox(float(it["lat"]), float(it["lon"])):
-                    entry = make_cache_entry(it, dz, "q", None, False, f"{v}, {CITY}")
-                    cache[norm_key(raw_address)] = entry
-                    return float(it["lat"]), float(it["lon"]), dz
-        # Negatywny cache
-        cache[norm_key(raw_address)] = {"lat": None, "lon": None, "dz": None, "ts": int(time.time())}
-        return None, None, None
-
-    # bez numeru:
-    # a) q + viewbox (bounded=0) – bias na Kraków
-    for v in variants:
-        result = await try_q(session, limiter, f"{v}, {CITY}", True, False)
-        if result:
-            it, dz = result
-            if inside_viewbox(float(it["lat"]), float(it["lon"])):
-                entry = make_cache_entry(it, dz, "q", False, True, f"{v}, {CITY}")
-                cache[norm_key(raw_address)] = entry
-                return float(it["lat"]), float(it["lon"]), dz
-    # b) q bez viewboxu – globalnie
-    for v in variants:
-        result = await try_q(session, limiter, f"{v}, {CITY}", False, None)
-        if result:
+    hit = False
+    if lexicon is not None:
+        variants, hit = lexicon.rank(street, variants)
+        METRICS.inc("geocode_lexicon_total", result="hit" if hit else "rank")
+    strategies = STRATEGIES_WITH_NUMBER if has_housenumber(street) else STRATEGIES_NO_NUMBER
+
+    with METRICS.timer("geocode_address_seconds"):
+        for (method, viewbox, bounded), vi, v in plan_attempts(strategies, variants, hit):
+            name = strategy_name(method, viewbox, bounded)
+            # variant=0 to pierwszy wg leksykonu (bez leksykonu – oryginał), 1+ to kolejne odmiany
+            with METRICS.timer("geocode_attempt_seconds", strategy=name, variant=vi if vi < 2 else "2+"):
+                if method == "structured":
+                    result = await try_structured(session, limiter, v, viewbox, bounded)
+                else:
+                    result = await try_q(session, limiter, f"{v}, {CITY}", viewbox, bounded)
+            if not result:
+                METRICS.inc("geocode_attempts_total", strategy=name, result="empty")
+                continue
             it, dz = result
-            if inside_viewbox(float(it["lat"]), float(it["lon"])):
-                entry = make_cache_entry(it, dz, "q", None, False, f"{v}, {CITY}")
-                cache[norm_key(raw_address)] = entry
-                return float(it["lat"]), float(it["lon"]), dz
-    # c) structured + viewbox (bounded=0)
-    for v in variants:
-        result = await try_structured(session, limiter, v, True, False)
-        if result:
-            it, dz = result
-            if inside_viewbox(float(it["lat"]), float(it["lon"])):
-                entry = make_cache_entry(it, dz, "structured", False, True, f"{v}, {CITY}")
-                cache[norm_key(raw_address)] = entry
-                return float(it["lat"]), float(it["lon"]), dz
+            if not inside_viewbox(float(it["lat"]), float(it["lon"])):
+                METRICS.inc("geocode_attempts_total", strategy=name, result="out_of_box")
+                continue
+            METRICS.inc("geocode_attempts_total", strategy=name, result="hit")
+            METRICS.inc("geocode_results_total", strategy=name, variant=vi if vi < 2 else "2+")
+            entry = make_cache_entry(it, dz, method, bounded, viewbox, f"{v}, {CITY}")
+            cache[norm_key(raw_address)] = entry
+            if lexicon is not None:
+                lexicon.learn(street, entry["road"] or v)   # kolejne adresy w tym runie już skorzystają
+            return float(it["lat"]), float(it["lon"]), dz
 
     # Negatywny cache
+    METRICS.inc("geocode_results_total", strategy="none", variant="-")
     cache[norm_key(raw_address)] = {"lat": None, "lon": None, "dz": None, "ts": int(time.time())}
     return None, None, None
 
 # ---------------- main ----------------
-async def run():
+log = get_logger("geocoder")
+
+
+async def run(metrics_port: Optional[int] = None):
+    setup_logging("geocoder", LOG_LEVEL, LOG_DIR)
+    METRICS.reset("geocoder")
+    if metrics_port:
+        METRICS.serve_prometheus(metrics_port)
+        print(f"📈 Metryki: http://127.0.0.1:{metrics_port}/metrics")
     print(f"🚀 Geo Processing - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"📁 Input: {INPUT_FILE}")
     print(f"📁 Output: {OUTPUT_FILE}")
     print(f"📁 Cache: {CACHE_FILE}")
     
-    in_path = Path(INPUT_FILE)
+    in_path = snapshot_path(INPUT_FILE)
     out_path = Path(OUTPUT_FILE)
     cache_path = Path(CACHE_FILE)
 
     print(f"\n📖 Wczytuję dane z {in_path}...")
-    df = pd.read_csv(in_path)
+    df = read_snapshot(INPUT_FILE)
     print(f"✅ Wczytano {len(df)} rekordów")
+    df, dd = dedup_offers(df)
+    print(f"🧬 Duplikaty: {dd['merged']} ogłoszeń scalonych w {dd['groups_with_aliases']} mieszkań "
+          f"({dd['pairs_compared']} porównań par) → zostaje {dd['rows_out']}")
     for col in ("lat", "lon", "dzielnica", "metraz_m2"):
         if col not in df.columns:
             df[col] = None
@@ -421,16 +468,22 @@ async def run():
         
         # Sprawdź negatywny cache
         if is_fresh_neg(e):
-            print(f"⏭️ Pomijam {a} (negatywny cache)")
+            log.debug("⏭️ Pomijam %s (negatywny cache)", a, extra=kv(stage="cache", address=a))
+            METRICS.inc("geocode_cache_total", result="negative")
             continue
             
         if _is_valid_cached(e, require_house=with_number):
             results[a] = (e["lat"], e["lon"], e.get("dz"))
+            METRICS.inc("geocode_cache_total", result="hit")
         else:
             need_fetch.append(a)
+            METRICS.inc("geocode_cache_total", result="miss" if not e else "stale")
     print(f"⚡ Z cache: {len(results)} | Do pobrania: {len(need_fetch)}")
 
     if need_fetch:
+        lexicon = StreetLexicon.from_cache(cache, Path(STREETS_FILE))
+        print(f"📚 Leksykon ulic: {len(lexicon.forms)} form odmienionych, {len(lexicon.names)} nazw, "
+              f"{len(lexicon.rules)} reguł końcówek")
         print(f"\n🚀 Rozpoczynam geokodowanie {len(need_fetch)} adresów...")
         start_time = time.time()
         
@@ -448,12 +501,17 @@ async def run():
             async def worker(addr: str):
                 nonlocal processed
                 async with sem:
-                    lat, lon, dz = await geocode_one(session, limiter, addr, cache)
+                    t0 = time.perf_counter()
+                    lat, lon, dz = await geocode_one(session, limiter, addr, cache, lexicon)
                     results[addr] = (lat, lon, dz)
                     
                     processed += 1
+                    profile_tick()
+                    fields = kv(stage="geocode", address=addr, lat=lat, lon=lon, dzielnica=dz,
+                                duration_ms=round((time.perf_counter() - t0) * 1000, 1),
+                                done=processed, total=total_to_process)
                     
-                    # Print co 10 rekordów
+                    # na terminal co 10 rekordów, do pliku JSONL każdy
                     if processed % 10 == 0:
                         elapsed = time.time() - start_time
                         avg_time_per_record = elapsed / processed
@@ -461,17 +519,20 @@ async def run():
                         eta_seconds = remaining * avg_time_per_record
                         eta = datetime.datetime.now() + datetime.timedelta(seconds=eta_seconds)
                         
-                        print(f"[{processed}/{total_to_process}] ⏱️ {elapsed:.1f}s | "
-                              f"Średnio: {avg_time_per_record:.1f}s/rekord | "
-                              f"ETA: {eta.strftime('%H:%M:%S')} | "
-                              f"→ {addr[:30]}{'...' if len(addr) > 30 else ''} → {lat},{lon} | {dz}")
+                        log.info("[%d/%d] ⏱️ %.1fs | Średnio: %.1fs/rekord | ETA: %s | → %s → %s,%s | %s",
+                                 processed, total_to_process, elapsed, avg_time_per_record,
+                                 eta.strftime('%H:%M:%S'), addr[:30] + ('...' if len(addr) > 30 else ''),
+                                 lat, lon, dz, extra=fields)
+                    else:
+                        log.debug("→ %s → %s,%s | %s", addr, lat, lon, dz, extra=fields)
                     
                     # Zapisz cache co 20 rekordów
                     if len(cache) % 20 == 0:
                         save_cache(cache_path, cache)
-                        print(f"💾 Cache zapisany ({len(cache)} rekordów)")
+                        log.debug("💾 Cache zapisany (%d rekordów)", len(cache), extra=kv(stage="cache"))
             
-            await asyncio.gather(*[worker(a) for a in need_fetch])
+            with METRICS.timer("pipeline_stage_seconds", stage="geocode"):
+                await asyncio.gather(*[worker(a) for a in need_fetch])
         
         total_time = time.time() - start_time
         print(f"\n✅ Geokodowanie zakończone w {total_time:.1f}s")
@@ -492,15 +553,41 @@ async def run():
                 if pd.isna(row.get("dzielnica")): row["dzielnica"] = dz
         return row
 
-    df = df.apply(fill_row, axis=1)
+    with METRICS.timer("pipeline_stage_seconds", stage="fill"):
+        df = df.apply(fill_row, axis=1)
     
     fill_time = time.time() - start_fill
     print(f"✅ Uzupełnianie zakończone w {fill_time:.1f}s")
     
+    df = attach_liveness(df, Path(LIVENESS_FILE))
+    delisted = int((df["status"] == "delisted").sum())
+    if delisted:
+        print(f"🪦 Zdjętych z otodom (liveness): {delisted}")
+
+    pois = load_pois(Path(POI_FILE))
+    if pois:
+        df = add_poi_distances(df, pois)
+        print(f"📍 Odległości do {len(pois)} POI: " + ", ".join(p["key"] for p in pois))
+
+    t_model = time.time()
+    deal = apply_deal_model(df, Path(DEAL_MODEL_FILE))
+    print(f"🧮 Wycena hedoniczna: model z {deal['n']} ofert "
+          f"w {(time.time() - t_model) * 1000:.0f} ms → {DEAL_MODEL_FILE}")
+
     print(f"\n💾 Zapisuję do {out_path}...")
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(out_path, index=False, encoding="utf-8")
-    print(f"✅ Zapisano do {out_path}")
+    # pełny snapshot: plik tymczasowy + atomowa podmiana, czytelnicy (API) nie widzą połowy pliku
+    with METRICS.timer("pipeline_stage_seconds", stage="write"), \
+            open_sinks(OUTPUT_SINKS, schema_from_frame(df), str(out_path), mode="w", batch_size=SINK_BATCH) as sink:
+        sink.write_frame(df)
+    print(f"✅ Zapisano do {sink.describe()}")
+
+    t_stats = time.time()
+    stats = write_stats(df, Path(STATS_FILE))
+    print(f"📈 Agregaty statystyk ({stats['total_offers']} ofert) → {STATS_FILE} w {time.time() - t_stats:.2f}s")
+    bundle = write_bundle(df, stats, Path(BUNDLE_DIR))
+    print(f"📦 Paczka dla frontu: {bundle['offers']['file']} "
+          f"({bundle['offers']['bytes']} B, gzip {bundle['offers']['gzip_bytes']} B) → {BUNDLE_DIR}")
     
     # Statystyki
     total_rows = len(df)
@@ -536,5 +623,27 @@ async def run():
         for district, count in district_counts.items():
             print(f"   • {district}: {count} ogłoszeń")
 
+    metrics_path = METRICS.export_jsonl(METRICS_DIR)
+    attempts = METRICS.summary("geocode_attempt_seconds")
+    if attempts:
+        print(f"\n⏱️ Strategie geokodera (metryki → {metrics_path}):")
+        for line in attempts:
+            print(f"   • {line}")
+
 if __name__ == "__main__":
-    asyncio.run(run())
+    parser = argparse.ArgumentParser(description="Geokodowanie i wzbogacanie wyników scrapera")
+    parser.add_argument("--sinks", default=OUTPUT_SINKS,
+                        help=f"formaty wyjścia, po przecinku: {', '.join(SINK_KINDS)}")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="wystaw metryki Prometheusa pod http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--log-level", default=LOG_LEVEL, choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="szczegółowość terminala (DEBUG = każdy adres)")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"profiler + flamegraph + wolne callbacki + tracemalloc → {PROFILE_DIR}")
+    parser.add_argument("--profile-every", type=int, default=SNAPSHOT_EVERY,
+                        help="co ile adresów snapshot tracemalloc")
+    args = parser.parse_args()
+    OUTPUT_SINKS = args.sinks
+    LOG_LEVEL = args.log_level
+    asyncio.run(run_profiled("geocoder", run(metrics_port=args.metrics_port),
+                             enabled=args.profile, every=args.profile_every))
@@ -0,0 +1,213 @@
+# processing/geocode_bench.py
+# Offline benchmark geokodera na lokalnym stubie Nominatim.
+#   1) geocode_one po unikalnych adresach (pusty cache): requesty/adres, czas/adres, p50/p95/p99 –
+#      bez leksykonu ulic i z leksykonem wyuczonym z cache fixture BEZ adresów z benchmarku,
+#   2) run() na zimnym cache, potem na ciepłym: trafienia cache, requesty, czas całości.
+# Pliki wejścia/wyjścia/cache idą do katalogu tymczasowego – prawdziwe dane nie są ruszane.
+import argparse
+import asyncio
+import csv
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import aiohttp
+
+import geo_processing
+from common.metrics import percentile   # sys.path z korzeniem repo ustawia geo_processing
+from nominatim_stub import add_stub_args, start_stub, stub_from_args
+from street_lexicon import StreetLexicon
+
+
+def prepare_input(src: str, dst: Path, limit: int) -> List[str]:
+    """Kopiuje do `dst` wiersze z pierwszych `limit` unikalnych adresów. Zwraca te adresy."""
+    with open(src, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+    keep: Dict[str, None] = {}
+    for r in rows:
+        a = (r.get("ulica") or "").strip()
+        if a and (a in keep or len(keep) < limit):
+            keep.setdefault(a, None)
+    with dst.open("w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames)
+        w.writeheader()
+        w.writerows(r for r in rows if (r.get("ulica") or "").strip() in keep)
+    return list(keep)
+
+
+class Probe:
+    """Podmienia fetch_json/geocode_one w geo_processing i zlicza wywołania."""
+    def __init__(self):
+        self.requests = 0
+        self.request_latencies: List[float] = []
+        self.geocode_calls = 0
+        self._orig_fetch = geo_processing.fetch_json
+        self._orig_geocode = geo_processing.geocode_one
+
+    def install(self):
+        async def fetch_json(*a, **kw):
+            self.requests += 1
+            t0 = time.perf_counter()
+            try:
+                return await self._orig_fetch(*a, **kw)
+            finally:
+                self.request_latencies.append(time.perf_counter() - t0)
+
+        async def geocode_one(*a, **kw):
+            self.geocode_calls += 1
+            return await self._orig_geocode(*a, **kw)
+
+        geo_processing.fetch_json = fetch_json
+        geo_processing.geocode_one = geocode_one
+
+    def uninstall(self):
+        geo_processing.fetch_json = self._orig_fetch
+        geo_processing.geocode_one = self._orig_geocode
+
+
+def held_out_lexicon(fixtures: str, addresses: List[str]) -> Optional[StreetLexicon]:
+    """Leksykon z cache fixture po odjęciu adresów z benchmarku (inaczej znałby odpowiedzi)."""
+    with open(fixtures, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        return None
+    skip = {geo_processing.norm_key(a) for a in addresses}
+    return StreetLexicon.from_cache({k: v for k, v in data.items() if k not in skip},
+                                    Path(geo_processing.STREETS_FILE))
+
+
+async def bench_geocode_one(addresses: List[str], rps: float, concurrency: int,
+                            lexicon: Optional[StreetLexicon] = None) -> dict:
+    probe = Probe()
+    probe.install()
+    cache: Dict[str, dict] = {}
+    per_addr: List[float] = []
+    req_per_addr: List[int] = []
+    found = 0
+    limiter = geo_processing.RateLimiter(rps)
+    sem = asyncio.Semaphore(concurrency)
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+            async def one(addr: str):
+                nonlocal found
+                async with sem:
+                    before = probe.requests
+                    t0 = time.perf_counter()
+                    lat, _, _ = await probe._orig_geocode(session, limiter, addr, cache, lexicon)
+                    per_addr.append(time.perf_counter() - t0)
+                    req_per_addr.append(probe.requests - before)
+                    found += lat is not None
+            t0 = time.perf_counter()
+            await asyncio.gather(*[one(a) for a in addresses])
+            wall = time.perf_counter() - t0
+    finally:
+        probe.uninstall()
+    n = len(addresses) or 1
+    return {
+        "addresses": len(addresses),
+        "found_pct": round(100 * found / n, 1),
+        "wall_s": round(wall, 3),
+        "requests": probe.requests,
+        "requests_per_address": round(probe.requests / n, 2),
+        "requests_per_address_max": max(req_per_addr, default=0),
+        "time_per_address_mean_s": round(statistics.fmean(per_addr), 4) if per_addr else 0.0,
+        "time_per_address_p50_s": round(percentile(per_addr, 0.50), 4),
+        "time_per_address_p95_s": round(percentile(per_addr, 0.95), 4),
+        "time_per_address_p99_s": round(percentile(per_addr, 0.99), 4),
+        "request_latency_p95_s": round(percentile(probe.request_latencies, 0.95), 4),
+        # ile by to trwało na publicznym Nominatim (1 rps)
+        "projected_public_1rps_s": probe.requests,
+    }
+
+
+async def bench_run(workdir: Path, n_unique: int) -> dict:
+    probe = Probe()
+    probe.install()
+    try:
+        t0 = time.perf_counter()
+        await geo_processing.run()
+        wall = time.perf_counter() - t0
+    finally:
+        probe.uninstall()
+    hits = max(0, n_unique - probe.geocode_calls)
+    return {
+        "wall_s": round(wall, 3),
+        "requests": probe.requests,
+        "geocoded": probe.geocode_calls,
+        "cache_hits": hits,
+        "cache_hit_pct": round(100 * hits / n_unique, 1) if n_unique else 0.0,
+        "requests_per_address": round(probe.requests / n_unique, 2) if n_unique else 0.0,
+    }
+
+
+async def main(args) -> dict:
+    stub = stub_from_args(args)
+    runner, url = await start_stub(stub)
+    workdir = Path(tempfile.mkdtemp(prefix="geocode_bench_"))
+    in_csv = workdir / "otodom_results.csv"
+    addresses = prepare_input(args.input, in_csv, args.limit)
+
+    gp = geo_processing
+    gp.NOMINATIM_URL = url
+    gp.MAX_RPS = args.rps
+    gp.INPUT_FILE = str(in_csv)
+    gp.OUTPUT_FILE = str(workdir / "oferty_geo.csv")
+    gp.CACHE_FILE = str(workdir / "geocode_cache.json")
+    gp.LIVENESS_FILE = str(workdir / "liveness.json")
+    gp.STATS_FILE = str(workdir / "stats.json")
+    gp.BUNDLE_DIR = str(workdir / "bundle")
+    gp.DEAL_MODEL_FILE = str(workdir / "deal_model.json")
+    gp.METRICS_DIR = str(workdir)
+    gp.LOG_DIR = str(workdir)
+
+    try:
+        report = {"ts": int(time.time()), "rps": args.rps, "workdir": str(workdir)}
+        print(f"\n🧪 [1/3] geocode_one × {len(addresses)} (pusty cache)")
+        report["geocode_one"] = await bench_geocode_one(addresses, args.rps, args.concurrency)
+        lexicon = held_out_lexicon(args.fixtures, addresses)
+        if lexicon is not None:
+            print(f"🧪 [1/3] geocode_one × {len(addresses)} + leksykon ({len(lexicon.forms)} form, "
+                  f"{len(lexicon.names)} nazw)")
+            report["geocode_one_lexicon"] = await bench_geocode_one(addresses, args.rps, args.concurrency,
+                                                                    lexicon)
+        print("\n🧪 [2/3] run() – zimny cache")
+        report["run_cold"] = await bench_run(workdir, len(addresses))
+        print("\n🧪 [3/3] run() – ciepły cache")
+        report["run_warm"] = await bench_run(workdir, len(addresses))
+        st = stub.stats
+        report["stub"] = {"requests": st.requests, "structured": st.structured, "q": st.q,
+                          "hits": st.hits, "misses": st.misses, "out_of_box": st.out_of_box,
+                          "http_429": st.http_429, "http_5xx": st.http_5xx}
+    finally:
+        await runner.cleanup()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark geokodera na lokalnym stubie Nominatim")
+    add_stub_args(parser)
+    parser.add_argument("--input", default="../data/otodom_results.csv")
+    parser.add_argument("--limit", type=int, default=200, help="ile unikalnych adresów")
+    parser.add_argument("--rps", type=float, default=50.0, help="limit RateLimiter (stub nie ma 1 rps)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--out", default=None, help="dopisz wynik jako linię JSON do pliku")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    print("\n📊 WYNIK BENCHMARKU:")
+    for section, vals in report.items():
+        if isinstance(vals, dict):
+            print(f"   {section}:")
+            for k, v in vals.items():
+                print(f"      • {k}: {v}")
+        else:
+            print(f"   • {section}: {vals}")
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        print(f"💾 Dopisano do {args.out}")
@@ -0,0 +1,171 @@
+# processing/nominatim_stub.py
+# Lokalny zastępnik Nominatim /search do benchmarków geokodera.
+# Odpowiada z tabeli fixture (domyślnie budowanej z ../data/geocode_cache.json):
+#   - zapytania strukturalne (street=&city=) i wolne (q=),
+#   - viewbox + bounded=1 (poza boxem → pusto),
+#   - wstrzykiwane 429 / 5xx / opóźnienie.
+import argparse
+import asyncio
+import json
+import random
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+DEFAULT_CACHE = "../data/geocode_cache.json"
+
+
+@dataclass
+class StubConfig:
+    latency_min: float = 0.02   # s
+    latency_max: float = 0.12   # s
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    structured: int = 0
+    q: int = 0
+    hits: int = 0
+    misses: int = 0
+    out_of_box: int = 0
+    http_429: int = 0
+    http_5xx: int = 0
+    by_query: Dict[str, int] = field(default_factory=dict)
+
+
+def norm_query(s: str) -> str:
+    """Wspólna normalizacja po obu stronach: bez 'ul.', ', Kraków', 'osiedle'→'os.', małe litery."""
+    t = (s or "").lower().strip()
+    t = re.sub(r",\s*(kraków|krakow|polska|małopolskie)\b", "", t)
+    t = re.sub(r"^ul\.\s*", "", t)
+    t = re.sub(r"\bosiedle\b", "os.", t)
+    t = re.sub(r"\s+", " ", t)
+    return t.strip(" ,")
+
+
+def fixtures_from_cache(cache: Dict[str, dict]) -> List[dict]:
+    """Każdy pozytywny wpis cache → rekord fixture. Nazwą jest wariant, który faktycznie
+       przeszedł (pole 'query'), a gdy go brak – klucz cache."""
+    out = []
+    for key, e in cache.items():
+        if not isinstance(e, dict) or e.get("lat") is None:
+            continue
+        name = e.get("query") or key
+        out.append({
+            "names": [name],
+            "lat": e["lat"], "lon": e["lon"],
+            "addresstype": e.get("addresstype") or ("house" if re.search(r"\d", name) else "road"),
+            "class": e.get("class") or "highway",
+            "type": e.get("type") or "residential",
+            "address": {k: v for k, v in (("suburb", e.get("dz")), ("road", e.get("road"))) if v},
+        })
+    return out
+
+
+def load_fixtures(path: str) -> List[dict]:
+    """Lista rekordów {"names": [...], "lat", "lon", "addresstype", "class", "type", "address"}
+       albo słownik w formacie geocode_cache.json (konwertowany przez fixtures_from_cache)."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return fixtures_from_cache(data) if isinstance(data, dict) else data
+
+
+def _inside(lat: float, lon: float, viewbox: str) -> bool:
+    left, top, right, bottom = (float(x) for x in viewbox.split(","))
+    return min(left, right) <= lon <= max(left, right) and min(top, bottom) <= lat <= max(top, bottom)
+
+
+class NominatimStub:
+    def __init__(self, cfg: StubConfig, fixtures: List[dict]):
+        self.cfg = cfg
+        self.stats = StubStats()
+        self.rng = random.Random(cfg.seed)
+        self.table: Dict[str, dict] = {}
+        for rec in fixtures:
+            for n in rec.get("names", []):
+                self.table.setdefault(norm_query(n), rec)
+
+    def lookup(self, params) -> List[dict]:
+        if "q" in params:
+            self.stats.q += 1
+            key = norm_query(params["q"])
+        else:
+            self.stats.structured += 1
+            key = norm_query(params.get("street", ""))
+        self.stats.by_query[key] = self.stats.by_query.get(key, 0) + 1
+        rec = self.table.get(key)
+        if rec is None:
+            self.stats.misses += 1
+            return []
+        viewbox = params.get("viewbox")
+        if viewbox and params.get("bounded") == "1" and not _inside(rec["lat"], rec["lon"], viewbox):
+            self.stats.out_of_box += 1
+            return []
+        self.stats.hits += 1
+        item = {
+            "lat": str(rec["lat"]), "lon": str(rec["lon"]),
+            "class": rec.get("class"), "type": rec.get("type"),
+            "addresstype": rec.get("addresstype"),
+            "display_name": f"{key}, Kraków, Polska",
+        }
+        if params.get("addressdetails") == "1":
+            item["address"] = dict(rec.get("address") or {}, city="Kraków", country="Polska")
+        return [item]
+
+    async def search(self, request: web.Request) -> web.Response:
+        self.stats.requests += 1
+        await asyncio.sleep(self.rng.uniform(self.cfg.latency_min, self.cfg.latency_max))
+        r = self.rng.random()
+        if r < self.cfg.rate_429:
+            self.stats.http_429 += 1
+            return web.json_response({"error": "Too Many Requests"}, status=429)
+        if r < self.cfg.rate_429 + self.cfg.rate_5xx:
+            self.stats.http_5xx += 1
+            return web.json_response({"error": "Service Unavailable"}, status=503)
+        return web.json_response(self.lookup(request.query), dumps=lambda o: json.dumps(o, ensure_ascii=False))
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/search", self.search)
+        return app
+
+
+async def start_stub(stub: NominatimStub, host: str = "127.0.0.1", port: int = 0):
+    """Startuje serwer w bieżącej pętli. Zwraca (runner, url_do_/search)."""
+    runner = web.AppRunner(stub.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    real_port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    return runner, f"http://{host}:{real_port}/search"
+
+
+def add_stub_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--fixtures", default=DEFAULT_CACHE,
+                        help="tabela fixture (JSON) albo geocode_cache.json")
+    parser.add_argument("--latency", type=float, nargs=2, default=(0.02, 0.12), metavar=("MIN", "MAX"))
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def stub_from_args(args) -> NominatimStub:
+    cfg = StubConfig(latency_min=args.latency[0], latency_max=args.latency[1],
+                     rate_429=args.rate_429, rate_5xx=args.rate_5xx, seed=args.seed)
+    return NominatimStub(cfg, load_fixtures(args.fixtures))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokalny zastępnik Nominatim /search")
+    add_stub_args(parser)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    stub = stub_from_args(args)
+    print(f"🧪 Stub Nominatim: {len(stub.table)} nazw w tabeli → http://127.0.0.1:{args.port}/search")
+    web.run_app(stub.make_app(), host="127.0.0.1", port=args.port, access_log=None)
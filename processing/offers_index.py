@@ -0,0 +1,230 @@
+# processing/offers_index.py
+# Kolumnowy indeks ofert dla API: dane ładowane RAZ do tablic NumPy,
+# posortowane indeksy po cenie i metrażu (searchsorted) + listy wierszy per dzielnica.
+# Zapytanie kosztuje O(log n + wynik), a nie O(n) jak filtrowanie w przeglądarce.
+# Klastry mapy: przy ładowaniu każda oferta dostaje numer komórki siatki Web Mercator
+# dla każdego zoomu (komórka ≈ CLUSTER_CELL_PX pikseli ekranu), zapytanie tylko grupuje.
+# Stan = niezmienny IndexSnapshot; przeładowanie podmienia jedną referencję (bez wyścigów w wątkach).
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.sinks import read_snapshot, snapshot_path
+from spatial_index import SpatialIndex
+
+# kolumny zwracane klientowi (kolejność = kolejność w JSON)
+PUBLIC_COLUMNS = ("id", "title", "ulica", "metraz_m2", "najem_pln", "czynsz_adm_pln",
+                  "url", "lat", "lon", "dzielnica", "fair_price_pln", "deal_score", "alias_ids")
+NUMERIC_COLUMNS = ("metraz_m2", "najem_pln", "czynsz_adm_pln", "lat", "lon", "fair_price_pln", "deal_score")
+
+CLUSTER_CELL_PX = 60        # bok komórki klastra w pikselach ekranu
+MAX_CLUSTER_ZOOM = 18       # zoom Leafleta z OSM kończy się na 19
+POINTS_ZOOM = 16            # od tego zoomu zwracamy pojedyncze oferty zamiast klastrów
+
+
+def _mercator(lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Współrzędne znormalizowane do [0, 1) – jak kafelki OSM/Leaflet."""
+    x = (lon + 180.0) / 360.0
+    s = np.sin(np.radians(np.clip(lat, -85.0511, 85.0511)))
+    y = 0.5 - np.log((1 + s) / (1 - s)) / (4 * np.pi)
+    return x, y
+
+
+def grid_keys(x: np.ndarray, y: np.ndarray, zoom: int) -> np.ndarray:
+    """Numer komórki siatki dla danego zoomu (-1 dla braku koordynatów)."""
+    n = int(np.ceil(256 * 2 ** zoom / CLUSTER_CELL_PX))
+    ok = ~(np.isnan(x) | np.isnan(y))
+    cx = np.minimum((np.nan_to_num(x) * n).astype(np.int64), n - 1)
+    cy = np.minimum((np.nan_to_num(y) * n).astype(np.int64), n - 1)
+    return np.where(ok, cx * n + cy, -1)
+
+
+def _range(sorted_vals: np.ndarray, order: np.ndarray,
+           lo: Optional[float], hi: Optional[float]) -> np.ndarray:
+    """Wiersze z wartością w [lo, hi] – dwa searchsorted po posortowanej kolumnie."""
+    a = 0 if lo is None else np.searchsorted(sorted_vals, lo, side="left")
+    b = len(sorted_vals) if hi is None else np.searchsorted(sorted_vals, hi, side="right")
+    return np.sort(order[a:b])
+
+
+class IndexSnapshot:
+    """Niezmienny stan indeksu z jednej wersji pliku. Przeładowanie buduje NOWY obiekt
+       i podmienia jedną referencję – żądanie bierze snapshot raz i używa go do końca."""
+
+    def __init__(self, df: pd.DataFrame, source: Path, mtime: float):
+        df = df.drop_duplicates("id")
+        if "status" in df.columns:
+            df = df[df["status"] != "delisted"]
+        df = df.reset_index(drop=True)
+        for col in PUBLIC_COLUMNS:
+            if col not in df.columns:
+                df[col] = None
+        for col in NUMERIC_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+        cols: Dict[str, np.ndarray] = {c: df[c].to_numpy() for c in PUBLIC_COLUMNS}
+        cols["dzielnica"] = df["dzielnica"].fillna("").astype(str).to_numpy()
+        # cena jak na froncie: brak najmu = 0
+        price = np.nan_to_num(df["najem_pln"].to_numpy(float), nan=0.0)
+        area = df["metraz_m2"].to_numpy(float)
+
+        price_order = np.argsort(price, kind="stable")
+        area_valid = np.flatnonzero(~np.isnan(area))
+        area_order = area_valid[np.argsort(area[area_valid], kind="stable")]
+
+        districts: Dict[str, np.ndarray] = {}
+        for name, idx in df.groupby(cols["dzielnica"]).indices.items():
+            if name:
+                districts[name] = np.sort(idx)
+
+        lat = df["lat"].to_numpy(float)
+        lon = df["lon"].to_numpy(float)
+        # kolumny dist_<poi>_m z geo_processing → posortowane jak cena (filtr "max X m od POI")
+        poi_dist = {}
+        for col in df.columns:
+            if col.startswith("dist_") and col.endswith("_m"):
+                d = pd.to_numeric(df[col], errors="coerce").to_numpy(float)
+                valid = np.flatnonzero(~np.isnan(d))
+                order = valid[np.argsort(d[valid], kind="stable")]
+                poi_dist[col[len("dist_"):-len("_m")]] = (order, d[order])
+        mx, my = _mercator(lat, lon)
+
+        self.source, self.mtime = source, mtime
+        self.n = len(df)
+        self.cols = cols
+        self.price = price
+        self.price_order, self.price_sorted = price_order, price[price_order]
+        self.area = area
+        self.area_order, self.area_sorted = area_order, area[area_order]
+        self.districts = districts
+        self.lat, self.lon = lat, lon
+        self.has_coords = ~(np.isnan(lat) | np.isnan(lon))
+        self.total = price + np.nan_to_num(df["czynsz_adm_pln"].to_numpy(float), nan=0.0)
+        self.cell_keys = {z: grid_keys(mx, my, z) for z in range(MAX_CLUSTER_ZOOM + 1)}
+        self.poi_dist = poi_dist
+        self.spatial = SpatialIndex(lat, lon)
+
+    # --- zapytania ---
+    def query(self, price_min: Optional[float] = None, price_max: Optional[float] = None,
+              area_min: Optional[float] = None, area_max: Optional[float] = None,
+              district: Optional[str] = None,
+              bbox: Optional[Tuple[float, float, float, float]] = None,
+              coords_only: bool = False,
+              near: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """Zwraca posortowane numery wierszy spełniających filtry.
+           bbox = (min_lon, min_lat, max_lon, max_lat); near = {poi: max. odległość w m}."""
+        idx: Optional[np.ndarray] = None
+
+        def narrow(cand: np.ndarray):
+            nonlocal idx
+            idx = cand if idx is None else np.intersect1d(idx, cand, assume_unique=True)
+
+        if district:
+            narrow(self.districts.get(district, np.empty(0, dtype=np.int64)))
+        if price_min is not None or price_max is not None:
+            narrow(_range(self.price_sorted, self.price_order, price_min, price_max))
+        if area_min is not None or area_max is not None:
+            narrow(_range(self.area_sorted, self.area_order, area_min, area_max))
+        for poi, radius in (near or {}).items():
+            if poi not in self.poi_dist:
+                raise KeyError(poi)
+            order, sorted_d = self.poi_dist[poi]
+            narrow(_range(sorted_d, order, None, radius))
+        if idx is None:
+            idx = np.arange(self.n)
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            la, lo = self.lat[idx], self.lon[idx]
+            idx = idx[(la >= min_lat) & (la <= max_lat) & (lo >= min_lon) & (lo <= max_lon)]
+        elif coords_only:
+            idx = idx[self.has_coords[idx]]
+        return idx
+
+    def rows(self, idx: np.ndarray) -> List[dict]:
+        out = []
+        cols = self.cols
+        for i in idx:
+            row = {}
+            for c in PUBLIC_COLUMNS:
+                v = cols[c][i]
+                if isinstance(v, float) and np.isnan(v):
+                    v = None
+                elif isinstance(v, np.generic):
+                    v = v.item()
+                row[c] = v if v != "" else None
+            out.append(row)
+        return out
+
+    def clusters(self, idx: np.ndarray, zoom: int) -> List[dict]:
+        """Grupuje wiersze (z koordynatami) po komórkach siatki zoomu: liczba, środek,
+           zasięg i mediana kosztu całkowitego (najem + czynsz adm.)."""
+        idx = idx[self.has_coords[idx]]
+        if not idx.size:
+            return []
+        keys = self.cell_keys[min(max(zoom, 0), MAX_CLUSTER_ZOOM)][idx]
+        order = np.lexsort((self.total[idx], keys))
+        idx, keys = idx[order], keys[order]
+        _, start, counts = np.unique(keys, return_index=True, return_counts=True)
+        lat, lon, total = self.lat[idx], self.lon[idx], self.total[idx]
+        # total jest posortowany w obrębie komórki → mediana z dwóch środkowych elementów
+        median = (total[start + (counts - 1) // 2] + total[start + counts // 2]) / 2
+        lat_c = np.add.reduceat(lat, start) / counts
+        lon_c = np.add.reduceat(lon, start) / counts
+        south, north = np.minimum.reduceat(lat, start), np.maximum.reduceat(lat, start)
+        west, east = np.minimum.reduceat(lon, start), np.maximum.reduceat(lon, start)
+        return [{
+            "lat": round(float(lat_c[k]), 6), "lon": round(float(lon_c[k]), 6),
+            "count": int(counts[k]), "median_price": round(float(median[k]), 2),
+            "bounds": [[float(south[k]), float(west[k])], [float(north[k]), float(east[k])]],
+            "row": int(idx[start[k]]),
+        } for k in range(len(start))]
+
+    def district_counts(self) -> List[Tuple[str, int]]:
+        return sorted(((k, int(v.size)) for k, v in self.districts.items()), key=lambda kv: kv[0])
+
+
+class OffersIndex:
+    """Trzyma aktualny IndexSnapshot; serwer jest wielowątkowy, więc stan to JEDNA referencja."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.snapshot: IndexSnapshot = self._build()
+
+    def _build(self) -> IndexSnapshot:
+        source = snapshot_path(str(self.path))   # oferty_geo.parquet, jeśli pipeline go zapisał
+        # mtime PRZED odczytem: zapis w trakcie ładowania da przy następnym żądaniu kolejne przeładowanie
+        mtime = os.path.getmtime(source)
+        return IndexSnapshot(read_snapshot(str(self.path)), source, mtime)
+
+    def current(self) -> IndexSnapshot:
+        return self.snapshot
+
+    def load(self):
+        self.snapshot = self._build()            # budowa poza referencją, podmiana jednym przypisaniem
+
+    def _stale(self) -> bool:
+        source = snapshot_path(str(self.path))
+        try:
+            mtime = os.path.getmtime(source)
+        except OSError:
+            return False
+        snap = self.snapshot
+        return source != snap.source or mtime != snap.mtime
+
+    def maybe_reload(self) -> bool:
+        """Przeładuj, jeśli pipeline nadpisał plik (sprawdzane przy każdym żądaniu – to tylko stat()).
+           Pod lockiem sprawdzamy jeszcze raz – wątki, które czekały, nie ładują tego samego ponownie."""
+        if not self._stale():
+            return False
+        with self._lock:
+            if not self._stale():
+                return False
+            self.load()
+            return True
@@ -0,0 +1,128 @@
+# processing/spatial_index.py
+# Indeks przestrzenny ofert: "oferty w promieniu R od punktu", "k najbliższych",
+# odległości wszystkich ofert do punktów POI (../data/poi.json) – wszystko wektorowo.
+# Siatka komórek w NumPy (bez dodatkowych zależności): zapytanie liczy odległości tylko w pobliskich komórkach.
+import json
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+POI_FILE = "../data/poi.json"
+EARTH_RADIUS_M = 6_371_000.0
+M_PER_DEG = EARTH_RADIUS_M * np.pi / 180    # metry na stopień szerokości
+CELL_M = 500.0                              # bok komórki siatki
+MAX_SEARCH_M = 20_000_000.0                 # ~pół obwodu Ziemi – dalej nearest() skanuje wszystko
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Odległość po kuli w metrach; argumenty się broadcastują (skalar × tablica, n×1 × 1×p)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def load_pois(path: Path) -> List[dict]:
+    """Lista {"key", "name", "lat", "lon"}; brak pliku → pusta lista."""
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        pois = json.load(f)
+    return [p for p in pois if p.get("key") and p.get("lat") is not None and p.get("lon") is not None]
+
+
+def poi_column(key: str) -> str:
+    return f"dist_{key}_m"
+
+
+class SpatialIndex:
+    """Indeks po wierszach z koordynatami; zwraca numery wierszy ORYGINALNEJ tablicy.
+       Siatka równych komórek (~CELL_M) w stopniach: punkty posortowane po numerze komórki,
+       zapytanie przegląda tylko komórki pokrywające okrąg (wiersz komórek = jeden wycinek tablicy)."""
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_m: float = CELL_M):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        ok = ~(np.isnan(lat) | np.isnan(lon))
+        self.size = len(lat)
+        self.rows = np.flatnonzero(ok)
+        self.lat, self.lon = lat[ok], lon[ok]
+        if not self.rows.size:
+            return
+        self.lat0, self.lon0 = self.lat.min(), self.lon.min()
+        self.dlat = cell_m / M_PER_DEG
+        # komórka ma >= cell_m szerokości na całym zakresie (cos najmniejszy przy największym |lat|)
+        self.dlon = self.dlat / max(np.cos(np.radians(np.abs(self.lat).max())), 1e-6)
+        cy = ((self.lat - self.lat0) // self.dlat).astype(np.int64)
+        cx = ((self.lon - self.lon0) // self.dlon).astype(np.int64)
+        self.ny, self.nx = int(cy.max()) + 1, int(cx.max()) + 1
+        keys = cy * self.nx + cx
+        order = np.argsort(keys, kind="stable")
+        self.rows, self.lat, self.lon = self.rows[order], self.lat[order], self.lon[order]
+        self.keys = keys[order]
+
+    def _candidates(self, lat: float, lon: float, radius_m: float) -> np.ndarray:
+        """Pozycje (w posortowanych tablicach) punktów z komórek pokrywających okrąg."""
+        rlat = radius_m / M_PER_DEG
+        edge = min(abs(lat) + rlat, 89.9)                 # najwęższe stopnie długości w okręgu
+        rlon = rlat / np.cos(np.radians(edge))
+        y0 = max(int((lat - rlat - self.lat0) // self.dlat), 0)
+        y1 = min(int((lat + rlat - self.lat0) // self.dlat), self.ny - 1)
+        x0 = max(int((lon - rlon - self.lon0) // self.dlon), 0)
+        x1 = min(int((lon + rlon - self.lon0) // self.dlon), self.nx - 1)
+        if y0 > y1 or x0 > x1:
+            return np.empty(0, dtype=np.int64)
+        base = np.arange(y0, y1 + 1) * self.nx
+        lo = np.searchsorted(self.keys, base + x0, side="left")
+        hi = np.searchsorted(self.keys, base + x1, side="right")
+        return np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)])
+
+    def within(self, lat: float, lon: float, radius_m: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Wiersze w promieniu radius_m, posortowane rosnąco po odległości."""
+        if not self.rows.size:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        cand = self._candidates(lat, lon, radius_m)
+        d = haversine_m(lat, lon, self.lat[cand], self.lon[cand])
+        keep = d <= radius_m
+        cand, d = cand[keep], d[keep]
+        order = np.argsort(d, kind="stable")
+        return self.rows[cand[order]], d[order]
+
+    def nearest(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """k najbliższych wierszy (mniej, jeśli ofert z koordynatami jest mniej).
+           Promień rośnie x2, aż w okręgu jest >= k punktów – wtedy to na pewno k najbliższych."""
+        k = min(k, self.rows.size)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        radius = CELL_M
+        while radius < MAX_SEARCH_M:
+            rows, d = self.within(lat, lon, radius)
+            if rows.size >= k:
+                return rows[:k], d[:k]
+            radius *= 2
+        d = haversine_m(lat, lon, self.lat, self.lon)
+        part = np.argpartition(d, k - 1)[:k]
+        part = part[np.argsort(d[part], kind="stable")]
+        return self.rows[part], d[part]
+
+    def distance_matrix(self, points: List[Tuple[float, float]]) -> np.ndarray:
+        """Macierz (wiersze × punkty) odległości w metrach; NaN dla wierszy bez koordynatów."""
+        out = np.full((self.size, len(points)), np.nan)
+        if self.rows.size and points:
+            plat = np.array([p[0] for p in points], dtype=float)
+            plon = np.array([p[1] for p in points], dtype=float)
+            out[self.rows] = haversine_m(self.lat[:, None], self.lon[:, None], plat[None, :], plon[None, :])
+        return out
+
+
+def add_poi_distances(df: pd.DataFrame, pois: List[dict]) -> pd.DataFrame:
+    """Dokleja kolumny dist_<poi>_m (metry, zaokrąglone) dla każdego POI z pliku."""
+    if not pois:
+        return df
+    index = SpatialIndex(pd.to_numeric(df["lat"], errors="coerce").to_numpy(float),
+                         pd.to_numeric(df["lon"], errors="coerce").to_numpy(float))
+    dist = index.distance_matrix([(p["lat"], p["lon"]) for p in pois])
+    for j, p in enumerate(pois):
+        df[poi_column(p["key"])] = pd.Series(np.round(dist[:, j]), index=df.index).astype("Int64")
+    return df
@@ -0,0 +1,130 @@
+# processing/static_server.py
+# Serwowanie src/ i data/ z api_server.py zamiast `python -m http.server`:
+#   - ETag + If-None-Match (304), Last-Modified, Range (206) – przez send_file(conditional=True),
+#   - gotowe .br/.gz obok pliku (data_bundle.py) albo gzip w locie dla tekstu (wynik trzymany w pamięci),
+#   - Cache-Control zależne od rodzaju pliku (pliki z hashem w nazwie – na zawsze).
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+from flask import Flask, Response, abort, redirect, request, send_file
+from werkzeug.security import safe_join
+
+STATIC_PREFIXES = ("src/", "data/")       # tylko to wystawiamy – reszta repo (kod, cache) nie
+HASHED_RE = re.compile(r"\.[0-9a-f]{8,}\.\w+$")   # offers.09363c7eb1b5.json
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDATE = "no-cache"              # HTML, manifest, CSV/JSON z pipeline'u – zawsze ETag
+CACHE_ASSETS = "public, max-age=600"       # JS/CSS (wersjonowane ?v= w HTML)
+COMPRESSIBLE = ("text/", "application/json", "application/javascript", "image/svg+xml")
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+GZIP_CACHE_ITEMS = 32                      # ile skompresowanych plików trzymać w pamięci
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))   # przy równym q wygrywa br (mniejszy plik)
+
+
+def cache_policy(path: str) -> str:
+    if HASHED_RE.search(path):
+        return CACHE_IMMUTABLE
+    if path.startswith("data/") or path.endswith(".html"):
+        return CACHE_REVALIDATE
+    return CACHE_ASSETS
+
+
+def _quality(encoding: str) -> float:
+    """q kodowania z Accept-Encoding (werkzeug: lista po przecinkach, q-wartości, "*", wielkość liter)."""
+    accept = request.accept_encodings
+    if encoding == "gzip":
+        return max(accept.quality("gzip"), accept.quality("x-gzip"))
+    return accept.quality(encoding)
+
+
+def _wanted() -> List[Tuple[str, str]]:
+    """Kodowania, które klient przyjmuje (q > 0 – "br;q=0" to odmowa), od najwyższego q."""
+    q = {enc: _quality(enc) for enc, _ in ENCODINGS}
+    return sorted((e for e in ENCODINGS if q[e[0]] > 0), key=lambda e: -q[e[0]])
+
+
+class GzipCache:
+    """LRU skompresowanych treści kluczowane (ścieżka, mtime, rozmiar) – plik zmieniony = nowy klucz."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._items: "OrderedDict[Tuple[str, int, int], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, full: str, st: os.stat_result) -> bytes:
+        key = (full, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        with open(full, "rb") as f:
+            body = gzip.compress(f.read(), compresslevel=GZIP_LEVEL, mtime=0)
+        with self._lock:
+            self._items[key] = body
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return body
+
+
+def serve(root: str, path: str, gz_cache: GzipCache) -> Response:
+    path = posixpath.normpath(path)            # "data/../processing/x.py" → poza prefiksami
+    if not path.startswith(STATIC_PREFIXES):
+        abort(404)
+    full = safe_join(root, path)
+    if full is None or not os.path.isfile(full):
+        abort(404)
+
+    resp = _serve_file(full, gz_cache)
+    resp.headers["Cache-Control"] = cache_policy(path)
+    return resp
+
+
+def _serve_file(full: str, gz_cache: GzipCache) -> Response:
+    mimetype = _mimetype(full)
+    # Range dotyczy bajtów oryginału – wtedy bez kompresji
+    if request.range is None:
+        st = os.stat(full)
+        for enc, ext in _wanted():
+            if os.path.isfile(full + ext):      # gotowy wariant z data_bundle.py
+                resp = send_file(full + ext, mimetype=mimetype, conditional=True, etag=True)
+                resp.headers["Content-Encoding"] = enc
+                resp.vary.add("Accept-Encoding")
+                return resp
+            if enc == "gzip" and st.st_size >= GZIP_MIN_BYTES and mimetype.startswith(COMPRESSIBLE):
+                body = gz_cache.get(full, st)
+                resp = Response(body, mimetype=mimetype)
+                # ns – dwa zapisy w tej samej sekundzie o tym samym rozmiarze to nadal różne ETagi
+                resp.set_etag(f"{st.st_mtime_ns}-{st.st_size}-gz")
+                resp.last_modified = st.st_mtime
+                resp.headers["Content-Encoding"] = "gzip"
+                resp.vary.add("Accept-Encoding")
+                return resp.make_conditional(request)
+
+    resp = send_file(full, mimetype=mimetype, conditional=True, etag=True)
+    if mimetype.startswith(COMPRESSIBLE):
+        resp.vary.add("Accept-Encoding")
+    return resp
+
+
+def _mimetype(full: str) -> str:
+    return mimetypes.guess_type(full)[0] or "application/octet-stream"
+
+
+def register_static(app: Flask, root: str):
+    """Podpina / (→ src/index.html) i /<src|data>/... pod aplikację Flask."""
+    gz_cache = GzipCache(GZIP_CACHE_ITEMS)
+    root = os.path.abspath(root)
+
+    @app.get("/")
+    def home():
+        return redirect("/src/index.html")
+
+    @app.get("/<path:path>")
+    def static_files(path: str):
+        return serve(root, path, gz_cache)
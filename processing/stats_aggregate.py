@@ -0,0 +1,193 @@
+# processing/stats_aggregate.py
+# Agregaty dla strony statistics.html liczone RAZ na odświeżenie danych (zamiast w przeglądarce).
+# Wynik: mały, wersjonowany ../data/stats.json – rozmiar nie rośnie z liczbą ofert
+# (poza próbką punktów do wykresów rozrzutu, przyciętą do MAX_POINTS).
+import datetime
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+STATS_VERSION = 1
+MAX_POINTS = 1500                      # maks. punktów na wykres rozrzutu
+KRAKOW_CENTER = (50.0647, 19.9450)     # to samo centrum co na froncie
+SEGMENTS = ((0, 2000, "budget"), (2000, 3000, "mid"), (3000, 4000, "premium"), (4000, np.inf, "luxury"))
+RINGS_KM = ((0, 1, "0-1"), (1, 3, "1-3"), (3, 5, "3-5"), (5, np.inf, "5+"))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Wektorowa odległość po kuli (km) – działa na skalarach i tablicach."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _r(x, nd: int = 2) -> Optional[float]:
+    return None if x is None or not np.isfinite(x) else round(float(x), nd)
+
+
+def _median(a: np.ndarray) -> Optional[float]:
+    return _r(np.median(a)) if a.size else None
+
+
+def _mean(a: np.ndarray) -> Optional[float]:
+    return _r(a.mean()) if a.size else None
+
+
+def _histogram(values: np.ndarray, bins: int) -> Optional[dict]:
+    """Te same kubełki co dawny JS: szerokość (max-min)/bins (albo 1), ostatni domyka max."""
+    if not values.size:
+        return None
+    vmin, vmax = float(values.min()), float(values.max())
+    size = (vmax - vmin) / bins or 1.0
+    idx = np.minimum(((values - vmin) // size).astype(int), bins - 1)
+    return {"min": _r(vmin), "bin_size": _r(size, 4), "counts": np.bincount(idx, minlength=bins).tolist()}
+
+
+def _sample(n: int, seed: int = 0) -> np.ndarray:
+    if n <= MAX_POINTS:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, MAX_POINTS, replace=False))
+
+
+def prepare_offers(df: pd.DataFrame) -> pd.DataFrame:
+    """Zbiór jak na stronie statystyk: unikalne ID, z koordynatami, bez ofert zdjętych."""
+    out = df.drop_duplicates("id")
+    if "status" in out.columns:
+        out = out[out["status"] != "delisted"]
+    out = out[out["lat"].notna() & out["lon"].notna()].copy()
+    for col in ("najem_pln", "czynsz_adm_pln", "metraz_m2", "lat", "lon"):
+        out[col] = pd.to_numeric(out[col], errors="coerce")
+    out["najem_pln"] = out["najem_pln"].fillna(0)
+    out["czynsz_adm_pln"] = out["czynsz_adm_pln"].fillna(0)
+    return out
+
+
+def build_stats(df: pd.DataFrame) -> Dict[str, object]:
+    o = prepare_offers(df)
+    n = len(o)
+    rent = o["najem_pln"].to_numpy(float)
+    admin = o["czynsz_adm_pln"].to_numpy(float)
+    area = o["metraz_m2"].to_numpy(float)
+    lat = o["lat"].to_numpy(float)
+    lon = o["lon"].to_numpy(float)
+    dz = o["dzielnica"].fillna("").astype(str).to_numpy()
+
+    has_rent = rent > 0
+    has_area = np.nan_to_num(area) > 0
+    has_admin = admin > 0
+    has_both = has_rent & has_admin
+    ra = has_rent & has_area
+    total = rent + admin
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_m2 = np.where(ra, rent / area, np.nan)
+        total_m2 = np.where(ra, total / area, np.nan)
+    dist = haversine_km(KRAKOW_CENTER[0], KRAKOW_CENTER[1], lat, lon)
+
+    stats: Dict[str, object] = {
+        "version": STATS_VERSION,
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "total_offers": n,
+    }
+
+    admin_share = (admin[has_both].sum() / total[has_both].sum() * 100) if has_both.any() else None
+    stats["overview"] = {
+        "avg_rent": _mean(rent[has_rent]),
+        "median_rent": _median(rent[has_rent]),
+        "avg_area": _mean(area[has_area]),
+        "avg_price_per_m2": _mean(price_m2[ra]),
+        "avg_total_per_m2": _mean(total_m2[ra]),
+        "admin_fee_share_pct": _r(admin_share, 1),
+        "data_quality_pct": _r((ra.sum() / n * 100) if n else None, 1),
+    }
+
+    fees = admin[has_both]
+    fee_area = has_both & has_area
+    stats["admin_fees"] = {
+        "avg": _mean(fees),
+        "median": _median(fees),
+        "min": _r(fees.min()) if fees.size else None,
+        "max": _r(fees.max()) if fees.size else None,
+        "avg_per_m2": _mean(admin[fee_area] / area[fee_area]) if fee_area.any() else None,
+    }
+
+    # --- dzielnice (kilkadziesiąt grup – maska na grupę jest tania) ---
+    districts = []
+    for name in pd.unique(dz[dz != ""]):
+        m = dz == name
+        mb = m & has_both
+        share = admin[mb].sum() / total[mb].sum() * 100 if mb.any() else 0.0
+        districts.append({
+            "name": name,
+            "offers": int(m.sum()),
+            "median_rent": _median(rent[m & has_rent]),
+            "median_area": _median(area[m & has_area]),
+            "median_price_per_m2": _median(price_m2[m & ra]),
+            "median_total_per_m2": _median(total_m2[m & ra]),
+            "admin_fee_share_pct": _r(share, 1),
+        })
+    districts.sort(key=lambda d: d["offers"], reverse=True)
+    stats["districts"] = districts
+    stats["district_total_per_m2_top"] = sorted(
+        ({"name": d["name"], "median_total_per_m2": d["median_total_per_m2"]}
+         for d in districts if d["median_total_per_m2"] is not None),
+        key=lambda d: d["median_total_per_m2"], reverse=True)[:10]
+
+    stats["histograms"] = {
+        "rent": _histogram(rent[has_rent], 20),
+        "admin_fee": _histogram(admin[has_admin], 15),
+        "area": _histogram(area[has_area], 15),
+    }
+
+    sr = np.sort(rent[has_rent])
+    stats["rent_quartiles"] = None if not sr.size else {
+        "min": _r(sr[0]), "q1": _r(sr[int(sr.size * 0.25)]), "median": _median(sr),
+        "q3": _r(sr[int(sr.size * 0.75)]), "max": _r(sr[-1]),
+    }
+
+    stats["segments"] = {name: int(((rent > lo) & (rent <= hi) & has_rent).sum()) for lo, hi, name in SEGMENTS}
+    stats["distance_rings"] = {name: int((has_rent & (dist <= hi) & ((dist > lo) if lo else True)).sum())
+                               for lo, hi, name in RINGS_KM}
+
+    # ranking okazji: deal_score z deal_model.py (ten sam co na mapie); bez modelu – koszt/m²
+    deal = ra & (dz != "")
+    fair = o["fair_price_pln"].to_numpy(float) if "fair_price_pln" in o.columns else np.full(n, np.nan)
+    if "deal_score" in o.columns and o["deal_score"].notna().any():
+        score = o["deal_score"].to_numpy(float)
+        deal &= ~np.isnan(score)
+        value = np.where(deal, score, -np.inf)
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            value = np.where(deal, 1000 / total_m2, -np.inf)
+    top = np.argsort(-value, kind="stable")[:min(10, int(deal.sum()))]
+    stats["deals"] = [{
+        "dzielnica": dz[i], "price_per_m2": _r(total_m2[i]), "total_cost": _r(total[i]),
+        "metraz_m2": _r(area[i]), "value_score": _r(value[i]), "fair_price_pln": _r(fair[i]),
+    } for i in top]
+
+    stats["data_quality"] = {
+        "rent_pct": _r(has_rent.mean() * 100, 1) if n else None,
+        "area_pct": _r(has_area.mean() * 100, 1) if n else None,
+        "admin_fee_pct": _r(has_admin.mean() * 100, 1) if n else None,
+        "district_pct": _r((dz != "").mean() * 100, 1) if n else None,
+        "coords_pct": 100.0 if n else None,
+    }
+
+    ia = np.flatnonzero(ra)[_sample(int(ra.sum()))]
+    ig = np.flatnonzero(has_rent)[_sample(int(has_rent.sum()))]
+    stats["points"] = {
+        "area_rent": np.round(np.column_stack([area[ia], rent[ia]]), 1).tolist(),
+        "geo": np.round(np.column_stack([lon[ig], lat[ig], rent[ig]]), 5).tolist(),
+        "distance_rent": np.round(np.column_stack([dist[ig], rent[ig]]), 3).tolist(),
+    }
+    return stats
+
+
+def write_stats(df: pd.DataFrame, path: Path) -> Dict[str, object]:
+    stats = build_stats(df)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False, separators=(",", ":"))
+    return stats
@@ -0,0 +1,158 @@
+# processing/street_lexicon.py
+# Leksykon odmian nazw ulic dla geokodera, uczony z udanych wpisów geocode_cache.json:
+#   - formy: 'karmelickiej' → 'Karmelicka' (surowa nazwa z ogłoszenia → nazwa, którą zwrócił Nominatim),
+#   - reguły końcówek ('iej'→'a', 'ej'→'a', bez zmiany…) z licznikami sukcesów per kontekst
+#     (ostatnie litery słowa) – warianty z gen_street_variants idą od najskuteczniejszego,
+#     a reguły, które w danym kontekście nigdy nie zadziałały, odpadają,
+#   - opcjonalna lista nazw ulic (../data/streets_krakow.txt, jedna na linię, np. eksport z OSM):
+#     nazwa z listy nie potrzebuje wariantów, wariant z listy idzie pierwszy.
+# Każdy pominięty wariant to jeden request mniej do Nominatim (1 rps).
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+STREETS_FILE = "../data/streets_krakow.txt"
+CONTEXT_CHARS = 3        # kontekst reguły: tyle ostatnich liter odmienianego słowa ('Karmelickiej' → 'iej')
+MIN_EVIDENCE = 3         # reguła z 0 sukcesów po tylu próbach w kontekście nie jest już proponowana
+
+IDENTITY = ("", "")
+_PREFIX_TOKEN_RE = re.compile(r"^(ul\.|al\.|pl\.|os\.|osiedle|rondo|rynek)$", re.I)
+_DIGIT_RE = re.compile(r"\d")
+
+
+def split_name(street: str) -> Tuple[List[str], List[str], List[str]]:
+    """'al. Ignacego Daszyńskiego 12' → (['al.'], ['Ignacego', 'Daszyńskiego'], ['12']) –
+       ten sam podział co w gen_street_variants (prefiksy / nazwa / numer)."""
+    parts = (street or "").split(",")[0].split()
+    leading = []
+    while parts and _PREFIX_TOKEN_RE.match(parts[0]):
+        leading.append(parts.pop(0))
+    num_idx = next((i for i, t in enumerate(parts) if _DIGIT_RE.search(t)), len(parts))
+    return leading, parts[:num_idx], parts[num_idx:]
+
+
+def suffix_rule(raw: str, resolved: str) -> Tuple[str, str]:
+    """Reguła końcówki zamieniająca raw w resolved: ('karmelickiej', 'karmelicka') → ('iej', 'a')."""
+    a, b = raw.lower(), resolved.lower()
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    return a[i:], b[i:]
+
+
+def apply_rule(word: str, rule: Tuple[str, str]) -> Optional[str]:
+    frm, to = rule
+    if not word.lower().endswith(frm) or len(word) <= len(frm):
+        return None
+    out = word[:len(word) - len(frm)] + to
+    return out[:1].upper() + out[1:] if word[:1].isupper() else out
+
+
+def load_street_names(path: Path) -> Set[str]:
+    """Nazwy ulic (lower) z pliku tekstowego; brak pliku → pusty zbiór."""
+    if not path.exists():
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {" ".join(line.split()).lower() for line in f if line.strip() and not line.startswith("#")}
+
+
+class StreetLexicon:
+    def __init__(self, street_names: Iterable[str] = ()):
+        self.forms: Dict[str, str] = {}            # nazwa odmieniona (lower) → nazwa z Nominatim
+        self.names: Set[str] = set(street_names)   # znane poprawne nazwy (lower)
+        self.rules: Set[Tuple[str, str]] = {IDENTITY}
+        self.stats: Dict[Tuple[str, Tuple[str, str]], List[int]] = {}   # (kontekst, reguła) → [sukcesy, próby]
+        self._pairs: List[Tuple[str, str]] = []   # (ostatnie słowo surowe, ostatnie słowo rozwiązane)
+
+    @classmethod
+    def from_cache(cls, cache: Dict[str, dict], streets_file: Optional[Path] = None) -> "StreetLexicon":
+        """Uczy się z pozytywnych wpisów cache: klucz (surowy adres) vs 'road' z odpowiedzi Nominatim,
+           a w starszych wpisach (bez 'road') – wariant, który przeszedł ('query')."""
+        lex = cls(load_street_names(streets_file) if streets_file else ())
+        for key, e in cache.items():
+            if not isinstance(e, dict) or e.get("lat") is None:
+                continue
+            resolved = e.get("road") or (e.get("query") or "").split(",")[0]
+            if resolved:
+                lex.learn(key, resolved, recount=False)
+        lex._recount()
+        return lex
+
+    def learn(self, raw_street: str, resolved: str, recount: bool = True):
+        """Zapamiętuje udane geokodowanie: surowa ulica (jak w ogłoszeniu) → nazwa, która przeszła."""
+        _, raw_name, _ = split_name(raw_street)
+        _, res_name, _ = split_name(resolved)
+        if not raw_name or not res_name:
+            return
+        self.names.add(" ".join(res_name).lower())
+        # uczymy się tylko odmiany ostatniego słowa (jak gen_street_variants) – reszta nazwy bez zmian
+        if len(raw_name) != len(res_name) or \
+                [t.lower() for t in raw_name[:-1]] != [t.lower() for t in res_name[:-1]]:
+            return
+        raw_key = " ".join(raw_name).lower()
+        if raw_key != " ".join(res_name).lower():
+            self.forms[raw_key] = " ".join(res_name)
+        rule = suffix_rule(raw_name[-1], res_name[-1])
+        pair = (raw_name[-1].lower(), res_name[-1].lower())
+        self._pairs.append(pair)
+        new_rule = rule not in self.rules
+        self.rules.add(rule)
+        if recount:
+            # nowa reguła → przelicz wszystko (jej próby na starych parach), znana → tylko ta para
+            self._recount() if new_rule else self._count(*pair)
+
+    def _count(self, raw: str, res: str):
+        ctx = raw[-CONTEXT_CHARS:]
+        for rule in self.rules:
+            if apply_rule(raw, rule) is None:
+                continue
+            s = self.stats.setdefault((ctx, rule), [0, 0])
+            s[1] += 1
+            s[0] += apply_rule(raw, rule) == res
+
+    def _recount(self):
+        """Próby liczone kontrfaktycznie: każda znana reguła pasująca do słowa 'była próbowana'."""
+        self.stats = {}
+        for raw, res in self._pairs:
+            self._count(raw, res)
+
+    def _stats(self, word: str, rule: Tuple[str, str]) -> Tuple[int, int]:
+        succ, tries = self.stats.get((word.lower()[-CONTEXT_CHARS:], rule), (0, 0))
+        return succ, tries
+
+    def rank(self, street: str, variants: List[str]) -> Tuple[List[str], bool]:
+        """Warianty (z gen_street_variants) + z nauczonych reguł, od najbardziej obiecującego.
+           Zwraca (warianty, trafienie_w_leksykonie) – przy trafieniu pierwszy wariant to forma z cache."""
+        leading, name, suffix = split_name(street)
+        if not name:
+            return variants, False
+        key = " ".join(name).lower()
+        if key in self.names:
+            return [street], False                     # już poprawna nazwa – odmiany nic nie dadzą
+        hit = self.forms.get(key)
+
+        last, head = name[-1], name[:-1]
+        cands: Dict[str, Tuple[str, str]] = {}
+        for v in variants:
+            _, v_name, _ = split_name(v)
+            if v_name and len(v_name) == len(name):
+                cands.setdefault(v, suffix_rule(last, v_name[-1]))
+        for rule in self.rules:
+            word = apply_rule(last, rule)
+            if word:
+                cands.setdefault(" ".join(leading + head + [word] + suffix), rule)
+
+        scored = []
+        for i, (v, rule) in enumerate(cands.items()):
+            succ, tries = self._stats(last, rule)
+            if rule != IDENTITY and tries >= MIN_EVIDENCE and not succ:
+                continue                               # w tym kontekście nigdy nie zadziałała
+            _, v_name, _ = split_name(v)
+            known = " ".join(v_name).lower() in self.names
+            # skuteczność z wygładzeniem: reguła bez historii ma 0.5, remisy – kolejność z gen_street_variants
+            scored.append((not known, -(succ + 0.5) / (tries + 1), i, v))
+        out = [v for *_, v in sorted(scored)]
+        if hit:
+            first = " ".join(leading + [hit] + suffix)
+            out = [first] + [v for v in out if v.lower() != first.lower()]
+        return out or variants, bool(hit)
@@ -0,0 +1,112 @@
+# scraping/crawl_bench.py
+# Benchmark end-to-end: prawdziwy main() scrapera (Playwright + Chromium) przeciwko otodom_stub.
+# Raportuje oferty/s, p50/p95 czasu scrape_offer, liczbę requestów i pamięć.
+# Wszystkie pliki (CSV, seen.sqlite, watermark) idą do katalogu tymczasowego.
+import argparse
+import asyncio
+import csv
+import json
+import resource
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+import otodom_scraping
+from otodom_stub import LISTING_PATH, add_stub_args, start_stub, stub_from_args
+from common.metrics import percentile   # sys.path z korzeniem repo ustawia otodom_scraping
+
+
+async def run_bench(args) -> dict:
+    stub = stub_from_args(args)
+    runner, base = await start_stub(stub)
+    workdir = Path(tempfile.mkdtemp(prefix="crawl_bench_"))
+
+    # przekierowanie scrapera na stub i pliki tymczasowe
+    o = otodom_scraping
+    o.HOMEPAGE_URL = f"{base}/"
+    o.LISTING_BASE = f"{base}{LISTING_PATH}?limit=72&by=DEFAULT&direction=DESC"
+    o.LISTING_NEWEST = f"{base}{LISTING_PATH}?limit=72&by=LATEST&direction=DESC"
+    o.RESULTS_FILE = str(workdir / "otodom_results.csv")
+    o.TITLES_FILE = str(workdir / "seen_titles.txt")
+    o.BLACKLIST_FILE = str(workdir / "blacklist.txt")
+    o.SEEN_DB = str(workdir / "seen.sqlite")
+    o.WATERMARK_FILE = str(workdir / "watermark.json")
+    o.METRICS_DIR = str(workdir)
+    o.LOG_DIR = str(workdir)
+    o.TARGET_OFFERS = args.target
+    o.CONCURRENCY = args.concurrency
+
+    latencies: List[float] = []
+    original_scrape_offer = o.scrape_offer
+
+    async def timed_scrape_offer(*a, **kw):
+        t0 = time.perf_counter()
+        try:
+            return await original_scrape_offer(*a, **kw)
+        finally:
+            latencies.append(time.perf_counter() - t0)
+
+    o.scrape_offer = timed_scrape_offer
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        await o.main(incremental=args.incremental)
+    finally:
+        wall = time.perf_counter() - t0
+        _, py_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        o.scrape_offer = original_scrape_offer
+        await runner.cleanup()
+
+    collected = 0
+    if Path(o.RESULTS_FILE).exists():
+        with open(o.RESULTS_FILE, "r", encoding="utf-8", newline="") as f:
+            collected = sum(1 for _ in csv.DictReader(f))
+
+    st = stub.stats
+    stage_p95 = {dict(labels)["stage"]: round(h.quantile(0.95), 3)
+                 for (name, labels), h in o.METRICS.histograms.items() if name == "scrape_stage_seconds"}
+    return {
+        "ts": int(time.time()),
+        "target": args.target,
+        "concurrency": args.concurrency,
+        "incremental": args.incremental,
+        "wall_s": round(wall, 3),
+        "offers_collected": collected,
+        "offers_fetched": len(latencies),
+        "offers_per_s": round(collected / wall, 3) if wall else 0.0,
+        "offer_latency_p50_s": round(percentile(latencies, 0.50), 3),
+        "offer_latency_p95_s": round(percentile(latencies, 0.95), 3),
+        "offer_latency_mean_s": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "stage_p95_s": stage_p95,
+        "stub_requests": st.requests,
+        "stub_listing_pages": st.listing,
+        "stub_offer_pages": st.offers,
+        "stub_errors": st.errors,
+        "stub_blocks": st.blocks,
+        "py_peak_alloc_mb": round(py_peak / 2**20, 1),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "workdir": str(workdir),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark scrapera na lokalnym stubie otodom")
+    add_stub_args(parser)
+    parser.add_argument("--target", type=int, default=100, help="TARGET_OFFERS dla przebiegu")
+    parser.add_argument("--concurrency", type=int, default=otodom_scraping.CONCURRENCY)
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--out", default=None, help="dopisz wynik jako linię JSON do pliku")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_bench(args))
+    print("\n📊 WYNIK BENCHMARKU:")
+    for k, v in report.items():
+        print(f"   • {k}: {v}")
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        print(f"💾 Dopisano do {args.out}")
@@ -0,0 +1,111 @@
+# scraping/extract_bench.py
+# Benchmark + test regresyjny ekstraktorów tekstowych (bez przeglądarki i sieci).
+#   1) każdy przypadek z extract_corpus.json musi dać `expected` – inaczej kod wyjścia 1,
+#   2) czas na wywołanie (µs) każdej funkcji po całym korpusie, najlepszy z --repeat powtórzeń,
+#   3) "na ofertę": tytuł + adres + metraż + ceny + dzielnica – tyle CPU kosztuje ekstrakcja jednej oferty.
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from extractors import (
+    _area_from_labeled, _area_from_text, _norm_title, area_from_sources,
+    extract_address_for_geocode, extract_district_from_text, prices_from_text,
+)
+
+CORPUS_FILE = Path(__file__).with_name("extract_corpus.json")
+
+
+def load_corpus(path: Path = CORPUS_FILE) -> Dict[str, List[dict]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return {k: v for k, v in json.load(f).items() if not k.startswith("_")}
+
+
+def cases(corpus: Dict[str, List[dict]]) -> Dict[str, List[tuple]]:
+    """sekcja korpusu → [(wywołanie bez argumentów, expected, opis)]"""
+    def area(t):
+        return _area_from_text(t) or _area_from_labeled(t)
+
+    return {
+        "address": [(lambda e=e: extract_address_for_geocode(e["header"], e["title"], e["desc"]),
+                     e["expected"], e["header"] or e["desc"][:40]) for e in corpus["address"]],
+        "area": [(lambda e=e: area(e["text"]), e["expected"], e["text"]) for e in corpus["area"]],
+        "prices": [(lambda e=e: list(prices_from_text(e["price"], e["additional"], e["section"], e["desc"])),
+                    e["expected"], e["price"] or e["section"]) for e in corpus["prices"]],
+        "titles": [(lambda e=e: _norm_title(e["title"]), e["expected"], e["title"]) for e in corpus["titles"]],
+        "districts": [(lambda e=e: extract_district_from_text(e["text"]), e["expected"], e["text"])
+                      for e in corpus["districts"]],
+    }
+
+
+def check(all_cases: Dict[str, List[tuple]]) -> List[str]:
+    failures = []
+    for section, items in all_cases.items():
+        for fn, expected, label in items:
+            got = fn()
+            if got != expected:
+                failures.append(f"{section}: '{label}' → {got!r} (oczekiwane: {expected!r})")
+    return failures
+
+
+def time_calls(fns: List[Callable], loops: int, repeat: int) -> float:
+    """Najlepszy z `repeat` pomiarów; wynik w µs na jedno wywołanie."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            for fn in fns:
+                fn()
+        best = min(best, time.perf_counter() - t0)
+    return best / (loops * len(fns)) * 1e6
+
+
+def per_offer_calls(corpus: Dict[str, List[dict]]) -> List[Callable]:
+    """Pełna ekstrakcja tekstowa jednej oferty – wejścia z sekcji address + prices (cyklicznie)."""
+    prices = corpus["prices"]
+    out = []
+    for i, e in enumerate(corpus["address"]):
+        p = prices[i % len(prices)]
+
+        def offer(e=e, p=p):
+            _norm_title(e["title"] or "")
+            extract_address_for_geocode(e["header"], e["title"], e["desc"])
+            area_from_sources(e["title"], e["desc"])
+            prices_from_text(p["price"], p["additional"], p["section"], e["desc"] or p["desc"])
+            extract_district_from_text(e["desc"])
+        out.append(offer)
+    return out
+
+
+def run(loops: int, repeat: int) -> dict:
+    corpus = load_corpus()
+    all_cases = cases(corpus)
+    report: Dict[str, object] = {"failures": check(all_cases)}
+    timings = {section: round(time_calls([fn for fn, _, _ in items], loops, repeat), 2)
+               for section, items in all_cases.items()}
+    timings["per_offer"] = round(time_calls(per_offer_calls(corpus), loops, repeat), 2)
+    report["us_per_call"] = timings
+    report["cases"] = sum(len(v) for v in all_cases.values())
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regresja + benchmark ekstraktorów tekstowych")
+    parser.add_argument("--loops", type=int, default=200, help="przebiegi korpusu na pomiar")
+    parser.add_argument("--repeat", type=int, default=5, help="ile pomiarów (bierzemy najlepszy)")
+    parser.add_argument("--json", action="store_true", help="wynik jako JSON")
+    args = parser.parse_args()
+
+    rep = run(args.loops, args.repeat)
+    if args.json:
+        print(json.dumps(rep, ensure_ascii=False, indent=2))
+    else:
+        print(f"🧪 Korpus: {rep['cases']} przypadków, błędów: {len(rep['failures'])}")
+        for f in rep["failures"]:
+            print(f"  ❌ {f}")
+        print("⏱️ µs na wywołanie:")
+        for k, v in rep["us_per_call"].items():
+            print(f"   • {k}: {v}")
+    sys.exit(1 if rep["failures"] else 0)
@@ -0,0 +1,460 @@
+# scraping/extractors.py
+# Czyste funkcje ekstrakcji z tekstu (bez Playwrighta): tytuł, adres, metraż, ceny, dzielnica.
+# Wszystkie wzorce kompilowane raz przy imporcie – w gorącej ścieżce tylko .search/.sub.
+# Zachowanie pilnuje extract_corpus.json (python extract_bench.py).
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# --- słowniki pomocnicze ---
+DISTRICTS = {
+    # 18 dzielnic + dzielnice-zespoły
+    "Stare Miasto", "Grzegórzki", "Prądnik Czerwony", "Prądnik Biały", "Krowodrza",
+    "Bronowice", "Zwierzyniec", "Dębniki", "Łagiewniki-Borek Fałęcki",
+    "Swoszowice", "Podgórze Duchackie", "Bieżanów-Prokocim", "Podgórze",
+    "Czyżyny", "Mistrzejowice", "Bieńczyce", "Wzgórza Krzesławickie", "Nowa Huta",
+    # często używane zespoły/osiedla
+    "Kazimierz", "Zabłocie", "Płaszów", "Ruczaj", "Skotniki", "Kobierzyn",
+    "Łobzów", "Kleparz", "Piasek", "Nowy Świat", "Salwator", "Olsza",
+    "Azory", "Żabiniec", "Tonie", "Wola Duchacka", "Łęg", "Bielany",
+    "Stradom", "Ludwinów", "Dąbie", "Borek Fałęcki", "Prokocim", "Kozłówek",
+    "Przewóz", "Bieżanów", "Krowodrza Górka"
+}
+CITY_TOKENS = {"kraków", "małopolskie"}
+
+# forma znormalizowana (lower, bez końcowego 'e'/'y') → dzielnica; pierwsza wygrywa jak w pętli po DISTRICTS
+_DISTRICT_FORMS = {}
+for _item in DISTRICTS:
+    for _form in (_item.lower(), _item.lower().rstrip("e"), _item.lower().rstrip("y")):
+        _DISTRICT_FORMS.setdefault(_form, _item)
+
+_WS_RE = re.compile(r"\s+")
+
+# --- adres ---
+
+# Prefiksy ulicopodobne
+_PREFIX = (
+    r"(?:\bul\.?|\bulica\b|"          # ulica
+    r"\bal\.?|\baleja\b|\balei\b|"    # aleja
+    r"\bpl\.|\bplac\b|\bplacu\b|"     # plac
+    r"\bos\.?|\bosiedle\b|\bosiedlu\b|" # osiedle
+    r"\brondo\b|\brondzie\b|"         # rondo
+    r"\brynek\b|\brynek\b|"           # rynek (z zapasową literówką)
+    r"\bbulwary\b|\bbulwar\b)"        # bulwar(y)
+)
+
+# Uwaga: nazwę wymuszamy od DUŻEJ litery lub LICZBY (np. '29 Listopada')
+_UC = "A-ZĄĆĘŁŃÓŚŻŹ"
+_NAME_WORD = rf"(?:(?-i:[{_UC}][\w\-ąćęłńóśźż]+)|\d+)"   # dodano wariant z liczbą
+_NUM        = r"(?:\d+[A-Za-z]?)"                       # numer domu
+_NAME_SEQ_STRICT = rf"{_NAME_WORD}(?:\s+{_NAME_WORD}){{0,4}}(?:\s+{_NUM})?"  # np. '29 Listopada 98'
+
+# 1) Prefiksowane: 'ul./al./pl./os./rondo/rynek/bulwary ...'
+PREF_RE = re.compile(rf"{_PREFIX}\s+(?P<name>{_NAME_SEQ_STRICT})", re.U | re.I)
+
+# 2) „Gołe" nazwy z numerem — TYLKO w bardzo bezpiecznych kontekstach.
+#    a) linia zaczyna się od: Adres/ Ulica / ul.
+UNP_LINE_RE = re.compile(
+    rf"^\s*(?:adres|ulica|ul\.?)\s*[:\-]?\s*(?P<name>{_NAME_WORD}(?:\s+{_NAME_WORD}){{0,4}})\s+(?P<num>{_NUM})\b",
+    re.U | re.M | re.I
+)
+#    b) fraza 'przy (ul.|ulicy|alei|placu|os.) XYZ 12'
+UNP_PRZY_RE = re.compile(
+    rf"\bprzy\s+(?:(?:ul\.?|ulicy|alei|placu|os\.?)\s+)?(?P<name>{_NAME_WORD}(?:\s+{_NAME_WORD}){{0,4}})\s+(?P<num>{_NUM})\b",
+    re.U | re.I
+)
+
+# śmieci na ogonie nazwy (odetnij wszystko od tych znaczników)
+_TAIL_NOISE_RE = re.compile(
+    r"\b(eng|english|below|pl|ua|ru|studio|pets?|friendly|co-?work(?:ing)?|bez\s*prowizji|bezpośrednio)\b.*$",
+    re.I | re.U
+)
+
+# skróty stopni/tytułów rozwijane przed dopasowaniem
+_PRECLEAN = [(re.compile(pat, re.I), rep) for pat, rep in (
+    (r"\bppłk\.\s*", "Podpułkownika "),
+    (r"\bpłk\.\s*",  "Pułkownika "),
+    (r"\bpil\.\s*",  "Pilota "),
+    (r"\bgen\.\s*",  "Generała "),
+    (r"\bmjr\.\s*",  "Majora "),
+    (r"\bmaj\.\s*",  "Majora "),
+    (r"\bkpt\.\s*",  "Kapitana "),
+    (r"\bdr\.\s*",   "Doktora "),
+    (r"\bprof\.\s*", "Profesora "),
+    (r"\bks\.\s*",   "Księdza "),
+    (r"\bśw\.\s*",   "Św. "),
+)]
+_FIX_TITLES = [(re.compile(pat, re.I), rep) for pat, rep in (
+    (r"\bSw\.?\b", "Św."),
+    (r"\bgen\.?\b", "Generała"),
+    (r"\bpłk\.?\b", "Pułkownika"),
+    (r"\bprof\.?\b", "Profesora"),
+    (r"\bdr\.?\b", "Doktora"),
+)]
+_ROMAN = [(re.compile(r"\bIi\b"), "II"), (re.compile(r"\bIii\b"), "III"), (re.compile(r"\bIv\b"), "IV")]
+_TITLE_DOT_RE = re.compile(r"\b(Generała|Pułkownika|Doktora|Profesora|Księdza)\.\s+")
+
+_CSV_UL_RE = re.compile(r'^\s*ul\.\s+', re.I)
+_CSV_CITY_RE = re.compile(r',\s*Kraków\s*$', re.I)
+_CSV_AL29_RE = re.compile(r'^(al\.)\s*29\b(?!\s*Listopada)', re.I)
+
+_ID_RE = re.compile(r"-ID(\w+)$")
+
+_DISTRICT_NAME = r"([A-ZĄĆĘŁŃÓŚŻŹ][\w\-ąćęłńóśźż]+(?:\s+[A-ZĄĆĘŁŃÓŚŻŹ][\w\-ąćęłńóśźż]+)?)"
+_IN_DISTRICT_RE = re.compile(rf"w\s+dzielnic[yi]\s+{_DISTRICT_NAME}", re.I)
+_NA_W_RE = re.compile(rf"(?:na|w)\s+{_DISTRICT_NAME}", re.I)
+_INFLECTION_RE = re.compile(r"(u|ach|y|ie)$")
+
+# --- metraż (m2) ---
+
+_AREA_UNIT_RE = (
+    r"(?:m2|m\^2|m\s*2|m²|mkw|m\.\s*kw|m\s*kw|"
+    r"metr(?:ów|y)?\s*kw(?:\.|adratow(?:e|ych)?)?)"
+)
+_AREA_LABEL_RE = r"(?:powierzch\w*|metra(?:ż|z)|pow\.)"
+AREA_TEXT_RE = re.compile(rf"(\d{{1,3}}(?:[.,]\d{{1,2}})?)\s*{_AREA_UNIT_RE}\b", re.I)
+# np. 'Powierzchnia: ok. 41,60 m²' lub 'Pow.: 42'
+AREA_LABELED_RE = re.compile(
+    rf"{_AREA_LABEL_RE}\s*[:=\-]?\s*(?:ok\.?\s*)?"
+    rf"(\d{{1,3}}(?:[.,]\d{{1,2}})?)\s*(?:{_AREA_UNIT_RE})?",
+    re.I
+)
+
+# --- tytuł (klucz deduplikacji) ---
+_TITLE_AREA_RE = re.compile(r"\b\d{1,3}(?:[.,]\d{1,2})?\s*(?:m2|m²|m\s*2|m\s*kw|m\.\s*kw|mkw)\b")
+_TITLE_BOILERPLATE = ("do wynajęcia", "wynajem", "bez prowizji", "bezpośrednio", "english below", "eng",
+                      "oferta", "ogłoszenie", "kraków", "krakowie")
+_TITLE_JUNK_RE = re.compile(r"[^\wąćęłńóśżź\s-]")
+
+# --- ceny: najem + czynsz adm. ---
+
+_AMOUNT_RE = r"(\d[\d\s\u00A0.,]*)"  # cyfry z odstępami/nbsp/kropkami/przecinkami
+_CURRENCY_RE = r"(?:\s*(?:zł|pln))?"
+_NON_DIGIT_RE = re.compile(r"[^\d]")
+FIRST_AMOUNT_RE = re.compile(rf"{_AMOUNT_RE}\s*{_CURRENCY_RE}", re.I)
+_ADMIN_LABELS = (r"czynsz\s*administracyjny", r"opłaty?\s*administracyjne", r"adm\.")
+_CZYNSZ_RE = re.compile(rf"\bczynsz\b(?!\s*najmu)\s*[:=\-]?\s*{_AMOUNT_RE}\s*{_CURRENCY_RE}", re.I)
+
+
+def _norm_spaces(s: str) -> str:
+    return _WS_RE.sub(" ", (s or "").replace("\u00A0", " ")).strip()
+
+
+def _norm_title(s: Optional[str]) -> str:
+    if not s:
+        return ""
+    t = s.lower().replace("\u00A0", " ")
+    t = _WS_RE.sub(" ", t).strip()
+    # wytnij metraże i boilerplate
+    t = _TITLE_AREA_RE.sub("", t)
+    for w in _TITLE_BOILERPLATE:
+        if w in t:
+            t = t.replace(w, " ")
+    t = _TITLE_JUNK_RE.sub(" ", t)
+    return _WS_RE.sub(" ", t).strip()
+
+
+# --- metraż ---
+
+def _to_float_area(num_str: str) -> Optional[float]:
+    if not num_str: return None
+    try:
+        v = float(num_str.replace(",", ".").replace(" ", ""))
+        # sanity: mieszkania w widełkach ~10–300 m2
+        return v if 10 <= v <= 300 else None
+    except:
+        return None
+
+def _area_from_text(text: str) -> Optional[float]:
+    """Ogólny parser 'NN[,.]N unit' z sensownymi jednostkami."""
+    m = AREA_TEXT_RE.search(_norm_spaces(text).lower())
+    return _to_float_area(m.group(1)) if m else None
+
+def _area_from_labeled(text: str) -> Optional[float]:
+    """Parser z etykietą 'Powierzchnia:' – jednostka może być pominięta."""
+    m = AREA_LABELED_RE.search(_norm_spaces(text).lower())
+    return _to_float_area(m.group(1)) if m else None
+
+def area_from_sources(title: Optional[str], desc: str, table_value: Optional[str] = None
+                      ) -> Tuple[Optional[float], str]:
+    """(metraż_m2, źródło: 'tabela'|'tytuł'|'opis'|'') – kolejność jak w extract_area_m2."""
+    if table_value:
+        area = _area_from_text(table_value) or _area_from_labeled(table_value)
+        if area:
+            return area, "tabela"
+    # Tytuł (często „41,60 m²")
+    if title:
+        area = _area_from_labeled(title) or _area_from_text(title)
+        if area:
+            return area, "tytuł"
+    # Opis – najpierw wersja z etykietą, potem ogólna 'NN m²'
+    if desc:
+        area = _area_from_labeled(desc) or _area_from_text(desc)
+        if area:
+            return area, "opis"
+    return None, ""
+
+
+# --- adres ---
+
+def _preclean_for_match(text: str) -> str:
+    """Rozwiń skróty (płk., pil., gen., mjr., kpt., dr., prof., ks., św.) zanim dopasujemy regex."""
+    s = text or ""
+    for rx, rep in _PRECLEAN:
+        s = rx.sub(rep, s)
+    return s
+
+def _fix_titles(s: str) -> str:
+    for rx, rep in _FIX_TITLES:
+        s = rx.sub(rep, s)
+    s = " ".join(w[:1].upper()+w[1:] for w in s.split())
+    # rzymskie
+    for rx, rep in _ROMAN:
+        s = rx.sub(rep, s)
+    # znormalizuj przypadki z 'Generała.' → 'Generała '
+    return _TITLE_DOT_RE.sub(r"\1 ", s)
+
+def _canon_prefix(p: str) -> str:
+    p = p.lower()
+    if p.startswith("ul"): return "ul."
+    if p.startswith("al"): return "al."
+    if p.startswith("pl"): return "pl."
+    if p.startswith("os"): return "os."
+    if p.startswith("rondo"): return "rondo"
+    if p.startswith("rynek"): return "rynek"
+    if p.startswith("bulwar"): return "bulwary"
+    return p
+
+# mapa: 'słowo w nazwie' → (docelowy prefiks, czy usuwać pierwszy token z nazwy)
+_LEADING_NOUNS = {
+    "ulica": ("ul.", True), "ulicy": ("ul.", True),
+    "aleja": ("al.", True), "alei": ("al.", True),
+    "plac": ("pl.", True), "placu": ("pl.", True),
+    "osiedle": ("os.", True), "osiedlu": ("os.", True), "os.": ("os.", True),
+    "rondo": ("rondo", True), "rondzie": ("rondo", True),
+    "rynek": ("rynek", True), "rynku": ("rynek", True),
+    "bulwar": ("bulwary", True), "bulwary": ("bulwary", True),
+}
+
+def _drop_redundant_noun(prefix: str, name: str) -> Tuple[str, str]:
+    """Usuwa 'Ulica/Aleja/Plac/Osiedle/Rondo/Rynek' z początku nazwy jeśli powtórzone
+       i ewentualnie koryguje prefiks, gdy z UNPREFIXED zrobiliśmy omyłkowo 'ul.'."""
+    if not name: return prefix, name
+    first = name.split()[0].lower()
+    if first in _LEADING_NOUNS:
+        new_pref, drop = _LEADING_NOUNS[first]
+        if prefix != new_pref: prefix = new_pref
+        if drop: name = " ".join(name.split()[1:])
+    # Specjalny przypadek: 'al. Aleja …' / 'ul. Ulica …'
+    if prefix == "al." and first in {"aleja","alei"}:
+        name = " ".join(name.split()[1:])
+    if prefix == "ul." and first in {"ulica","ulicy"}:
+        name = " ".join(name.split()[1:])
+    return prefix, name
+
+def _strip_tail_noise(name: str) -> str:
+    return _TAIL_NOISE_RE.sub("", name).strip(" ,.;:-–—")
+
+def _extract_prefixed_first(text: str, *, forbid_rynek: bool = False) -> Optional[str]:
+    if not text:
+        return None
+    t = _preclean_for_match(_WS_RE.sub(" ", text))
+    m = PREF_RE.search(t)
+    if not m:
+        return None
+    raw = m.group(0)
+    prefix = _canon_prefix(raw.split()[0])
+    if forbid_rynek and prefix in ("rynek", "rondo"):
+        return None
+    name = _fix_titles(m.group("name"))
+    name = _strip_tail_noise(name)
+    prefix, name = _drop_redundant_noun(prefix, name)
+    return f"{prefix} {name}".strip() if name else None
+
+def _extract_unprefixed_strict(line_text: str) -> Optional[str]:
+    """Pracuje NA LINII (początek 'Adres/Ulica/ul.') lub fraza 'przy …'."""
+    if not line_text: return None
+    t = _WS_RE.sub(" ", line_text)
+    for rx in (UNP_LINE_RE, UNP_PRZY_RE):
+        m = rx.search(t)
+        if m:
+            name = _fix_titles(m.group("name"))
+            num  = m.group("num")
+            prefix = "ul."
+            # skoryguj prefiks po wiodącym rzeczowniku (Aleja/Alei/Plac/Os./Rondo/Rynek…)
+            prefix, name = _drop_redundant_noun(prefix, name)
+            name = _strip_tail_noise(name)
+            return f"{prefix} {name} {num}".strip()
+    return None
+
+def _lines(desc: str) -> List[str]:
+    raw = (desc or "").replace("•", "\n")
+    parts = [_WS_RE.sub(" ", p).strip(" -") for p in raw.splitlines()]
+    return [p for p in parts if p]
+
+def _remove_prefix_for_csv(address: str) -> str:
+    """Dla CSV zdejmujemy TYLKO 'ul.'; zostawiamy al./pl./os./rondo/rynek/bulwary."""
+    if not address:
+        return address
+    address = _CSV_UL_RE.sub('', address)          # wyłącznie 'ul.' z początku
+    address = _CSV_CITY_RE.sub('', address)        # ', Kraków' na końcu
+    # edge-case: 'al.  29' → 'al. 29 Listopada' (jeśli nie ma już 'Listopada')
+    address = _CSV_AL29_RE.sub(r'\1 29 Listopada', address)
+    return _WS_RE.sub(' ', address).strip()
+
+def extract_address_for_geocode(header_loc: Optional[str], title: Optional[str], desc: str) -> Optional[str]:
+    # 1) header/mapa – NAJPIERW
+    s = _extract_prefixed_first(header_loc or "")
+    if s: return s + ", Kraków"
+    # 2) tytuł
+    s = _extract_prefixed_first(title or "")
+    if s: return s + ", Kraków"
+    s = _extract_unprefixed_strict(title or "")
+    if s: return s + ", Kraków"
+    # 3) opis (ale bez 'rynek' i 'rondo')
+    for ln in _lines(desc):
+        s = _extract_unprefixed_strict(ln) or _extract_prefixed_first(ln, forbid_rynek=True)
+        if s: return s + ", Kraków"
+    return None
+
+
+# --- dzielnica / ID ---
+
+def extract_district_from_breadcrumbs(breadcrumbs: List[str]) -> Optional[str]:
+    # spróbuj wprost z breadcrumbs
+    for b in breadcrumbs:
+        bt = b.strip()
+        if bt and bt.lower() not in CITY_TOKENS and not bt.lower().startswith(("ul", "al", "pl", "os", "rondo", "rynek")):
+            # wybierz pierwszy token, który wygląda na dzielnicę/osiedle
+            if bt in DISTRICTS:
+                return bt
+    # fallback: weź ostatni “nie-miasto/nie-woj” okruszek
+    for b in reversed(breadcrumbs):
+        bt = b.strip()
+        if bt and bt.lower() not in CITY_TOKENS:
+            return bt
+    return None
+
+def extract_id(url: str) -> str:
+    m = _ID_RE.search(url)
+    return f"ID{m.group(1)}" if m else url.rsplit("/", 1)[-1]
+
+def extract_district_from_text(text: str) -> Optional[str]:
+    if not text:
+        return None
+    t = _WS_RE.sub(" ", text)
+
+    # 1) 'w dzielnicy X' / 'w dzielnicy Y-Z'
+    m = _IN_DISTRICT_RE.search(t)
+    if m:
+        cand = m.group(1).strip()
+        if cand in DISTRICTS:
+            return cand
+
+    # 2) 'na/w <rejon>' (Kazimierzu, Ruczaju, Bronowicach…) – sprawdzamy przeciwko słownikowi
+    m2 = _NA_W_RE.search(t)
+    if m2:
+        cand = m2.group(1).strip().rstrip(".,;:–—")
+        # sprostać odmianom: 'Kazimierzu'→'Kazimierz', 'Bronowicach'→'Bronowice'
+        norm = _INFLECTION_RE.sub("", cand)  # bardzo prosta normalizacja
+        return _DISTRICT_FORMS.get(norm.lower())
+
+    return None
+
+
+# --- ceny ---
+
+def _to_int_pln(s: str) -> Optional[int]:
+    """Z '2 300', '915 PLN', '790,00 zł' → 2300/915/790 (int).
+       Jeśli brak cyfr – None."""
+    if not s:
+        return None
+    digits = _NON_DIGIT_RE.sub("", s)
+    return int(digits) if digits else None
+
+def _first_amount(text: str) -> Optional[int]:
+    """Znajdź pierwszą kwotę z walutą (zł/PLN) – zwraca int."""
+    if not text:
+        return None
+    m = FIRST_AMOUNT_RE.search(text)
+    return _to_int_pln(m.group(1)) if m else None
+
+@lru_cache(maxsize=32)
+def _amount_after_re(label_re: str) -> "re.Pattern":
+    return re.compile(rf"{label_re}\s*[:=\-]?\s*{_AMOUNT_RE}\s*{_CURRENCY_RE}", re.I | re.U)
+
+def _parse_amount_after(label_re: str, text: str) -> Optional[int]:
+    """Znajdź kwotę po danym słowie-kluczu (np. 'Czynsz administracyjny')."""
+    if not text:
+        return None
+    m = _amount_after_re(label_re).search(text)
+    return _to_int_pln(m.group(1)) if m else None
+
+_RENT_HEADER_RE = _amount_after_re(r"(?:cena|price)?")
+_ADMIN_LABEL_RES = tuple(_amount_after_re(lab) for lab in _ADMIN_LABELS)
+
+def _extract_rent_from_header_text(text: str) -> Optional[int]:
+    """Wyciąga główną cenę najmu z headera (fallback na wypadek zmian selektora)."""
+    if not text:
+        return None
+    m = _RENT_HEADER_RE.search(text)  # praktycznie: weź pierwszą kwotę
+    return _to_int_pln(m.group(1)) if m else None
+
+def _extract_admin_from_text(text: str, rent_hint: Optional[int]=None) -> Optional[int]:
+    """Czynsz adm. z tekstu: preferuj wyrażenia 'czynsz administracyjny/opłaty adm.'.
+       'czynsz' samotny bierzemy tylko jeśli nie wygląda na 'czynsz najmu' i jest < rent_hint."""
+    if not text:
+        return None
+    # 1) najmocniejsze sygnały
+    for rx in _ADMIN_LABEL_RES:
+        m = rx.search(text)
+        val = _to_int_pln(m.group(1)) if m else None
+        if val: return val
+
+    # 2) „+ Czynsz 790 zł", „Czynsz: 850 zł" – z wykluczeniem frazy „najmu"
+    for m in _CZYNSZ_RE.finditer(text):
+        val = _to_int_pln(m.group(1))
+        if not val:
+            continue
+        # Odfiltruj ew. „czynsz najmu" (gdyby negatyw nie zadziałał przez dziwne białe znaki)
+        left = text[max(0, m.start()-30):m.start()].lower()
+        right = text[m.end():m.end()+20].lower()
+        if "najmu" in left or "najmu" in right:
+            continue
+        # Heurystyka: jeśli mamy podpowiedź ceny najmu, a „czynsz" >= najem*0.8 — pewnie to nie adm.
+        if rent_hint and val >= int(0.8 * rent_hint):
+            continue
+        return val
+    return None
+
+def prices_from_text(price_text: str, additional_text: str, section_text: str, desc_text: str
+                     ) -> Tuple[Optional[int], Optional[int], str]:
+    """(najem_pln, czynsz_adm_pln, źródło_czynszu) z tekstów headera cenowego i opisu:
+       price_text – [data-cy=adPageHeaderPrice], additional_text – „+ Czynsz …”,
+       section_text – cały blok cenowy (fallback)."""
+    rent = _first_amount(price_text) or _extract_rent_from_header_text(section_text)
+    for text, src in ((additional_text, "header"), (section_text, "header"), (desc_text, "opis")):
+        admin = _extract_admin_from_text(text, rent)
+        if admin:
+            return rent, admin, src
+    return rent, None, ""
+
+
+# --- karta listingu (tylko kolejność pobierania – wartości do CSV i tak bierzemy ze strony oferty) ---
+
+_CARD_PRICE_RE = re.compile(r"(\d{1,3}(?:[ \u00A0]\d{3})+|\d+)(?:,\d{2})?\s*(?:zł|pln)(?!\s*/\s*m)", re.I)
+
+def card_signals(card_text: str, location: str = "", title: str = ""
+                 ) -> Tuple[Optional[int], Optional[float], Optional[str]]:
+    """(najem_pln, metraż_m2, dzielnica) z tekstu karty listingu; brak sygnału → None.
+       Cena: pierwsza kwota z walutą w obrębie jednej linii (bez 'zł/m²'); dzielnica: z lokalizacji
+       karty ('ul. X, Kazimierz, Stare Miasto, Kraków'), a gdy jej brak – z tytułu ('na Kazimierzu')."""
+    price = None
+    for line in (card_text or "").splitlines():
+        m = _CARD_PRICE_RE.search(line)
+        if m:
+            price = _to_int_pln(m.group(1))
+            break
+    area = _area_from_text(card_text) if card_text else None
+    district = next((p.strip() for p in (location or "").split(",") if p.strip() in DISTRICTS), None)
+    return price, area, district or extract_district_from_text(title)
@@ -0,0 +1,80 @@
+# scraping/interest.py
+# Kolejność pobierania NOWYCH ofert w runie – kolejka priorytetowa zamiast kolejności stron listingu.
+# Wynik z sygnałów karty listingu (price/area/district z collect_listing_entries_fast): dzielnica,
+# pasmo ceny, metraż, świeżość + preferencje poniżej. Run przerwany w połowie (blokada, TARGET_OFFERS)
+# zużył budżet na oferty, na których nam zależy, a nie na przypadkowe. To jedyne miejsce z preferencjami –
+# recrawl.py ocenia nimi (preference()) znane oferty.
+import heapq
+import itertools
+from typing import List, Optional, Tuple
+
+PREF_DISTRICTS = {"Stare Miasto", "Kazimierz", "Krowodrza", "Grzegórzki", "Zwierzyniec",
+                  "Podgórze", "Zabłocie", "Dębniki", "Kleparz", "Łobzów", "Salwator"}
+PREF_RENT = (2200, 3600)     # PLN – w paśmie 1.0, poza nim liniowo w dół ...
+PREF_RENT_SLACK = 1200       # ... do 0 w odległości tylu PLN od pasma
+PREF_AREA = (35, 65)         # m²
+PREF_AREA_SLACK = 20
+FRESH_HORIZON = 720          # pozycja w listingu (licząc od 1. strony), od której świeżość = 0
+UNKNOWN = 0.5                # brak sygnału na karcie – neutralnie (ani premia, ani kara)
+
+# wagi składowych (każda składowa 0..1)
+W_DISTRICT = 1.0
+W_PRICE = 0.8
+W_AREA = 0.4
+W_FRESH = 0.3
+W_PREF = W_DISTRICT + W_PRICE + W_AREA
+
+
+def _band(value: Optional[float], band: Tuple[float, float], slack: float) -> float:
+    if value is None:
+        return UNKNOWN
+    lo, hi = band
+    if lo <= value <= hi:
+        return 1.0
+    dist = lo - value if value < lo else value - hi
+    return max(0.0, 1.0 - dist / slack)
+
+
+def _fit(district: Optional[str], price: Optional[float], area: Optional[float]) -> float:
+    d = UNKNOWN if not district else (1.0 if district in PREF_DISTRICTS else 0.0)
+    return (W_DISTRICT * d
+            + W_PRICE * _band(price, PREF_RENT, PREF_RENT_SLACK)
+            + W_AREA * _band(area, PREF_AREA, PREF_AREA_SLACK))
+
+
+def preference(district: Optional[str], price: Optional[float], area: Optional[float] = None) -> float:
+    """Dopasowanie oferty do preferencji PREF_* (0..1); None/"" = brak sygnału."""
+    return _fit(district, price, area) / W_PREF
+
+
+def priority(entry: dict, rank: int) -> float:
+    """rank – pozycja wpisu w listingu tego runu (0 = pierwszy na 1. stronie). Na listingu od
+       najnowszych (--incremental) to wprost wiek; na domyślnym – przybliżenie."""
+    fresh = max(0.0, 1.0 - rank / FRESH_HORIZON)
+    return _fit(entry.get("district"), entry.get("price"), entry.get("area")) + W_FRESH * fresh
+
+
+class OfferQueue:
+    """Kolejka wpisów listingu wg priority() (heapq; remis → kolejność z listingu)."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, dict]] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, entry: dict, rank: int) -> float:
+        entry["score"] = round(priority(entry, rank), 3)
+        self.requeue(entry)
+        return entry["score"]
+
+    def requeue(self, entry: dict):
+        """Z powrotem do kolejki z już policzonym wynikiem (np. gdy zabrakło budżetu requestów)."""
+        heapq.heappush(self._heap, (-entry["score"], next(self._seq), entry))
+
+    def pop(self) -> dict:
+        return heapq.heappop(self._heap)[2]
+
+    def pop_batch(self, n: int) -> List[dict]:
+        return [self.pop() for _ in range(min(n, len(self._heap)))]
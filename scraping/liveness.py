@@ -0,0 +1,153 @@
+# scraping/liveness.py
+# Przebieg "czy oferta jeszcze wisi" – chodzi WYŁĄCZNIE po stronach listingu
+# (1 request na 72 oferty), bez wchodzenia w żadne ogłoszenie.
+import asyncio
+import csv
+import json
+import random
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+from otodom_scraping import (
+    LISTING_BASE, CloudflareBlocked, CloudfrontBlocked,
+    open_browser_context, open_listing_page, extract_id,
+)
+
+LIVENESS_FILE = "../data/liveness.json"
+RESULTS_FILE = "../data/otodom_results.csv"
+DELIST_AFTER_MISSES = 3   # ile kolejnych PEŁNYCH przebiegów bez oferty → delisted
+MAX_PAGES = 200           # bezpiecznik na wypadek pętli paginacji
+LISTING_RETRIES = 2       # timeout strony listingu → tyle ponownych prób, potem przebieg niekompletny
+
+
+def load_liveness(path: str) -> Dict[str, dict]:
+    """{id: {"url", "first_seen", "last_seen", "misses", "status", "delisted_at"}}"""
+    p = Path(path)
+    if not p.exists():
+        return {}
+    try:
+        with p.open("r", encoding="utf-8") as f:
+            return json.load(f).get("offers", {})
+    except (json.JSONDecodeError, ValueError, AttributeError) as e:
+        print(f"⚠️ Błąd w pliku liveness {path}: {e} — zaczynam od zera")
+        return {}
+
+
+def save_liveness(path: str, offers: Dict[str, dict]):
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with p.open("w", encoding="utf-8") as f:
+        json.dump({"updated": int(time.time()), "offers": offers}, f, ensure_ascii=False, indent=2)
+
+
+def seed_from_results(offers: Dict[str, dict], results_csv: str):
+    """Dorzuca do śledzenia oferty z CSV, których jeszcze nie znamy (first_seen nieznany)."""
+    p = Path(results_csv)
+    if not p.exists():
+        return
+    with p.open("r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            oid = row.get("id")
+            if oid and oid not in offers:
+                offers[oid] = {"url": row.get("url"), "first_seen": None, "last_seen": None,
+                               "misses": 0, "status": "active", "delisted_at": None}
+
+
+def apply_pass(offers: Dict[str, dict], seen: Dict[str, str], ts: int, complete: bool,
+               delist_after: int = DELIST_AFTER_MISSES) -> Dict[str, int]:
+    """Nanosi wynik przebiegu. `seen` = {id: url} z listingu.
+       Pudła liczymy tylko dla przebiegu kompletnego – urwany listing niczego nie dowodzi."""
+    stats = {"seen": 0, "new": 0, "missed": 0, "delisted": 0, "relisted": 0}
+    for oid, url in seen.items():
+        e = offers.get(oid)
+        if e is None:
+            offers[oid] = {"url": url, "first_seen": ts, "last_seen": ts,
+                           "misses": 0, "status": "active", "delisted_at": None}
+            stats["new"] += 1
+            continue
+        if e.get("status") == "delisted":
+            stats["relisted"] += 1
+        e.update({"url": url, "last_seen": ts, "misses": 0, "status": "active", "delisted_at": None})
+        if not e.get("first_seen"):
+            e["first_seen"] = ts
+        stats["seen"] += 1
+
+    if not complete:
+        return stats
+    for oid, e in offers.items():
+        if oid in seen or e.get("status") == "delisted":
+            continue
+        e["misses"] = int(e.get("misses") or 0) + 1
+        stats["missed"] += 1
+        if e["misses"] >= delist_after:
+            e["status"] = "delisted"
+            e["delisted_at"] = ts
+            stats["delisted"] += 1
+    return stats
+
+
+async def walk_listing(page, listing_base: str = LISTING_BASE,
+                       max_pages: int = MAX_PAGES) -> Tuple[Dict[str, str], bool]:
+    """Zwraca ({id: url}, complete) – complete=True tylko gdy ZAŁADOWAŁA się pusta strona albo
+       powtórka poprzedniej. Strona, która mimo ponowień się nie wczytała, daje complete=False
+       (inaczej oferty z nieodwiedzonych stron dostałyby pudła)."""
+    seen: Dict[str, str] = {}
+    for current_page in range(1, max_pages + 1):
+        for attempt in range(LISTING_RETRIES + 1):
+            try:
+                entries = await open_listing_page(page, f"{listing_base}&page={current_page}")
+                break
+            except PlaywrightTimeoutError as e:
+                if current_page == 1 and attempt == LISTING_RETRIES:
+                    raise
+                print(f"⚠️ Strona {current_page}: timeout ({attempt + 1}/{LISTING_RETRIES + 1}): {e}")
+                await asyncio.sleep(random.uniform(2.0, 4.0))
+        else:
+            print(f"⚠️ Strona {current_page} się nie wczytała – przebieg niekompletny")
+            return seen, False
+        fresh = 0
+        for it in entries:
+            oid = extract_id(it["url"])
+            if oid not in seen:
+                seen[oid] = it["url"]
+                fresh += 1
+        print(f"📄 Strona {current_page}: {len(entries)} ofert (nowych w przebiegu: {fresh})")
+        # pusta strona albo powtórka poprzedniej (otodom za ostatnią stroną zwraca ostatnią) → koniec
+        if not entries or fresh == 0:
+            return seen, True
+        await asyncio.sleep(random.uniform(1.0, 2.0))
+    print(f"⚠️ Osiągnięto MAX_PAGES={max_pages} – przebieg niekompletny")
+    return seen, False
+
+
+async def main():
+    offers = load_liveness(LIVENESS_FILE)
+    seed_from_results(offers, RESULTS_FILE)
+    print(f"🧠 Śledzonych ofert: {len(offers)}")
+
+    ts = int(time.time())
+    seen: Dict[str, str] = {}
+    complete = False
+    async with async_playwright() as p:
+        browser, context, page = await open_browser_context(p)
+        try:
+            seen, complete = await walk_listing(page)
+        except (CloudflareBlocked, CloudfrontBlocked) as e:
+            print(f"🛑 Blokada w trakcie przebiegu: {e} — pudeł nie liczę.")
+        except Exception as e:
+            print(f"⚠️ Nieoczekiwany błąd: {e} — pudeł nie liczę.")
+        await browser.close()
+
+    stats = apply_pass(offers, seen, ts, complete)
+    save_liveness(LIVENESS_FILE, offers)
+    active = sum(1 for e in offers.values() if e.get("status") == "active")
+    print(f"\n✅ Widziane: {stats['seen']} | nowe: {stats['new']} | pudła: {stats['missed']} | "
+          f"zdjęte teraz: {stats['delisted']} | wróciły: {stats['relisted']}")
+    print(f"📊 Aktywnych: {active}/{len(offers)} → {LIVENESS_FILE}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,321 @@
+# scraping/multi_search.py
+# Kilka wyszukiwań otodom (searches.json) w jednym przebiegu i jednej przeglądarce:
+#   - wspólny budżet grzecznościowy: minimalny odstęp między KAŻDYMI dwoma requestami (listing
+#     i oferta) + twardy limit requestów na cały run – więcej wyszukiwań ≠ więcej ryzyka bana,
+#   - sprawiedliwość: smooth weighted round-robin – kolejne zadanie (strona listingu albo oferta)
+#     bierzemy z wyszukiwania o największym "długu" względem wagi; żadne nie zagłodzi reszty,
+#   - wspólna deduplikacja: ID + znormalizowany tytuł rezerwowane w runie i SeenStore między runami –
+#     oferta znaleziona przez dwa wyszukiwania (np. nachodzące pasma cen) jest pobierana raz.
+#   - w obrębie wyszukiwania oferty idą wg zainteresowania (interest.py), nie w kolejności listingu.
+# Ekstrakcja i zapis jak w otodom_scraping (scrape_offer, RESULT_SCHEMA, sinki).
+#   python multi_search.py                 # wszystkie "enabled" z searches.json
+#   python multi_search.py --only krakow-sprzedaz --max-requests 200
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from playwright.async_api import async_playwright
+
+from otodom_scraping import (
+    BLACKLIST_FILE, CONCURRENCY, OFFERS_PER_PAGE, OUTPUT_SINKS, RESULT_SCHEMA, RESULTS_FILE, SAVE_EVERY,
+    SEEN_DB, SEEN_TTL_DAYS, TITLES_FILE, CloudflareBlocked, CloudfrontBlocked, _norm_title, extract_id,
+    open_browser_context, open_listing_page, scrape_offer,
+)
+from common.logs import LOG_DIR, get_logger, kv, setup_logging   # sys.path z korzeniem repo ustawia otodom_scraping
+from common.metrics import METRICS, METRICS_DIR
+from common.sinks import SINK_KINDS, open_sinks
+from interest import OfferQueue
+from seen_store import SeenStore
+
+SEARCHES_FILE = "searches.json"
+MAX_REQUESTS = 1500          # domyślny budżet, jeśli searches.json go nie podaje
+REQUESTS_PER_MINUTE = 40
+JITTER_S = 0.6
+LISTING_RETRIES = 2          # nieudana strona listingu wraca do kolejki tyle razy, potem ją pomijamy
+
+log = get_logger("multi_search")
+
+
+@dataclass
+class Search:
+    name: str
+    url: str
+    weight: int = 1
+    target: int = 200
+    max_pages: int = 30
+    output: str = RESULTS_FILE
+    enabled: bool = True
+    # stan w trakcie runu
+    next_page: int = 1
+    listing_busy: bool = False     # strona listingu właśnie się pobiera (jedna naraz na wyszukiwanie)
+    listing_failures: int = 0      # nieudane próby bieżącej strony listingu
+    exhausted: bool = False        # koniec wyników (pusta strona) / max_pages / target
+    queue: OfferQueue = field(default_factory=OfferQueue)   # nowe oferty wg zainteresowania (interest.py)
+    in_flight: int = 0
+    collected: int = 0
+    requests: int = 0
+    duplicates: int = 0
+    current_weight: int = 0        # licznik smooth WRR
+
+    def listing_url(self, page_no: int) -> str:
+        url = self.url if "limit=" in self.url else f"{self.url}{'&' if '?' in self.url else '?'}limit={OFFERS_PER_PAGE}"
+        return f"{url}&page={page_no}"
+
+    def runnable(self) -> bool:
+        if self.collected + self.in_flight >= self.target:
+            return False
+        if self.next_page > self.max_pages:
+            self.exhausted = True
+        return bool(self.queue) or (not self.exhausted and not self.listing_busy)
+
+
+def load_searches(path: str = SEARCHES_FILE, only: Optional[List[str]] = None) -> Tuple[List[Search], dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    defaults = cfg.get("defaults", {})
+    searches = []
+    for raw in cfg.get("searches", []):
+        s = Search(**{**defaults, **{k: v for k, v in raw.items() if not k.startswith("_")}})
+        if (only and s.name in only) or (not only and s.enabled):
+            searches.append(s)
+    names = [s.name for s in searches]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Powtórzone nazwy wyszukiwań w {path}")
+    return searches, cfg.get("budget", {})
+
+
+class Politeness:
+    """Wspólny limit: min. odstęp między startami requestów (+ losowy jitter) i budżet całkowity."""
+
+    def __init__(self, max_requests: int, per_minute: float, jitter_s: float = JITTER_S):
+        self.max_requests = max_requests
+        self.gap = 60.0 / per_minute if per_minute else 0.0
+        self.jitter_s = jitter_s
+        self.used = 0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.used >= self.max_requests
+
+    async def acquire(self) -> bool:
+        """Czeka na swoją kolej; False = budżet wyczerpany (request nie powinien wyjść)."""
+        async with self._lock:
+            if self.exhausted:
+                return False
+            self.used += 1
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.gap + random.uniform(0, self.jitter_s)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+
+class Scheduler:
+    """Wybór następnego zadania: smooth weighted round-robin po wyszukiwaniach, które mają co robić."""
+
+    def __init__(self, searches: List[Search], budget: Politeness, store: SeenStore):
+        self.searches = searches
+        self.budget = budget
+        self.store = store
+        self.claimed_ids: Set[str] = set()      # ID ofert zarezerwowane w tym runie (wszystkie wyszukiwania)
+        self.claimed_titles: Set[str] = set()
+        self.changed = asyncio.Condition()
+        self.blocked = False
+
+    def _pick(self) -> Optional[Search]:
+        ready = [s for s in self.searches if s.runnable()]
+        if not ready:
+            return None
+        total = sum(s.weight for s in ready)
+        for s in ready:
+            s.current_weight += s.weight
+        best = max(ready, key=lambda s: s.current_weight)
+        best.current_weight -= total
+        return best
+
+    async def next_job(self):
+        """('offer', search, entry) | ('listing', search, page_no) | None gdy koniec."""
+        async with self.changed:
+            while True:
+                if self.blocked or self.budget.exhausted:
+                    return None
+                s = self._pick()
+                if s is None and not any(x.in_flight or x.listing_busy for x in self.searches):
+                    return None                  # nic do zrobienia i nic w toku – koniec
+                if s is not None:
+                    if s.queue:
+                        s.in_flight += 1
+                        return "offer", s, s.queue.pop()
+                    s.listing_busy = True
+                    page_no, s.next_page = s.next_page, s.next_page + 1
+                    return "listing", s, page_no
+                await self.changed.wait()        # wszyscy czekają na listing/ofertę w toku
+
+    async def notify(self):
+        async with self.changed:
+            self.changed.notify_all()
+
+    def accept_entries(self, s: Search, entries: List[dict], page_no: int = 1) -> int:
+        """Wspólna deduplikacja: ID i tytuł w runie + znane tytuły z poprzednich runów."""
+        fresh = 0
+        for pos, it in enumerate(entries):
+            oid, t_norm = extract_id(it["url"]), _norm_title(it["title"])
+            if not t_norm:
+                continue
+            if oid in self.claimed_ids or t_norm in self.claimed_titles:
+                s.duplicates += 1
+                continue
+            status = self.store.lookup(t_norm)
+            if status:
+                if status == "seen":
+                    self.store.touch(t_norm)
+                continue
+            self.claimed_ids.add(oid)
+            self.claimed_titles.add(t_norm)
+            s.queue.push(it, (page_no - 1) * OFFERS_PER_PAGE + pos)
+            fresh += 1
+        return fresh
+
+
+async def worker(wid: int, context, sched: Scheduler, sinks: Dict[str, object]):
+    listing_page = await context.new_page()
+    try:
+        while True:
+            job = await sched.next_job()
+            if job is None:
+                return
+            kind, s, arg = job
+            try:
+                if not await sched.budget.acquire():
+                    if kind == "offer":
+                        s.queue.requeue(arg)
+                    continue
+                s.requests += 1
+                METRICS.inc("multi_search_requests_total", search=s.name, kind=kind)
+                if kind == "listing":
+                    await run_listing(listing_page, s, arg, sched)
+                else:
+                    await run_offer(context, s, arg, sched, sinks[s.output])
+            except (CloudflareBlocked, CloudfrontBlocked) as e:
+                log.error("🚨 Blokada (%s): %s — kończę wszystkie wyszukiwania", s.name, e,
+                          extra=kv(search=s.name, stage="block_check"))
+                sched.blocked = True
+            finally:
+                if kind == "listing":
+                    s.listing_busy = False
+                else:
+                    s.in_flight -= 1
+                await sched.notify()
+    finally:
+        await listing_page.close()
+
+
+async def run_listing(page, s: Search, page_no: int, sched: Scheduler):
+    try:
+        with METRICS.timer("scrape_listing_seconds"):
+            entries = await open_listing_page(page, s.listing_url(page_no))
+    except (CloudflareBlocked, CloudfrontBlocked):
+        raise
+    except Exception as e:
+        # timeout / błąd sieci to nie koniec wyników – ta sama strona jeszcze raz (przez scheduler i budżet)
+        s.listing_failures += 1
+        retry = s.listing_failures <= LISTING_RETRIES
+        log.warning("[%s] Listing str. %d nieudany (%d/%d)%s: %s", s.name, page_no, s.listing_failures,
+                    LISTING_RETRIES + 1, "" if retry else " – pomijam stronę", e,
+                    extra=kv(search=s.name, stage="listing", page=page_no, attempt=s.listing_failures))
+        if retry:
+            s.next_page = page_no
+        else:
+            s.listing_failures = 0
+        return
+    s.listing_failures = 0
+    if not entries:
+        s.exhausted = True
+        return
+    fresh = sched.accept_entries(s, entries, page_no)
+    if page_no >= s.max_pages:
+        s.exhausted = True
+    log.info("📄 [%s] str. %d: %d ofert, nowe: %d", s.name, page_no, len(entries), fresh,
+             extra=kv(search=s.name, stage="listing", page=page_no, entries=len(entries), fresh=fresh))
+
+
+async def run_offer(context, s: Search, entry: dict, sched: Scheduler, sink):
+    offer_page = await context.new_page()
+    try:
+        res = await scrape_offer(offer_page, entry["url"], sched.store.seen, sched.store.blacklist)
+    except (CloudflareBlocked, CloudfrontBlocked):
+        raise
+    except Exception as e:
+        log.warning("[%s] Błąd przy %s: %s", s.name, entry["url"], e,
+                    extra=kv(search=s.name, offer_id=extract_id(entry["url"]), stage="offer"))
+        res = None
+    finally:
+        await offer_page.close()
+    if res:
+        sink.write([res])
+        s.collected += 1
+        if res.get("title"):
+            sched.store.mark_seen(_norm_title(res["title"]), entry["url"])
+
+
+async def main(searches_file: str = SEARCHES_FILE, only: Optional[List[str]] = None,
+               max_requests: Optional[int] = None, sinks: str = OUTPUT_SINKS):
+    setup_logging("multi_search", log_dir=LOG_DIR)
+    METRICS.reset("scraper")
+    searches, budget_cfg = load_searches(searches_file, only)
+    if not searches:
+        print(f"❌ Brak aktywnych wyszukiwań w {searches_file}")
+        return
+    budget = Politeness(max_requests or budget_cfg.get("max_requests", MAX_REQUESTS),
+                        budget_cfg.get("requests_per_minute", REQUESTS_PER_MINUTE),
+                        budget_cfg.get("jitter_s", JITTER_S))
+    print(f"🔎 Wyszukiwania: {', '.join(f'{s.name}(w={s.weight}, cel={s.target})' for s in searches)}")
+    print(f"🚦 Budżet: {budget.max_requests} requestów, ≤{60 / budget.gap if budget.gap else float('inf'):.0f}/min, "
+          f"{CONCURRENCY} naraz")
+
+    outputs = {}
+    for s in searches:
+        if s.output not in outputs:
+            outputs[s.output] = open_sinks(sinks, RESULT_SCHEMA, s.output, batch_size=SAVE_EVERY)
+    store = SeenStore(SEEN_DB, SEEN_TTL_DAYS, TITLES_FILE, BLACKLIST_FILE)
+    sched = Scheduler(searches, budget, store)
+    t0 = time.perf_counter()
+
+    async with async_playwright() as p:
+        browser, context, page = await open_browser_context(p)
+        budget.used += 1                # homepage + cookies z open_browser_context
+        store.start()
+        try:
+            await asyncio.gather(*(worker(i, context, sched, outputs) for i in range(CONCURRENCY)))
+        finally:
+            for sink in outputs.values():
+                sink.close()
+            await store.aclose()
+            await browser.close()
+
+    print(f"\n🎉 Zakończono w {time.perf_counter() - t0:.0f} s | requesty: {budget.used}/{budget.max_requests}"
+          f"{' | 🛑 blokada' if sched.blocked else ''}")
+    for s in searches:
+        print(f"   • {s.name}: {s.collected}/{s.target} ofert, {s.requests} requestów, "
+              f"duplikaty z innych wyszukiwań/stron: {s.duplicates}, stron: {s.next_page - 1}")
+    for path, sink in outputs.items():
+        print(f"💾 {sink.written} rekordów → {sink.describe()}")
+    print(f"📈 Metryki → {METRICS.export_jsonl(METRICS_DIR)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kilka wyszukiwań otodom ze wspólnym budżetem i deduplikacją")
+    parser.add_argument("--config", default=SEARCHES_FILE, help="plik z wyszukiwaniami")
+    parser.add_argument("--only", nargs="+", default=None, help="uruchom tylko te wyszukiwania (po nazwie)")
+    parser.add_argument("--max-requests", type=int, default=None, help="nadpisuje budget.max_requests")
+    parser.add_argument("--sinks", default=OUTPUT_SINKS,
+                        help=f"formaty wyjścia, po przecinku: {', '.join(SINK_KINDS)}")
+    args = parser.parse_args()
+    asyncio.run(main(args.config, args.only, args.max_requests, args.sinks))
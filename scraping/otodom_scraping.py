@@ -1,14 +1,30 @@
 # scraping/otodom_locations.py
+import argparse
 import asyncio
 import csv
+import json
 import random
-import re
+import sys
 import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Tuple, Iterable, Dict, Set
+from typing import Container, List, Optional, Tuple, Iterable, Dict, Set
 
 from playwright.async_api import async_playwright, Page
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.logs import LOG_DIR, get_logger, kv, setup_logging
+from common.metrics import METRICS, METRICS_DIR
+from common.profiling import PROFILE_DIR, SNAPSHOT_EVERY, run_profiled, tick as profile_tick
+from common.sinks import SINK_KINDS, open_sinks
+from seen_store import SeenStore
+from extractors import (  # czyste parsowanie tekstu (extract_id używają też liveness/recrawl)
+    _area_from_labeled, _area_from_text, _norm_spaces, _norm_title, _remove_prefix_for_csv,
+    area_from_sources, card_signals, extract_address_for_geocode, extract_id, prices_from_text,
+)
+from interest import OfferQueue
+
+HOMEPAGE_URL = "https://www.otodom.pl/"
 LISTING_BASE = ("https://www.otodom.pl/pl/wyniki/wynajem/mieszkanie/"
                 "malopolskie/krakow/krakow/krakow?limit=72&by=DEFAULT&direction=DESC")
 
@@ -16,25 +32,25 @@ LISTING_BASE = ("https://www.otodom.pl/pl/wyniki/wynajem/mieszkanie/"
 TARGET_OFFERS = 400  # Ile ofert chcemy zebrać (może być więcej niż na jednej stronie)
 OFFERS_PER_PAGE =72  # Ile ofert jest na jednej stronie
 SAVE_EVERY = 10  # zapisuj co X rekordów
-TITLES_FILE = "../data/seen_titles.txt"
+LOOKAHEAD = 1.5  # listing czytamy, aż w kolejce jest LOOKAHEAD × brakujących ofert – z tej puli najpierw najciekawsze
+RESULTS_FILE = "../data/otodom_results.csv"
+RESULT_SCHEMA = {"id": "str", "title": "str", "ulica": "str", "metraz_m2": "float",
+                 "najem_pln": "int", "czynsz_adm_pln": "int", "url": "str"}
+OUTPUT_SINKS = "csv"  # np. "csv,parquet,sqlite" – obok RESULTS_FILE z innym rozszerzeniem
+LOG_LEVEL = "INFO"    # terminal; pełne rekordy JSON idą do ../data/logs/scraper.jsonl
+SAVE_HTML_DIR: Optional[str] = None  # --save-html: surowy HTML ofert → ponowna ekstrakcja (reextract.py)
+TITLES_FILE = "../data/seen_titles.txt"     # stary format – jednorazowa migracja do SEEN_DB
 BLACKLIST_FILE = "../data/blacklist.txt"
-TITLES_LOCK = asyncio.Lock()
-
-# --- słowniki pomocnicze ---
-DISTRICTS = {
-    # 18 dzielnic + dzielnice-zespoły
-    "Stare Miasto", "Grzegórzki", "Prądnik Czerwony", "Prądnik Biały", "Krowodrza",
-    "Bronowice", "Zwierzyniec", "Dębniki", "Łagiewniki-Borek Fałęcki",
-    "Swoszowice", "Podgórze Duchackie", "Bieżanów-Prokocim", "Podgórze",
-    "Czyżyny", "Mistrzejowice", "Bieńczyce", "Wzgórza Krzesławickie", "Nowa Huta",
-    # często używane zespoły/osiedla
-    "Kazimierz", "Zabłocie", "Płaszów", "Ruczaj", "Skotniki", "Kobierzyn",
-    "Łobzów", "Kleparz", "Piasek", "Nowy Świat", "Salwator", "Olsza",
-    "Azory", "Żabiniec", "Tonie", "Wola Duchacka", "Łęg", "Bielany",
-    "Stradom", "Ludwinów", "Dąbie", "Borek Fałęcki", "Prokocim", "Kozłówek",
-    "Przewóz", "Bieżanów", "Krowodrza Górka"
-}
-CITY_TOKENS = {"kraków", "małopolskie"}
+SEEN_DB = "../data/seen.sqlite"             # tytuł → first/last_seen, url, status (seen_store.py)
+SEEN_TTL_DAYS = 30                          # tytuł niewidziany tyle dni znów jest "nowy" (przelistowanie)
+
+# --- Tryb przyrostowy: listing od najnowszych + watermark ---
+LISTING_NEWEST = ("https://www.otodom.pl/pl/wyniki/wynajem/mieszkanie/"
+                  "malopolskie/krakow/krakow/krakow?limit=72&by=LATEST&direction=DESC")
+WATERMARK_FILE = "../data/watermark.json"
+WATERMARK_KEEP = 3000  # ile ostatnio widzianych ID trzymamy w watermarku
+
+log = get_logger("scraper")
 
 # --- Detekcja blokady CloudFront ---
 class CloudfrontBlocked(Exception):
@@ -93,149 +109,51 @@ async def _detect_cloudflare_block(page: Page):
         soft_markers = ("checking your browser", "please wait while we verify", "access denied")
         for m in soft_markers:
             if m in html.lower() or m in title:
-                print(f"[CF-soft] Marker: {m} (nie przerywam)")
+                log.info("[CF-soft] Marker: %s (nie przerywam)", m, extra=kv(stage="block_check", marker=m))
                 
     except (CloudflareBlocked, CloudfrontBlocked):
         raise
     except Exception as e:
         # Inne błędy - loguj ale nie przerywaj
-        print(f"[WARN] Błąd podczas sprawdzania blokady: {e}")
+        log.warning("Błąd podczas sprawdzania blokady: %s", e, extra=kv(stage="block_check"))
         return
 
-# --- Minimalny, ale szczelny ekstraktor adresu (geo-friendly) ---
-
-from typing import Tuple
-
-# Prefiksy ulicopodobne
-_PREFIX = (
-    r"(?:\bul\.?|\bulica\b|"          # ulica
-    r"\bal\.?|\baleja\b|\balei\b|"    # aleja
-    r"\bpl\.|\bplac\b|\bplacu\b|"     # plac
-    r"\bos\.?|\bosiedle\b|\bosiedlu\b|" # osiedle
-    r"\brondo\b|\brondzie\b|"         # rondo
-    r"\brynek\b|\brynek\b|"           # rynek (z zapasową literówką)
-    r"\bbulwary\b|\bbulwar\b)"        # bulwar(y)
-)
-
-# Uwaga: nazwę wymuszamy od DUŻEJ litery lub LICZBY (np. '29 Listopada')
-_UC = "A-ZĄĆĘŁŃÓŚŻŹ"
-_NAME_WORD = rf"(?:(?-i:[{_UC}][\w\-ąćęłńóśźż]+)|\d+)"   # dodano wariant z liczbą
-_NUM        = r"(?:\d+[A-Za-z]?)"                       # numer domu
-_NAME_SEQ_STRICT = rf"{_NAME_WORD}(?:\s+{_NAME_WORD}){{0,4}}(?:\s+{_NUM})?"  # np. '29 Listopada 98'
-
-# 1) Prefiksowane: 'ul./al./pl./os./rondo/rynek/bulwary ...'
-PREF_RE = re.compile(rf"{_PREFIX}\s+(?P<name>{_NAME_SEQ_STRICT})", re.U | re.I)
-
-# 2) „Gołe" nazwy z numerem — TYLKO w bardzo bezpiecznych kontekstach.
-#    a) linia zaczyna się od: Adres/ Ulica / ul.
-UNP_LINE_RE = re.compile(
-    rf"^\s*(?:adres|ulica|ul\.?)\s*[:\-]?\s*(?P<name>{_NAME_WORD}(?:\s+{_NAME_WORD}){{0,4}})\s+(?P<num>{_NUM})\b",
-    re.U | re.M | re.I
-)
-#    b) fraza 'przy (ul.|ulicy|alei|placu|os.) XYZ 12'
-UNP_PRZY_RE = re.compile(
-    rf"\bprzy\s+(?:(?:ul\.?|ulicy|alei|placu|os\.?)\s+)?(?P<name>{_NAME_WORD}(?:\s+{_NAME_WORD}){{0,4}})\s+(?P<num>{_NUM})\b",
-    re.U | re.I
-)
-
-# śmieci na ogonie nazwy (odetnij wszystko od tych znaczników)
-_TAIL_NOISE_RE = re.compile(
-    r"\b(eng|english|below|pl|ua|ru|studio|pets?|friendly|co-?work(?:ing)?|bez\s*prowizji|bezpośrednio)\b.*$",
-    re.I | re.U
-)
-
-# --- metraż (m2) ---
-
-_AREA_UNIT_RE = (
-    r"(?:m2|m\^2|m\s*2|m²|mkw|m\.\s*kw|m\s*kw|"
-    r"metr(?:ów|y)?\s*kw(?:\.|adratow(?:e|ych)?)?)"
-)
-_AREA_LABEL_RE = r"(?:powierzch\w*|metra(?:ż|z)|pow\.)"
-
-def _norm_spaces(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").replace("\u00A0"," ")).strip()
-
-# --- Helpery do obsługi pliku tytułów ---
-def _norm_title(s: Optional[str]) -> str:
-    if not s:
-        return ""
-    t = s.lower().replace("\u00a0"," ")
-    t = re.sub(r"\s+", " ", t).strip()
-    # wytnij metraże i boilerplate
-    t = re.sub(r"\b\d{1,3}(?:[.,]\d{1,2})?\s*(?:m2|m²|m\s*2|m\s*kw|m\.\s*kw|mkw)\b", "", t)
-    for w in ("do wynajęcia","wynajem","bez prowizji","bezpośrednio","english below","eng","oferta","ogłoszenie","kraków","krakowie"):
-        t = t.replace(w, " ")
-    t = re.sub(r"[^\wąćęłńóśżź\s-]", " ", t)
-    t = re.sub(r"\s+", " ", t).strip()
-    return t
-
-def load_seen_titles(path: str) -> Set[str]:
+# --- Watermark (tryb przyrostowy) ---
+def load_watermark(path: str, seed_csv: str = RESULTS_FILE) -> Dict[str, int]:
+    """Zwraca {id_oferty: ts_pierwszego_zobaczenia}.
+       Przy pierwszym uruchomieniu zasiewa watermark ID-kami z istniejącego CSV (ts=0)."""
     p = Path(path)
-    p.parent.mkdir(parents=True, exist_ok=True)
-    if not p.exists():
-        p.touch()
-        return set()
-    with p.open("r", encoding="utf-8") as f:
-        return {line.strip() for line in f if line.strip()}
-
-def load_blacklist(path: str) -> Set[str]:
+    if p.exists():
+        try:
+            with p.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {str(k): int(v) for k, v in (data.get("ids") or {}).items()}
+        except (json.JSONDecodeError, ValueError, AttributeError) as e:
+            print(f"⚠️ Błąd w pliku watermark {path}: {e} — zaczynam od zera")
+            return {}
+    seed = Path(seed_csv)
+    if not seed.exists():
+        return {}
+    with seed.open("r", encoding="utf-8", newline="") as f:
+        return {row["id"]: 0 for row in csv.DictReader(f) if row.get("id")}
+
+def save_watermark(path: str, watermark: Dict[str, int], keep: int = WATERMARK_KEEP):
+    """Zapisuje `keep` najświeższych ID (po ts) – starsze i tak leżą głębiej niż zejdziemy."""
+    newest = sorted(watermark.items(), key=lambda kv: kv[1], reverse=True)[:keep]
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
-    if not p.exists():
-        p.touch()
-        return set()
-    with p.open("r", encoding="utf-8") as f:
-        return {line.strip() for line in f if line.strip()}
+    with p.open("w", encoding="utf-8") as f:
+        json.dump({"updated": int(time.time()), "ids": dict(newest)}, f, ensure_ascii=False, indent=2)
 
-async def append_seen_title(path: str, title_norm: str, lock: asyncio.Lock, seen: Set[str]):
-    if not title_norm:
-        return
-    async with lock:
-        if title_norm in seen:
-            return
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(title_norm + "\n")
-        seen.add(title_norm)
-
-async def append_to_blacklist(path: str, title_norm: str, url: str, lock: asyncio.Lock, blacklist: Set[str]):
-    if not title_norm:
-        return
-    async with lock:
-        if title_norm in blacklist:
-            return
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(f"{title_norm}\t{url}\n")
-        blacklist.add(title_norm)
-
-def _to_float_area(num_str: str) -> Optional[float]:
-    if not num_str: return None
-    try:
-        v = float(num_str.replace(",", ".").replace(" ", ""))
-        # sanity: mieszkania w widełkach ~10–300 m2
-        return v if 10 <= v <= 300 else None
-    except:
-        return None
-
-def _area_from_text(text: str) -> Optional[float]:
-    """Ogólny parser 'NN[,.]N unit' z sensownymi jednostkami."""
-    t = _norm_spaces(text).lower()
-    m = re.search(rf"(\d{{1,3}}(?:[.,]\d{{1,2}})?)\s*{_AREA_UNIT_RE}\b", t, flags=re.I)
-    return _to_float_area(m.group(1)) if m else None
-
-def _area_from_labeled(text: str) -> Optional[float]:
-    """Parser z etykietą 'Powierzchnia:' – jednostka może być pominięta."""
-    t = _norm_spaces(text).lower()
-    # np. 'Powierzchnia: ok. 41,60 m²' lub 'Pow.: 42'
-    m = re.search(
-        rf"{_AREA_LABEL_RE}\s*[:=\-]?\s*(?:ok\.?\s*)?"
-        rf"(\d{{1,3}}(?:[.,]\d{{1,2}})?)\s*(?:{_AREA_UNIT_RE})?",
-        t, flags=re.I
-    )
-    return _to_float_area(m.group(1)) if m else None
+def mark_watermark(watermark: Dict[str, int], urls: Iterable[str], ts: int):
+    """Dopisuje ID z podanych URL-i (tylko nowe – zachowujemy ts pierwszego zobaczenia)."""
+    for u in urls:
+        watermark.setdefault(extract_id(u), ts)
 
 async def extract_area_m2(page: Page, title: Optional[str], desc: str) -> Tuple[Optional[float], str]:
     """Zwraca (metraż_m2, źródło: 'tabela'|'tytuł'|'opis'|'')"""
     # 1) TABELA „Szczegóły" → znajdź wiersz, gdzie lewa kolumna zawiera 'Powierzch'
+    table_value = None
     try:
         rows = await page.query_selector_all('[data-sentry-element="ItemGridContainer"]')
         for r in rows:
@@ -243,218 +161,12 @@ async def extract_area_m2(page: Page, title: Optional[str], desc: str) -> Tuple[
             if len(cells) >= 2:
                 lab = _norm_spaces(await cells[0].inner_text()).lower()
                 if "powierzch" in lab:  # „Powierzchnia:"
-                    val = _norm_spaces(await cells[1].inner_text())
-                    area = _area_from_text(val) or _area_from_labeled(val)
-                    if area: 
-                        return area, "tabela"
+                    table_value = _norm_spaces(await cells[1].inner_text())
+                    break
     except:
         pass
-
-    # 2) Tytuł (często „41,60 m²")
-    if title:
-        area = _area_from_labeled(title) or _area_from_text(title)
-        if area: 
-            return area, "tytuł"
-
-    # 3) Opis – najpierw wersja z etykietą, potem ogólna 'NN m²'
-    if desc:
-        area = _area_from_labeled(desc) or _area_from_text(desc)
-        if area: 
-            return area, "opis"
-
-    return None, ""
-
-def _preclean_for_match(text: str) -> str:
-    """Rozwiń skróty (płk., pil., gen., mjr., kpt., dr., prof., ks., św.) zanim dopasujemy regex."""
-    s = text or ""
-    repl = [
-        (r"\bppłk\.\s*", "Podpułkownika "),
-        (r"\bpłk\.\s*",  "Pułkownika "),
-        (r"\bpil\.\s*",  "Pilota "),
-        (r"\bgen\.\s*",  "Generała "),
-        (r"\bmjr\.\s*",  "Majora "),
-        (r"\bmaj\.\s*",  "Majora "),
-        (r"\bkpt\.\s*",  "Kapitana "),
-        (r"\bdr\.\s*",   "Doktora "),
-        (r"\bprof\.\s*", "Profesora "),
-        (r"\bks\.\s*",   "Księdza "),
-        (r"\bśw\.\s*",   "Św. "),
-    ]
-    for pat, rep in repl:
-        s = re.sub(pat, rep, s, flags=re.I)
-    return s
-
-def _fix_titles(s: str) -> str:
-    s = re.sub(r"\bSw\.?\b", "Św.", s, flags=re.I)
-    s = re.sub(r"\bgen\.?\b", "Generała", s, flags=re.I)
-    s = re.sub(r"\bpłk\.?\b", "Pułkownika", s, flags=re.I)
-    s = re.sub(r"\bprof\.?\b", "Profesora", s, flags=re.I)
-    s = re.sub(r"\bdr\.?\b", "Doktora", s, flags=re.I)
-    s = " ".join(w[:1].upper()+w[1:] for w in s.split())
-    # rzymskie
-    s = re.sub(r"\bIi\b","II", s); s = re.sub(r"\bIii\b","III", s); s = re.sub(r"\bIv\b","IV", s)
-    # znormalizuj przypadki z 'Generała.' → 'Generała '
-    s = re.sub(r"\b(Generała|Pułkownika|Doktora|Profesora|Księdza)\.\s+", r"\1 ", s)
-    return s
-
-def _canon_prefix(p: str) -> str:
-    p = p.lower()
-    if p.startswith("ul"): return "ul."
-    if p.startswith("al"): return "al."
-    if p.startswith("pl"): return "pl."
-    if p.startswith("os"): return "os."
-    if p.startswith("rondo"): return "rondo"
-    if p.startswith("rynek"): return "rynek"
-    if p.startswith("bulwar"): return "bulwary"
-    return p
-
-def _drop_redundant_noun(prefix: str, name: str) -> Tuple[str, str]:
-    """Usuwa 'Ulica/Aleja/Plac/Osiedle/Rondo/Rynek' z początku nazwy jeśli powtórzone
-       i ewentualnie koryguje prefiks, gdy z UNPREFIXED zrobiliśmy omyłkowo 'ul.'."""
-    if not name: return prefix, name
-    first = name.split()[0].lower()
-    # mapa: 'słowo w nazwie' → (docelowy prefiks, czy usuwać pierwszy token z nazwy)
-    leading = {
-        "ulica": ("ul.", True), "ulicy": ("ul.", True),
-        "aleja": ("al.", True), "alei": ("al.", True),
-        "plac": ("pl.", True), "placu": ("pl.", True),
-        "osiedle": ("os.", True), "osiedlu": ("os.", True), "os.": ("os.", True),
-        "rondo": ("rondo", True), "rondzie": ("rondo", True),
-        "rynek": ("rynek", True), "rynku": ("rynek", True),
-        "bulwar": ("bulwary", True), "bulwary": ("bulwary", True),
-    }
-    if first in leading:
-        new_pref, drop = leading[first]
-        if prefix != new_pref: prefix = new_pref
-        if drop: name = " ".join(name.split()[1:])
-    # Specjalny przypadek: 'al. Aleja …' / 'ul. Ulica …'
-    if prefix == "al." and first in {"aleja","alei"}:
-        name = " ".join(name.split()[1:])
-    if prefix == "ul." and first in {"ulica","ulicy"}:
-        name = " ".join(name.split()[1:])
-    return prefix, name
-
-def _strip_tail_noise(name: str) -> str:
-    return _TAIL_NOISE_RE.sub("", name).strip(" ,.;:-–—")
-
-def _extract_prefixed_first(text: str, *, forbid_rynek: bool = False) -> Optional[str]:
-    if not text: 
-        return None
-    t = re.sub(r"\s+", " ", text)
-    t = _preclean_for_match(t)  # ⬅️ NOWE
-    m = PREF_RE.search(t)
-    if not m: 
-        return None
-    raw = m.group(0)
-    prefix = _canon_prefix(raw.split()[0])
-    if forbid_rynek and prefix in ("rynek", "rondo"):
-        return None
-    name = _fix_titles(m.group("name"))
-    name = _strip_tail_noise(name)
-    prefix, name = _drop_redundant_noun(prefix, name)
-    return f"{prefix} {name}".strip() if name else None
-
-def _extract_unprefixed_strict(line_text: str) -> Optional[str]:
-    """Pracuje NA LINII (początek 'Adres/Ulica/ul.') lub fraza 'przy …'."""
-    if not line_text: return None
-    t = re.sub(r"\s+", " ", line_text)
-    for rx in (UNP_LINE_RE, UNP_PRZY_RE):
-        m = rx.search(t)
-        if m:
-            name = _fix_titles(m.group("name"))
-            num  = m.group("num")
-            prefix = "ul."
-            # skoryguj prefiks po wiodącym rzeczowniku (Aleja/Alei/Plac/Os./Rondo/Rynek…)
-            prefix, name = _drop_redundant_noun(prefix, name)
-            name = _strip_tail_noise(name)
-            adr = f"{prefix} {name} {num}".strip()
-            return adr
-    return None
-
-def _lines(desc: str) -> List[str]:
-    raw = (desc or "").replace("•", "\n")
-    parts = [re.sub(r"\s+", " ", p).strip(" -") for p in raw.splitlines()]
-    return [p for p in parts if p]
-
-def _remove_prefix_for_csv(address: str) -> str:
-    """Dla CSV zdejmujemy TYLKO 'ul.'; zostawiamy al./pl./os./rondo/rynek/bulwary."""
-    if not address:
-        return address
-
-    # zdejmij wyłącznie 'ul.' z początku
-    address = re.sub(r'^\s*ul\.\s+', '', address, flags=re.I)
-
-    # usuń ', Kraków' na końcu
-    address = re.sub(r',\s*Kraków\s*$', '', address, flags=re.I)
-
-    # edge-case: 'al.  29' → 'al. 29 Listopada' (jeśli nie ma już 'Listopada')
-    address = re.sub(r'^(al\.)\s*29\b(?!\s*Listopada)', r'\1 29 Listopada', address, flags=re.I)
-
-    # porządkuj wielokrotne spacje
-    address = re.sub(r'\s+', ' ', address).strip()
-    return address
-
-def extract_address_for_geocode(header_loc: Optional[str], title: Optional[str], desc: str) -> Optional[str]:
-    # 1) header/mapa – NAJPIERW
-    s = _extract_prefixed_first(header_loc or "")
-    if s: return s + ", Kraków"
-    # 2) tytuł
-    s = _extract_prefixed_first(title or "")
-    if s: return s + ", Kraków"
-    s = _extract_unprefixed_strict(title or "")
-    if s: return s + ", Kraków"
-    # 3) opis (ale bez 'rynek' i 'rondo')
-    for ln in _lines(desc):
-        s = _extract_unprefixed_strict(ln) or _extract_prefixed_first(ln, forbid_rynek=True)
-        if s: return s + ", Kraków"
-    return None
-
-
-def extract_district_from_breadcrumbs(breadcrumbs: List[str]) -> Optional[str]:
-    # spróbuj wprost z breadcrumbs
-    for b in breadcrumbs:
-        bt = b.strip()
-        if bt and bt.lower() not in CITY_TOKENS and not bt.lower().startswith(("ul", "al", "pl", "os", "rondo", "rynek")):
-            # wybierz pierwszy token, który wygląda na dzielnicę/osiedle
-            if bt in DISTRICTS:
-                return bt
-    # fallback: weź ostatni “nie-miasto/nie-woj” okruszek
-    for b in reversed(breadcrumbs):
-        bt = b.strip()
-        if bt and bt.lower() not in CITY_TOKENS:
-            return bt
-    return None
-
-
-def extract_id(url: str) -> str:
-    m = re.search(r"-ID(\w+)$", url)
-    return f"ID{m.group(1)}" if m else url.rsplit("/", 1)[-1]
-
-
-def extract_district_from_text(text: str) -> Optional[str]:
-    if not text:
-        return None
-    t = re.sub(r"\s+", " ", text)
-
-    # 1) 'w dzielnicy X' / 'w dzielnicy Y-Z'
-    m = re.search(r"w\s+dzielnic[yi]\s+([A-ZĄĆĘŁŃÓŚŻŹ][\w\-ąćęłńóśźż]+(?:\s+[A-ZĄĆĘŁŃÓŚŻŹ][\w\-ąćęłńóśźż]+)?)", t, flags=re.I)
-    if m:
-        cand = m.group(1).strip()
-        if cand in DISTRICTS:
-            return cand
-
-    # 2) 'na/w <rejon>' (Kazimierzu, Ruczaju, Bronowicach…) – sprawdzamy przeciwko słownikowi
-    m2 = re.search(r"(?:na|w)\s+([A-ZĄĆĘŁŃÓŚŻŹ][\w\-ąćęłńóśźż]+(?:\s+[A-ZĄĆĘŁŃÓŚŻŹ][\w\-ąćęłńóśźż]+)?)", t, flags=re.I)
-    if m2:
-        cand = m2.group(1).strip().rstrip(".,;:–—")
-        # sprostać odmianom: 'Kazimierzu'→'Kazimierz', 'Bronowicach'→'Bronowice'
-        norm = re.sub(r"(u|ach|y|ie)$", "", cand)  # bardzo prosta normalizacja
-        for item in DISTRICTS:
-            if norm.lower() in {item.lower(), item.lower().rstrip("e"), item.lower().rstrip("y")}:
-                return item
-
-    return None
-
+    # 2) tytuł, 3) opis – czyste parsowanie w extractors.area_from_sources
+    return area_from_sources(title, desc, table_value)
 
 async def accept_cookies(page: Page):
     # różne warianty przycisku
@@ -476,10 +188,12 @@ async def accept_cookies(page: Page):
 
 async def collect_listing_entries_fast(page: Page) -> List[dict]:
     """
-    Zwraca listę: [{"url": "...", "title": "..."}] z listingu.
+    Zwraca listę: [{"url", "title", "location", "price", "area", "district"}] z listingu.
     Używa selektorów:
       a[data-cy="listing-item-link"]  zawiera wewnątrz:
       p[data-cy="listing-item-title"] z tekstem tytułu.
+    price/area/district – z tekstu całej karty (article/li wokół linku) przez card_signals;
+    tylko do kolejności pobierania (interest.py), None gdy karta ich nie pokazuje.
     """
     # Upewnij się, że listing się narysował
     await page.wait_for_selector('a[data-cy="listing-item-link"]', timeout=20000)
@@ -492,7 +206,9 @@ async def collect_listing_entries_fast(page: Page) -> List[dict]:
             const titleEl = a.querySelector('[data-cy="listing-item-title"]');
             const titleAttr = a.getAttribute('title') || a.getAttribute('aria-label') || '';
             const title = (titleEl?.innerText || titleAttr || '').trim();
-            return { url: href, title };
+            const card = a.closest('[data-cy="listing-item"], article, li') || a;
+            const locEl = card.querySelector('[data-sentry-component="Address"], [data-testid="advert-card-address"], address');
+            return { url: href, title, card: card.innerText || '', location: (locEl?.innerText || '').trim() };
         })"""
     )
 
@@ -502,11 +218,55 @@ async def collect_listing_entries_fast(page: Page) -> List[dict]:
     for it in entries:
         if it["url"] in const_seen:
             continue
+        it["price"], it["area"], it["district"] = card_signals(it.pop("card"), it["location"], it["title"])
         uniq.append(it)
         const_seen.add(it["url"])
     return uniq
 
 
+async def open_listing_page(page: Page, listing_url: str) -> List[dict]:
+    """Wchodzi na stronę listingu, sprawdza blokadę i zwraca wpisy z collect_listing_entries_fast.
+       [] = listing się narysował, ale bez ogłoszeń (koniec wyników); strona, która się nie
+       załadowała, kończy się TimeoutError – to NIE jest koniec wyników."""
+    await page.goto(listing_url, wait_until="networkidle", timeout=30000)
+    await _detect_cloudflare_block(page)  # ⬅️ detekcja blokady listingu
+    await page.wait_for_selector('[data-cy="search.listing.organic"]', timeout=30000)
+    if not await page.locator('[data-cy="search.listing.organic"] a[data-cy="listing-item-link"]').count():
+        return []
+    return await collect_listing_entries_fast(page)
+
+
+async def open_browser_context(p):
+    """Uruchamia Chromium z UA/viewportem jak z przeglądarki i blokadą ciężkich zasobów.
+       Zwraca (browser, context, page) – page już po wejściu na homepage i akceptacji cookies."""
+    # --- anti-bot: UA + cookies + małe losowe pauzy ---
+    print("[anti-bot] ustawiam UA/viewport i wchodzę na homepage…")
+    browser = await p.chromium.launch(headless=True)
+    context = await browser.new_context(
+        user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                    "AppleWebKit/537.36 (KHTML, like Gecko) "
+                    "Chrome/127.0.0.0 Safari/537.36"),
+        viewport={"width": 1440, "height": 900},
+        locale="pl-PL",
+        extra_http_headers={"Accept-Language": "pl-PL,pl;q=0.9,en-US;q=0.8,en;q=0.7"}
+    )
+
+    # Blokada ciężkich zasobów - mniej requestów = mniej szans na bana
+    async def _route_filter(route, request):
+        rtype = request.resource_type
+        if rtype in {"image", "media", "font"}:  # stylesheet zostaw
+            await route.abort()
+        else:
+            await route.continue_()
+    await context.route("**/*", _route_filter)
+    page = await context.new_page()
+    await page.goto(HOMEPAGE_URL, wait_until="domcontentloaded")
+    await accept_cookies(page)
+    await asyncio.sleep(random.uniform(0.5, 1.2))
+    print("połączenie ze stroną: check")
+    return browser, context, page
+
+
 async def get_header_location(page: Page) -> Tuple[Optional[str], List[str]]:
     """Zwraca (tekst lokalizacji z headera/mapy lub breadcrumbs, breadcrumbs_list)."""
     loc = None
@@ -565,206 +325,168 @@ async def get_description_text(page: Page) -> str:
     return ""
 
 
-# --- ceny: najem + czynsz adm. ---
-
-_AMOUNT_RE = r"(\d[\d\s\u00A0.,]*)"  # cyfry z odstępami/nbsp/kropkami/przecinkami
-_CURRENCY_RE = r"(?:\s*(?:zł|pln))?"
-
-def _to_int_pln(s: str) -> Optional[int]:
-    """Z '2 300', '915 PLN', '790,00 zł' → 2300/915/790 (int).
-       Jeśli brak cyfr – None."""
-    if not s:
-        return None
-    digits = re.sub(r"[^\d]", "", s)
-    return int(digits) if digits else None
-
-def _first_amount(text: str) -> Optional[int]:
-    """Znajdź pierwszą kwotę z walutą (zł/PLN) – zwraca int."""
-    if not text:
-        return None
-    m = re.search(rf"{_AMOUNT_RE}\s*{_CURRENCY_RE}", text, flags=re.I)
-    return _to_int_pln(m.group(1)) if m else None
-
-def _parse_amount_after(label_re: str, text: str) -> Optional[int]:
-    """Znajdź kwotę po danym słowie-kluczu (np. 'Czynsz administracyjny')."""
-    if not text:
-        return None
-    m = re.search(rf"{label_re}\s*[:=\-]?\s*{_AMOUNT_RE}\s*{_CURRENCY_RE}", text, flags=re.I | re.U)
-    return _to_int_pln(m.group(1)) if m else None
-
-def _extract_rent_from_header_text(text: str) -> Optional[int]:
-    """Wyciąga główną cenę najmu z headera (fallback na wypadek zmian selektora)."""
-    return _parse_amount_after(r"(?:cena|price)?", text)  # praktycznie: weź pierwszą kwotę
-
-def _extract_admin_from_text(text: str, rent_hint: Optional[int]=None) -> Optional[int]:
-    """Czynsz adm. z tekstu: preferuj wyrażenia 'czynsz administracyjny/opłaty adm.'.
-       'czynsz' samotny bierzemy tylko jeśli nie wygląda na 'czynsz najmu' i jest < rent_hint."""
-    if not text:
-        return None
-    # 1) najmocniejsze sygnały
-    for lab in (r"czynsz\s*administracyjny", r"opłaty?\s*administracyjne", r"adm\."):
-        val = _parse_amount_after(lab, text)
-        if val: return val
-
-    # 2) „+ Czynsz 790 zł", „Czynsz: 850 zł" – z wykluczeniem frazy „najmu"
-    out = None
-    for m in re.finditer(rf"\bczynsz\b(?!\s*najmu)\s*[:=\-]?\s*{_AMOUNT_RE}\s*{_CURRENCY_RE}", text, flags=re.I):
-        val = _to_int_pln(m.group(1))
-        if not val:
-            continue
-        # Odfiltruj ew. „czynsz najmu" (gdyby negatyw nie zadziałał przez dziwne białe znaki)
-        left = text[max(0, m.start()-30):m.start()].lower()
-        right = text[m.end():m.end()+20].lower()
-        if "najmu" in left or "najmu" in right:
-            continue
-        # Heurystyka: jeśli mamy podpowiedź ceny najmu, a „czynsz" >= najem*0.8 — pewnie to nie adm.
-        if rent_hint and val >= int(0.8 * rent_hint):
-            continue
-        out = val
-        break
-    return out
-
 async def extract_prices(page: Page, desc_text: str) -> Tuple[Optional[int], Optional[int], str]:
-    """Zwraca (najem_pln, czynsz_adm_pln, źródło_czynszu)"""
-    rent = None
-    admin = None
-    admin_src = ""
-
-    # --- 1) najem z headera ---
-    try:
-        price_el = await page.query_selector('[data-cy="adPageHeaderPrice"]')
-        if price_el:
-            rent_text = (await price_el.inner_text()) or ""
-            rent = _first_amount(rent_text)
-        if not rent:
-            # fallback: cały blok cenowy i spróbuj wyłuskać pierwszą kwotę
-            wrap = await page.query_selector('[data-sentry-element="PriceSection"]')
-            if wrap:
-                rent = _extract_rent_from_header_text(await wrap.inner_text())
-    except:
-        pass
+    """Zwraca (najem_pln, czynsz_adm_pln, źródło_czynszu) – teksty z DOM, parsowanie w extractors."""
+    texts = {}
+    for key, sel in (("price", '[data-cy="adPageHeaderPrice"]'),
+                     ("additional", '[data-sentry-element="AdditionalPriceWrapper"]'),
+                     ("section", '[data-sentry-element="PriceSection"]')):
+        try:
+            el = await page.query_selector(sel)
+            texts[key] = ((await el.inner_text()) or "") if el else ""
+        except:
+            texts[key] = ""
+    return prices_from_text(texts["price"], texts["additional"], texts["section"], desc_text)
 
-    # --- 2) czynsz adm. z headera (np. „+ Czynsz 790 zł") ---
+async def save_offer_html(page: Page, url: str, oid: str, out_dir: str):
+    """<oid>.html z nagłówkiem "saved from url" (reextract.py odczyta z niego URL oferty)."""
     try:
-        addl = await page.query_selector('[data-sentry-element="AdditionalPriceWrapper"]')
-        if addl:
-            t = (await addl.inner_text()) or ""
-            admin = _extract_admin_from_text(t, rent)
-            if admin:
-                admin_src = "header"
-        if not admin:
-            # fallback: cały blok cenowy
-            wrap = await page.query_selector('[data-sentry-element="PriceSection"]')
-            if wrap:
-                t = (await wrap.inner_text()) or ""
-                admin = _extract_admin_from_text(t, rent)
-                if admin:
-                    admin_src = "header"
-    except:
-        pass
+        html = await page.content()
+        path = Path(out_dir) / f"{oid}.html"
+        marker = f"<!-- saved from url=({len(url):04d}){url} -->\n"
+        await asyncio.to_thread(path.write_text, marker + html, encoding="utf-8")
+    except Exception as e:
+        log.warning("[%s] Nie zapisano HTML: %s", oid, e, extra=kv(offer_id=oid, stage="save_html"))
 
-    # --- 3) czynsz adm. z opisu (jeśli brak w headerze) ---
-    if not admin and desc_text:
-        admin = _extract_admin_from_text(desc_text, rent)
-        if admin:
-            admin_src = "opis"
 
-    return rent, admin, admin_src
+@contextmanager
+def _stage(name: str, timings: Dict[str, float]):
+    """Timer etapu scrape_offer → histogram scrape_stage_seconds{stage=...} + ms do rekordu logu."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        METRICS.observe("scrape_stage_seconds", dt, stage=name)
+        timings[name] = round(timings.get(name, 0.0) + dt * 1000, 1)
 
 
-async def scrape_offer(page: Page, url: str, seen_titles: Set[str], blacklist: Set[str]):
-    await page.goto(url, wait_until="domcontentloaded", timeout=45000)
+async def scrape_offer(page: Page, url: str, seen_titles: Container[str], blacklist: Container[str]):
+    outcome = "error"
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    try:
+        res, outcome = await _scrape_offer(page, url, seen_titles, blacklist, timings)
+        return res
+    except (CloudflareBlocked, CloudfrontBlocked):
+        outcome = "blocked"
+        raise
+    finally:
+        dt = time.perf_counter() - t0
+        METRICS.observe("scrape_offer_seconds", dt)
+        METRICS.inc("scrape_offers_total", outcome=outcome)
+        log.debug("[%s] %s w %.0f ms", extract_id(url), outcome, dt * 1000,
+                  extra=kv(offer_id=extract_id(url), stage="offer", outcome=outcome,
+                           duration_ms=round(dt * 1000, 1), stages_ms=timings))
+
+
+async def _scrape_offer(page: Page, url: str, seen_titles: Container[str], blacklist: Container[str],
+                        timings: Dict[str, float]):
+    """Zwraca (wiersz | None, wynik) – wynik to etykieta licznika scrape_offers_total."""
+    oid = extract_id(url)
+    with _stage("navigation", timings):
+        await page.goto(url, wait_until="domcontentloaded", timeout=45000)
     
     # sprawdź twarde markery CF (to rzuci tylko przy „pewnym" banie)
     try:
-        await _detect_cloudflare_block(page)
+        with _stage("block_check", timings):
+            await _detect_cloudflare_block(page)
     except (CloudflareBlocked, CloudfrontBlocked):
         raise  # to jest realny ban
     
     # spróbuj złapać selektory, ale timeout ≠ ban
     await asyncio.sleep(random.uniform(0.2, 0.4))  # małe opóźnienie by DOM się uspokoił
-    try:
-        await page.wait_for_selector('[data-cy="adPageHeaderPrice"]', timeout=8000)
-    except:
+    with _stage("selector_wait", timings):
         try:
-            await page.wait_for_selector('h1[data-cy="adPageAdTitle"]', timeout=6000)
+            await page.wait_for_selector('[data-cy="adPageHeaderPrice"]', timeout=8000)
         except:
-            # miękki retry: odśwież i daj krótką szansę DOM-owi
+            METRICS.inc("scrape_selector_fallbacks_total", step="title")
             try:
-                await page.reload(wait_until="domcontentloaded", timeout=15000)
-                await asyncio.sleep(random.uniform(0.2, 0.4))  # opóźnienie po reload
-                await page.wait_for_selector('h1[data-cy="adPageAdTitle"]', timeout=5000)
+                await page.wait_for_selector('h1[data-cy="adPageAdTitle"]', timeout=6000)
             except:
-                # traktuj jako nieudane ogłoszenie, ale nie ban
-                print(f"[WARN] Timeout selektorów na {url} – pomijam ofertę (brak bana).")
-                return None
+                # miękki retry: odśwież i daj krótką szansę DOM-owi
+                METRICS.inc("scrape_selector_fallbacks_total", step="reload")
+                try:
+                    await page.reload(wait_until="domcontentloaded", timeout=15000)
+                    await asyncio.sleep(random.uniform(0.2, 0.4))  # opóźnienie po reload
+                    await page.wait_for_selector('h1[data-cy="adPageAdTitle"]', timeout=5000)
+                except:
+                    # traktuj jako nieudane ogłoszenie, ale nie ban
+                    log.warning("[%s] Timeout selektorów – pomijam ofertę (brak bana)", oid,
+                                extra=kv(offer_id=oid, stage="selector_wait", url=url))
+                    return None, "selector_timeout"
     
     # ponowna szybka kontrola markerów CF po tym jak DOM się narysował
     try:
-        await _detect_cloudflare_block(page)
+        with _stage("block_check", timings):
+            await _detect_cloudflare_block(page)
     except (CloudflareBlocked, CloudfrontBlocked):
         raise
 
     # TYTUŁ (żeby móc z niego łapać)
     title = None
-    try:
-        el = await page.query_selector('h1[data-cy="adPageAdTitle"]')
-        if el: title = (await el.inner_text()).strip()
-    except: pass
+    with _stage("title", timings):
+        try:
+            el = await page.query_selector('h1[data-cy="adPageAdTitle"]')
+            if el: title = (await el.inner_text()).strip()
+        except: pass
 
     # ⬇⬇⬇ SKIP jeśli tytuł już był (po normalizacji)
     if title and _norm_title(title) in seen_titles:
-        oid = extract_id(url)
-        print(f"\n[{oid}] SKIP: tytuł już przetworzony → '{title}'")
-        return None
+        log.debug("[%s] SKIP: tytuł już przetworzony → '%s'", oid, title,
+                  extra=kv(offer_id=oid, stage="dedup", reason="seen"))
+        return None, "skip_seen"
     
     # ⬇⬇⬇ SKIP jeśli tytuł jest na blacklist
     if title and _norm_title(title) in blacklist:
-        oid = extract_id(url)
-        print(f"\n[{oid}] SKIP: tytuł na blacklist → '{title}'")
-        return None
+        log.debug("[%s] SKIP: tytuł na blacklist → '%s'", oid, title,
+                  extra=kv(offer_id=oid, stage="dedup", reason="blacklist"))
+        return None, "skip_blacklist"
+
+    if SAVE_HTML_DIR:
+        with _stage("save_html", timings):
+            await save_offer_html(page, url, oid, SAVE_HTML_DIR)
 
     # LOKALIZACJE ŹRÓDŁOWE
-    header_loc, breadcrumbs = await get_header_location(page)
-    desc = await get_description_text(page)
+    with _stage("location", timings):
+        header_loc, breadcrumbs = await get_header_location(page)
+    with _stage("description", timings):
+        desc = await get_description_text(page)
 
     # CENY: najem + czynsz adm.
     rent_pln = None
     admin_pln = None
-    try:
-        rent_pln, admin_pln, admin_src = await extract_prices(page, desc)
-    except Exception as _e:
-        admin_src = ""
+    with _stage("price", timings):
+        try:
+            rent_pln, admin_pln, admin_src = await extract_prices(page, desc)
+        except Exception as _e:
+            admin_src = ""
 
     # METRAŻ m2
     metraz_m2 = None
     metraz_src = ""
-    try:
-        metraz_m2, metraz_src = await extract_area_m2(page, title, desc)
-    except Exception:
-        pass
+    with _stage("area", timings):
+        try:
+            metraz_m2, metraz_src = await extract_area_m2(page, title, desc)
+        except Exception:
+            pass
 
     # 👉 zamiast extract_street_from_sources(...)
-    adres = extract_address_for_geocode(header_loc, title, desc)
-
-    oid = extract_id(url)
-    print(f"\n[{oid}]:")
-    print(f"- Lokalizacja na header: {header_loc or '—'}")
-    print(f"- Lokalizacja w opis: {(desc[:180] + ' ...') if desc else '—'}")
-    print(f"- Najem (header): {rent_pln if rent_pln is not None else '—'} PLN")
-    print(f"- Czynsz adm.: {admin_pln if admin_pln is not None else '—'} PLN"
-          + (f" (źródło: {admin_src})" if admin_pln else ""))
-    print(f"- Metraż: {metraz_m2 if metraz_m2 is not None else '—'} m²"
-          + (f" (źródło: {metraz_src})" if metraz_src else ""))
+    with _stage("address", timings):
+        adres = extract_address_for_geocode(header_loc, title, desc)
 
+    fields = dict(offer_id=oid, stage="extract", header_loc=header_loc, rent_pln=rent_pln,
+                  admin_pln=admin_pln, admin_src=admin_src, metraz_m2=metraz_m2, metraz_src=metraz_src,
+                  address=adres)
     if not adres:
-        print(f"❌ NIE UDAŁO ZNALEŹĆ ULICY DLA: {oid} | {url}")
-        return None
+        log.warning("[%s] ❌ Nie udało się znaleźć ulicy | %s", oid, url, extra=kv(**fields, url=url))
+        return None, "no_address"
     else:
-        print(f"- ADRES do geokodera: {adres}")
         # Wyczyść adres dla CSV (usuń prefiksy i ", Kraków")
         clean_address = _remove_prefix_for_csv(adres)
-        print(f"- ADRES do CSV: {clean_address}")
+        log.info("[%s] %s | %s PLN (+%s) | %s m²", oid, clean_address,
+                 rent_pln if rent_pln is not None else "—", admin_pln if admin_pln is not None else "—",
+                 metraz_m2 if metraz_m2 is not None else "—", extra=kv(**fields, desc=desc[:180]))
         return {
             "id": oid,
             "title": title,
@@ -773,64 +495,12 @@ async def scrape_offer(page: Page, url: str, seen_titles: Set[str], blacklist: S
             "url": url,
             "najem_pln": rent_pln,
             "czynsz_adm_pln": admin_pln
-        }
+        }, "ok"
 
 
-from pathlib import Path
-
-def save_to_csv(rows: List[dict], filename: str = "../data/otodom_results.csv"):
+def add_to_blacklist(title: str, url: str, db: str = SEEN_DB):
     """
-    Dopisuje wiersze do CSV. Nagłówek zapisywany tylko gdy plik nie istnieje lub jest pusty.
-    """
-    if not rows:
-        print("❌ Brak danych do zapisania (batch pusty)")
-        return
-
-    path = Path(filename)
-    path.parent.mkdir(parents=True, exist_ok=True)
-
-    write_header = not path.exists() or path.stat().st_size == 0
-    fieldnames = ["id", "title", "ulica", "metraz_m2", "najem_pln", "czynsz_adm_pln", "url"]
-
-    with path.open('a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        if write_header:
-            writer.writeheader()
-        writer.writerows(rows)
-
-    print(f"💾 Dopisano {len(rows)} ogłoszeń do {filename}")
-
-def save_partial(rows: List[dict], filename: str = "../data/otodom_results.csv"):
-    """
-    Alias na save_to_csv – tu przekazujemy już tylko batch (nowe rekordy),
-    więc nie grozi duplikat.
-    """
-    save_to_csv(rows, filename)
-
-def save_emergency_backup(rows: List[dict], filename: str = "../data/otodom_emergency_backup.csv"):
-    """
-    Zapisuje dane do pliku backup w przypadku błędu/blokady.
-    """
-    if not rows:
-        print("❌ Brak danych do zapisania w backup")
-        return
-    
-    path = Path(filename)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Zawsze zapisuj nagłówek dla backup
-    fieldnames = ["id", "title", "ulica", "metraz_m2", "najem_pln", "czynsz_adm_pln", "url"]
-    
-    with path.open('w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
-    
-    print(f"🚨 Zapisano {len(rows)} rekordów do backup: {filename}")
-
-def add_to_blacklist(title: str, url: str, filename: str = "../data/blacklist.txt"):
-    """
-    Dodaje ofertę do blacklist (funkcja do użytku ręcznego).
+    Dodaje ofertę do blacklist (funkcja do użytku ręcznego; to samo: seen_store.py --blacklist).
     """
     if not title:
         print("❌ Brak tytułu do dodania do blacklist")
@@ -841,12 +511,10 @@ def add_to_blacklist(title: str, url: str, filename: str = "../data/blacklist.tx
         print("❌ Nie można znormalizować tytułu")
         return
     
-    path = Path(filename)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    
-    with path.open('a', encoding='utf-8') as f:
-        f.write(f"{title_norm}\t{url}\n")
-    
+    store = SeenStore(db, SEEN_TTL_DAYS, TITLES_FILE, BLACKLIST_FILE)
+    store.add_blacklist(title_norm, url)
+    store.close()
+
     print(f"🚫 Dodano do blacklist: '{title_norm}'")
 
 
@@ -857,7 +525,7 @@ CONCURRENCY = 2  # ile ogłoszeń naraz - zmniejszone dla stabilności
 
 
 
-async def scrape_all(context, links, seen_titles: Set[str], progress: Dict[str, object], reserved_titles: Set[str], blacklist: Set[str]):
+async def scrape_all(context, links, store: SeenStore, progress: Dict[str, object], reserved_titles: Set[str]):
     """
     Scrapuje wszystkie ogłoszenia równolegle z limitem współbieżności.
     progress: {'done': int, 'target': int, 'lock': asyncio.Lock, 'blocked': bool}
@@ -873,24 +541,24 @@ async def scrape_all(context, links, seen_titles: Set[str], progress: Dict[str,
         async with sem:  # ⬅⬅⬅ TERAZ DZIAŁA OGRANICZENIE RÓWNOLEGŁOŚCI
             offer_page = await context.new_page()
             try:
-                res = await scrape_offer(offer_page, link, seen_titles, blacklist)
-                # ⬇⬇⬇ dopisz tytuł do listy, tylko gdy oferta wejdzie do CSV (res != None)
+                res = await scrape_offer(offer_page, link, store.seen, store.blacklist)
+                # ⬇⬇⬇ dopisz tytuł do magazynu, tylko gdy oferta wejdzie do CSV (res != None) – zapis paczkami w tle
                 if res and res.get("title"):
                     title_norm = _norm_title(res["title"])
-                    await append_seen_title(TITLES_FILE, title_norm, TITLES_LOCK, seen_titles)
+                    store.mark_seen(title_norm, link)
                     reserved_titles.add(title_norm)  # dodaj do rezerwacji w tym runie
                 return res
             except CloudflareBlocked as e:
-                print(f"🚨 Cloudflare BAN: {e}")
+                log.error("🚨 Cloudflare BAN: %s", e, extra=kv(offer_id=extract_id(link), stage="block_check"))
                 blocked = True
                 return None
             except CloudfrontBlocked as e:
-                print(f"🚨 CloudFront BAN: {e}")
+                log.error("🚨 CloudFront BAN: %s", e, extra=kv(offer_id=extract_id(link), stage="block_check"))
                 blocked = True
                 return None
             except Exception as e:
                 # timeouty/losowe błędy nie przerywają całego runu
-                print(f"[WARN] Błąd przy {link}: {e}")
+                log.warning("Błąd przy %s: %s", link, e, extra=kv(offer_id=extract_id(link), stage="offer"))
                 return None
             finally:
                 await offer_page.close()
@@ -899,12 +567,12 @@ async def scrape_all(context, links, seen_titles: Set[str], progress: Dict[str,
                     progress['done'] = int(progress.get('done', 0)) + 1  # type: ignore
                     done = progress['done']  # type: ignore
                     target = progress['target']  # type: ignore
-                offer_id = extract_id(link)
-                left = max(0, target - done)
-                print(f"[{done}/{target}] [{offer_id}] (zostało: {left})")
+                profile_tick()
+                log.debug("[%d/%d] [%s]", done, target, extract_id(link),
+                          extra=kv(offer_id=extract_id(link), stage="progress", done=done, target=target))
 
     print(f"🚀 Rozpoczynam równoległe scrapowanie ({CONCURRENCY} ogłoszeń naraz)...")
-    print(f"📋 Łącznie do przetworzenia na tej stronie: {total_links}")
+    print(f"📋 Łącznie do przetworzenia w tej paczce: {total_links}")
 
     tasks = [asyncio.create_task(sem_worker(link, i)) for i, link in enumerate(links)]
     batch = await asyncio.gather(*tasks)
@@ -912,168 +580,196 @@ async def scrape_all(context, links, seen_titles: Set[str], progress: Dict[str,
     return results, blocked, len(results)  # dodatkowo licznik faktycznie zebranych
 
 
-async def main():
-    all_results: List[dict] = []
+def flush_before_exit(sink):
+    pending = sink.pending
+    sink.flush()
+    if pending:
+        print(f"💾 Zapisano {pending} rekordów przed przerwaniem")
+        print(f"📊 Łącznie zebrano: {sink.written} ofert")
+    else:
+        print("ℹ️ Brak nowych danych do zapisania")
+
+
+async def main(incremental: bool = False, sinks: str = OUTPUT_SINKS, metrics_port: Optional[int] = None,
+               log_level: str = LOG_LEVEL, save_html: Optional[str] = None):
+    """
+    Nowe oferty z listingu trafiają do kolejki priorytetowej (interest.py) – pobieramy najpierw
+    najciekawsze, listing czytamy tylko do zapasu LOOKAHEAD × brakujących.
+    incremental=True: listing sortowany od najnowszych, kończymy go na pierwszej stronie,
+    której wszystkie ID są już w watermarku (koszt ∝ liczbie nowych ofert).
+    sinks: formaty wyjścia (common/sinks.py); wiersze nie są trzymane w RAM – sink flushuje co SAVE_EVERY.
+    metrics_port: jeśli podany – /metrics w formacie Prometheusa na czas runu.
+    log_level: poziom terminala (INFO = linia na ofertę, DEBUG = szczegóły); plik JSONL zawsze pełny.
+    save_html: katalog na surowy HTML ofert (python reextract.py KATALOG – ekstrakcja bez ponownego crawla).
+    """
+    global SAVE_HTML_DIR
+    setup_logging("scraper", log_level, LOG_DIR)
+    if save_html:
+        SAVE_HTML_DIR = save_html
+        Path(save_html).mkdir(parents=True, exist_ok=True)
+        print(f"🗄️ HTML ofert → {save_html}")
+    METRICS.reset("scraper")
+    if metrics_port:
+        METRICS.serve_prometheus(metrics_port)
+        print(f"📈 Metryki: http://127.0.0.1:{metrics_port}/metrics")
     collected = 0   # ⬅️ licznik faktycznie zebranych (res != None)
     current_page = 1
     pages_visited = 0
     total_processed = 0
-    last_saved_at = 0
+    sink = open_sinks(sinks, RESULT_SCHEMA, RESULTS_FILE, batch_size=SAVE_EVERY)
+    print(f"💾 Wyjście: {sink.describe()}")
 
     # globalny progress względem TARGET_OFFERS
     progress = {'done': 0, 'target': TARGET_OFFERS, 'lock': asyncio.Lock(), 'blocked': False}
 
     async with async_playwright() as p:
-        # --- anti-bot: UA + cookies + małe losowe pauzy ---
-        print("[anti-bot] ustawiam UA/viewport i wchodzę na homepage…")
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(
-            user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/127.0.0.0 Safari/537.36"),
-            viewport={"width": 1440, "height": 900},
-            locale="pl-PL",
-            extra_http_headers={"Accept-Language": "pl-PL,pl;q=0.9,en-US;q=0.8,en;q=0.7"}
-        )
-        
-        # Blokada ciężkich zasobów - mniej requestów = mniej szans na bana
-        async def _route_filter(route, request):
-            rtype = request.resource_type
-            if rtype in {"image", "media", "font"}:  # stylesheet zostaw
-                await route.abort()
-            else:
-                await route.continue_()
-        await context.route("**/*", _route_filter)
-        page = await context.new_page()
-        await page.goto("https://www.otodom.pl/", wait_until="domcontentloaded")
-        await accept_cookies(page)
-        await asyncio.sleep(random.uniform(0.5, 1.2))
-        print("połączenie ze stroną: check")
-
-        # --- lista znanych tytułów (persist) ---
-        seen_titles = load_seen_titles(TITLES_FILE)
-        print(f"🧠 Załadowano {len(seen_titles)} znanych tytułów z {TITLES_FILE}")
-        
-        # --- lista blacklist (persist) ---
-        blacklist = load_blacklist(BLACKLIST_FILE)
-        print(f"🚫 Załadowano {len(blacklist)} tytułów z blacklist z {BLACKLIST_FILE}")
+        browser, context, page = await open_browser_context(p)
+
+        # --- znane tytuły + blacklist (SQLite + Bloom; stare .txt migrowane przy pierwszym starcie) ---
+        store = SeenStore(SEEN_DB, SEEN_TTL_DAYS, TITLES_FILE, BLACKLIST_FILE)
+        store.start()
+        counts = store.counts()
+        print(f"🧠 Znane tytuły: {counts.get('seen', 0)}, blacklist: {counts.get('blacklist', 0)} "
+              f"({SEEN_DB}, TTL {SEEN_TTL_DAYS} dni)")
+
+        # --- watermark (tylko w trybie przyrostowym) ---
+        listing_base = LISTING_NEWEST if incremental else LISTING_BASE
+        watermark: Dict[str, int] = {}
+        if incremental:
+            watermark = load_watermark(WATERMARK_FILE, RESULTS_FILE)
+            print(f"🔖 Tryb przyrostowy: {len(watermark)} ID w watermarku z {WATERMARK_FILE}")
+        run_ts = int(time.time())
+
+        # kolejka priorytetowa nowych ofert (interest.py) + RAM-owa „rezerwacja" tytułów na cały run
+        frontier = OfferQueue()
+        reserved_titles: Set[str] = set()
+        listed_ids: Set[str] = set()   # ID z listingu w tym runie – wykrywa powtórkę ostatniej strony
+        listings_over = False
+        rank = 0   # pozycja wpisu w listingu tego runu (świeżość)
 
         try:
-            # --- przechodź przez strony aż zbierzesz X ofert ---
+            # --- dociągaj listing do zapasu, pobieraj najciekawsze, aż zbierzesz X ofert ---
             while collected < TARGET_OFFERS:
-                listing_url = f"{LISTING_BASE}&page={current_page}"
-                print(f"\n📄 Przechodzę na stronę {current_page}...")
+                missing = TARGET_OFFERS - collected
+                if not listings_over and len(frontier) < missing * LOOKAHEAD:
+                    listing_url = f"{listing_base}&page={current_page}"
+                    print(f"\n📄 Przechodzę na stronę {current_page}...")
+
+                    # 1) Zbierz wpisy (URL + tytuł + sygnały karty) prosto z listingu
+                    with METRICS.timer("scrape_listing_seconds"):
+                        entries = await open_listing_page(page, listing_url)
+
+                    if not entries:
+                        print("❌ Listing zwrócił 0 ogłoszeń – koniec wyników.")
+                        listings_over = True
+                        continue
 
-                await page.goto(listing_url, wait_until="networkidle", timeout=30000)
-                await _detect_cloudflare_block(page)  # ⬅️ detekcja blokady listingu
-                await page.wait_for_selector('[data-cy="search.listing.organic"]', timeout=30000)
+                    # po udanym wczytaniu listingu i zebraniu entries:
+                    pages_visited += 1
+                    current_page += 1
 
-                # 1) Zbierz wpisy (URL + tytuł) prosto z listingu
-                entries = await collect_listing_entries_fast(page)
-                
-                # ⬇⬇⬇ DODAJ:
-                if not entries:
-                    print("❌ Listing zwrócił 0 ogłoszeń – koniec wyników.")
-                    break
-                
-                # po udanym wczytaniu listingu i zebraniu entries:
-                pages_visited += 1
-                
-                # 2) Użyj już załadowanych tytułów + RAM-owa „rezerwacja" na ten przebieg
-                reserved_titles: Set[str] = set()
-
-                # 3) Odetnij duplikaty po TYTULE (dynamiczne ID nas nie interesuje)
-                new_entries = []
-                for it in entries:
-                    t_norm = _norm_title(it["title"])  # użyj Twojej funkcji normalizującej
-                    if not t_norm:
-                        # Polityka: kompletnie puste tytuły omijamy, żeby nie marnować requestów.
-                        # (jeśli chcesz je jednak łapać, usuń ten 'continue')
+                    # otodom za ostatnią stroną potrafi zwrócić ostatnią jeszcze raz (jak w liveness.py)
+                    page_ids = {extract_id(it["url"]) for it in entries}
+                    if page_ids <= listed_ids:
+                        print(f"🔁 Strona {current_page - 1}: same oferty z poprzednich stron – koniec wyników.")
+                        listings_over = True
                         continue
-                    if t_norm in seen_titles or t_norm in reserved_titles:
-                        continue
-                    new_entries.append(it)
-                    reserved_titles.add(t_norm)  # rezerwacja w tym runie
+                    listed_ids |= page_ids
 
-                print(f"📋 Na stronie {current_page}: {len(entries)} ogłoszeń (NOWE po tytule: {len(new_entries)})")
+                    # tryb przyrostowy: cała strona na/poniżej watermarku → dalej są już tylko starsze
+                    if incremental and all(extract_id(it["url"]) in watermark for it in entries):
+                        print(f"🔖 Strona {current_page - 1}: wszystkie {len(entries)} ofert poniżej watermarku — koniec listingu.")
+                        listings_over = True
+                        continue
 
-                if not new_entries:
-                    # Same duplikaty – od razu przejdź dalej, bez klikania w ogłoszenia
-                    current_page += 1
+                    # 2) Odetnij duplikaty po TYTULE (dynamiczne ID nas nie interesuje), nowe → kolejka
+                    fresh = 0
+                    skipped = []   # pominięte wpisy – ich ID też idą do watermarku (kolejkowane: po przerobieniu)
+                    for it in entries:
+                        rank += 1
+                        t_norm = _norm_title(it["title"])  # użyj Twojej funkcji normalizującej
+                        if not t_norm:
+                            # Polityka: kompletnie puste tytuły omijamy, żeby nie marnować requestów.
+                            # (jeśli chcesz je jednak łapać, usuń ten 'continue')
+                            skipped.append(it["url"])
+                            continue
+                        if t_norm in reserved_titles:
+                            skipped.append(it["url"])
+                            continue
+                        status = store.lookup(t_norm)
+                        if status:
+                            if status == "seen":
+                                store.touch(t_norm)   # wciąż wisi – last_seen w górę, TTL liczy się od teraz
+                            skipped.append(it["url"])
+                            continue
+                        frontier.push(it, rank - 1)
+                        reserved_titles.add(t_norm)  # rezerwacja w tym runie
+                        fresh += 1
+                    # bez tego strona z pustym tytułem nigdy nie byłaby "cała poniżej watermarku"
+                    if incremental:
+                        mark_watermark(watermark, skipped, run_ts)
+
+                    print(f"📋 Na stronie {current_page - 1}: {len(entries)} ogłoszeń "
+                          f"(NOWE po tytule: {fresh}, w kolejce: {len(frontier)})")
                     await asyncio.sleep(random.uniform(0.8, 1.5))
                     continue
 
-                # 4) Dalej pracujesz już na czystej liście linków:
-                links = [it["url"] for it in new_entries]
-
-                # przytnij, jeśli zbliżamy się do TARGET_OFFERS
-                if collected + len(links) > TARGET_OFFERS:
-                    links = links[:TARGET_OFFERS - collected]
+                if not frontier:
+                    print("ℹ️ Kolejka pusta, listing wyczerpany – koniec.")
+                    break
 
-                page_results, blocked, got = await scrape_all(context, links, seen_titles, progress, reserved_titles, blacklist)
-                all_results.extend(page_results)
+                # 3) Najciekawsze z kolejki (paczka ≤ strona listingu, nie więcej niż brakuje do celu)
+                batch = frontier.pop_batch(min(OFFERS_PER_PAGE, missing))
+                links = [it["url"] for it in batch]
+                print(f"🎯 Paczka {len(links)} ofert wg zainteresowania "
+                      f"(wynik {batch[0]['score']:.2f} … {batch[-1]['score']:.2f}, w kolejce zostaje {len(frontier)})")
+
+                page_results, blocked, got = await scrape_all(context, links, store, progress, reserved_titles)
+                sink.write(page_results)
+                # do watermarku tylko linki faktycznie przerobione (przy banie część mogła nie wejść)
+                if incremental and not blocked:
+                    mark_watermark(watermark, links, run_ts)
                 collected += got
                 total_processed += len(links)
 
-                print(f"✅ Strona {current_page}: {len(page_results)}/{len(links)} ogłoszeń z adresami")
+                print(f"✅ Paczka: {len(page_results)}/{len(links)} ogłoszeń z adresami")
                 print(f"📊 Łącznie zebrano: {collected}/{TARGET_OFFERS} ofert")
 
-                # zapis co 50 rekordów
-                if len(all_results) // SAVE_EVERY > last_saved_at // SAVE_EVERY:
-                    batch = all_results[last_saved_at:]
-                    print(f"📝 Zapis batchu: {len(batch)} rekordów (od {last_saved_at} do {len(all_results)-1})")
-                    save_partial(batch)
-                    last_saved_at = len(all_results)
+                print(f"📝 Zapisane: {sink.written} rekordów (w buforze: {sink.pending})")
 
                 if blocked:
                     print("🛑 Wykryto blokadę Cloudflare — zapisuję dane i kończę.")
-                    batch = all_results[last_saved_at:]
-                    if batch:
-                        save_partial(batch)
-                        print(f"💾 Zapisano {len(batch)} rekordów przed przerwaniem")
-                        print(f"📊 Łącznie zebrano: {len(all_results)} ofert")
-                    else:
-                        print("ℹ️ Brak nowych danych do zapisania")
-                    last_saved_at = len(all_results)
+                    flush_before_exit(sink)
                     break
 
                 if collected >= TARGET_OFFERS:
                     print(f"🎯 Osiągnięto cel: {collected}/{TARGET_OFFERS} ofert")
                     break
 
-                current_page += 1
                 await asyncio.sleep(random.uniform(1.0, 2.0))
 
         except (CloudfrontBlocked, CloudflareBlocked) as e:
             print(f"🛑 Wykryto blokadę Cloudflare (poza pętlą): {e} — zapisuję dane i kończę.")
-            batch = all_results[last_saved_at:]
-            if batch:
-                save_partial(batch)
-                print(f"💾 Zapisano {len(batch)} rekordów przed przerwaniem")
-                print(f"📊 Łącznie zebrano: {len(all_results)} ofert")
-            else:
-                print("ℹ️ Brak nowych danych do zapisania")
-            last_saved_at = len(all_results)
+            flush_before_exit(sink)
         except Exception as e:
             print(f"⚠️ Nieoczekiwany błąd: {e} — zapisuję częściowe wyniki.")
-            batch = all_results[last_saved_at:]
-            if batch:
-                save_partial(batch)
-                print(f"💾 Zapisano {len(batch)} rekordów przed przerwaniem")
-                print(f"📊 Łącznie zebrano: {len(all_results)} ofert")
-            else:
-                print("ℹ️ Brak nowych danych do zapisania")
-            last_saved_at = len(all_results)
+            flush_before_exit(sink)
 
         print(f"\n🎉 Zakończono scrapowanie!")
         print(f"📊 Przetworzono {total_processed} ogłoszeń z {pages_visited} stron")
         print(f"✅ Znaleziono adresy dla {collected} ogłoszeń")
 
-        # finalny zapis (na wszelki wypadek)
-        if all_results and last_saved_at < len(all_results):
-            batch = all_results[last_saved_at:]
-            save_partial(batch)
-            last_saved_at = len(all_results)
+        # finalny zapis (reszta bufora) + zamknięcie plików
+        sink.close()
+        print(f"💾 Zapisano łącznie {sink.written} rekordów → {sink.describe()}")
+        await store.aclose()   # reszta bufora tytułów + filtr Bloom na dysk
+        print(f"⏱️ Etapy scrape_offer (metryki → {METRICS.export_jsonl(METRICS_DIR)}):")
+        for line in METRICS.summary("scrape_stage_seconds"):
+            print(f"   • {line}")
+
+        if incremental:
+            save_watermark(WATERMARK_FILE, watermark)
+            print(f"🔖 Zapisano watermark ({min(len(watermark), WATERMARK_KEEP)} ID) do {WATERMARK_FILE}")
 
         await browser.close()
 
@@ -1099,13 +795,13 @@ if __name__ == "__main__":
     # Testy dla metrażu
     print("\n🧪 Self-test ekstraktora metrażu:")
     area_tests = [
-        ("Mieszkanie, 41,60 m², Kraków", "41.60"),
-        ("Kawalerka 24m2 - Stare Dębniki", "24.0"),
-        ("2 pokoje 65 m2", "65.0"),
-        ("Powierzchnia: ok.42", "42.0"),
-        ("Pow.: 42,5 mkw", "42.5"),
-        ("42 m 2", "42.0"),
-        ("Mieszkanie 100m² z ogrodem", "100.0"),
+        ("Mieszkanie, 41,60 m², Kraków", 41.60),
+        ("Kawalerka 24m2 - Stare Dębniki", 24.0),
+        ("2 pokoje 65 m2", 65.0),
+        ("Powierzchnia: ok.42", 42.0),
+        ("Pow.: 42,5 mkw", 42.5),
+        ("42 m 2", 42.0),
+        ("Mieszkanie 100m² z ogrodem", 100.0),
         ("Nie ma metrażu", None),
         ("Cena 2000 zł za m2", None),  # nie powinno złapać ceny
     ]
@@ -1122,5 +818,25 @@ if __name__ == "__main__":
     # Przykład użycia blacklist (odkomentuj jeśli chcesz dodać ofertę do blacklist)
     # add_to_blacklist("Przykładowy tytuł oferty", "https://www.otodom.pl/pl/oferta/przyklad-ID123")
     
+    parser = argparse.ArgumentParser(description="Scraper ofert najmu z otodom.pl")
+    parser.add_argument("--incremental", action="store_true",
+                        help="listing od najnowszych, stop na stronie poniżej watermarku")
+    parser.add_argument("--sinks", default=OUTPUT_SINKS,
+                        help=f"formaty wyjścia, po przecinku: {', '.join(SINK_KINDS)}")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="wystaw metryki Prometheusa pod http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--log-level", default=LOG_LEVEL, choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="szczegółowość terminala (DEBUG = wszystkie pola oferty)")
+    parser.add_argument("--save-html", default=None, metavar="DIR",
+                        help="zapisuj HTML każdej oferty do DIR (do ponownej ekstrakcji: reextract.py)")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"profiler + flamegraph + wolne callbacki + tracemalloc → {PROFILE_DIR}")
+    parser.add_argument("--profile-every", type=int, default=SNAPSHOT_EVERY,
+                        help="co ile ofert snapshot tracemalloc")
+    args = parser.parse_args()
+
     print("\n🚀 Uruchamiam scraper...")
-    asyncio.run(main())
+    asyncio.run(run_profiled("scraper", main(incremental=args.incremental, sinks=args.sinks,
+                                             metrics_port=args.metrics_port, log_level=args.log_level,
+                                             save_html=args.save_html),
+                             enabled=args.profile, every=args.profile_every))
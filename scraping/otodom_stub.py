@@ -0,0 +1,220 @@
+# scraping/otodom_stub.py
+# Lokalny zastępnik otodom.pl do testów obciążeniowych scrapera.
+# Serwuje stronę główną, paginowany listing i strony ofert:
+#   - z nagranego HTML (--fixtures DIR: listing/page_<n>.html, offers/<ID>.html), albo
+#   - syntetycznie, z wierszy ../data/otodom_results.csv (te same selektory co otodom).
+# Pokrętła: opóźnienie, odsetek błędów 5xx, odsetek/po-ilu-requestach strony blokady CF.
+import argparse
+import asyncio
+import csv
+import html
+import random
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+LISTING_PATH = "/pl/wyniki/wynajem/mieszkanie/malopolskie/krakow/krakow/krakow"
+OFFERS_PER_PAGE = 72
+
+CLOUDFLARE_PAGE = """<!DOCTYPE html><html><head><title>Just a moment...</title></head>
+<body><div id="cf-challenge" class="cf-browser-verification">Checking your browser before accessing.</div>
+<script src="/cdn-cgi/challenge-platform/h/b/orchestrate/jsch/v1"></script></body></html>"""
+
+CLOUDFRONT_PAGE = """<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN">
+<html><head><title>ERROR: The request could not be satisfied</title></head><body>
+<h1>403 ERROR</h1><h2>The request could not be satisfied.</h2>
+Request blocked. We can't connect to the server for this app or website at this time.
+<hr noshade size="1px">Generated by cloudfront (CloudFront)</body></html>"""
+
+
+@dataclass
+class StubConfig:
+    latency_min: float = 0.05        # s
+    latency_max: float = 0.25        # s
+    error_rate: float = 0.0          # odsetek odpowiedzi 503
+    block_rate: float = 0.0          # odsetek odpowiedzi ze stroną blokady
+    block_after: Optional[int] = None  # po tylu requestach KAŻDA odpowiedź to blokada
+    block_kind: str = "cloudfront"   # cloudfront | cloudflare
+    seed: Optional[int] = None
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    listing: int = 0
+    offers: int = 0
+    errors: int = 0
+    blocks: int = 0
+    by_path: Dict[str, int] = field(default_factory=dict)
+
+
+def _slug(title: str) -> str:
+    s = re.sub(r"[^\w\s-]", "", (title or "oferta").lower())
+    return re.sub(r"[\s_]+", "-", s).strip("-")[:80] or "oferta"
+
+
+def load_synthetic_offers(csv_path: str) -> List[dict]:
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        rows = [r for r in csv.DictReader(f) if r.get("id")]
+    # deduplikacja po ID (CSV bywa dopisywany wielokrotnie)
+    uniq = {}
+    for r in rows:
+        uniq.setdefault(r["id"], r)
+    return list(uniq.values())
+
+
+def render_listing(offers: List[dict], page_no: int) -> str:
+    """Za ostatnią stroną: pusty kontener organic – open_listing_page od razu zwraca [] (koniec wyników)."""
+    chunk = offers[(page_no - 1) * OFFERS_PER_PAGE: page_no * OFFERS_PER_PAGE]
+    cards = "\n".join(
+        f'<li><a data-cy="listing-item-link" href="/pl/oferta/{_slug(o["title"])}-{o["id"]}">'
+        f'<p data-cy="listing-item-title">{html.escape(o["title"] or "")}</p>'
+        f'<span>{html.escape(o.get("najem_pln") or "")} zł</span></a></li>'
+        for o in chunk
+    )
+    return (f"<!DOCTYPE html><html><head><title>Mieszkania na wynajem Kraków</title></head><body>"
+            f'<div data-cy="search.listing.organic"><ul>{cards}</ul></div></body></html>')
+
+
+def render_offer(o: dict) -> str:
+    def amount(v):
+        digits = re.sub(r"[^\d]", "", str(v or "").split(".")[0])
+        return f"{int(digits):,}".replace(",", " ") if digits else ""
+    rent = amount(o.get("najem_pln"))
+    admin = amount(o.get("czynsz_adm_pln"))
+    area = (o.get("metraz_m2") or "").replace(".", ",")
+    street = o.get("ulica") or ""
+    if not re.match(r"^(al\.|pl\.|os\.|rondo|rynek|bulwary)\s", street, flags=re.I):
+        street = f"ul. {street}"
+    street = html.escape(street)
+    title = html.escape(o.get("title") or "")
+    admin_html = (f'<div data-sentry-element="AdditionalPriceWrapper">+ Czynsz {admin} zł</div>'
+                  if admin else "")
+    area_html = (f'<div data-sentry-element="ItemGridContainer"><div>Powierzchnia:</div>'
+                 f'<div>{area} m²</div></div>' if area else "")
+    return f"""<!DOCTYPE html><html><head><title>{title}</title></head><body>
+<ol data-cy="adPageBreadcrumbs"><li>Ogłoszenia</li><li>Kraków</li></ol>
+<h1 data-cy="adPageAdTitle">{title}</h1>
+<div data-sentry-element="PriceSection"><strong data-cy="adPageHeaderPrice">{rent} zł</strong>{admin_html}</div>
+<a data-cy="adPageLinkToMap" href="#map">{street}, Kraków, małopolskie</a>
+<div>{area_html}</div>
+<section data-cy="adPageSectionDescription"><h2>Opis</h2><p>Mieszkanie do wynajęcia, {title}.</p></section>
+</body></html>"""
+
+
+class OtodomStub:
+    def __init__(self, cfg: StubConfig, results_csv: Optional[str] = None, fixtures: Optional[str] = None):
+        self.cfg = cfg
+        self.stats = StubStats()
+        self.rng = random.Random(cfg.seed)
+        self.fixtures = Path(fixtures) if fixtures else None
+        self.offers: List[dict] = load_synthetic_offers(results_csv) if results_csv else []
+        self.by_id = {o["id"]: o for o in self.offers}
+
+    # --- wspólne zachowanie: opóźnienie, błędy, blokady ---
+    async def _gate(self, request: web.Request) -> Optional[web.Response]:
+        st = self.stats
+        st.requests += 1
+        key = request.path.strip("/").split("/")[1] if request.path.startswith("/pl/") else "home"
+        st.by_path[key] = st.by_path.get(key, 0) + 1
+        await asyncio.sleep(self.rng.uniform(self.cfg.latency_min, self.cfg.latency_max))
+        if (self.cfg.block_after is not None and st.requests > self.cfg.block_after) \
+                or self.rng.random() < self.cfg.block_rate:
+            st.blocks += 1
+            body = CLOUDFLARE_PAGE if self.cfg.block_kind == "cloudflare" else CLOUDFRONT_PAGE
+            return web.Response(text=body, status=403, content_type="text/html")
+        if self.rng.random() < self.cfg.error_rate:
+            st.errors += 1
+            return web.Response(text="<html><body>503 Service Unavailable</body></html>",
+                                status=503, content_type="text/html")
+        return None
+
+    def _fixture(self, *parts: str) -> Optional[str]:
+        if not self.fixtures:
+            return None
+        p = self.fixtures.joinpath(*parts)
+        return p.read_text(encoding="utf-8") if p.exists() else None
+
+    async def homepage(self, request: web.Request) -> web.Response:
+        if (resp := await self._gate(request)) is not None:
+            return resp
+        return web.Response(
+            text='<html><body><button data-testid="accept-cookies-button">Akceptuję</button></body></html>',
+            content_type="text/html")
+
+    async def listing(self, request: web.Request) -> web.Response:
+        if (resp := await self._gate(request)) is not None:
+            return resp
+        self.stats.listing += 1
+        page_no = max(1, int(request.query.get("page", "1") or 1))
+        body = self._fixture("listing", f"page_{page_no}.html")
+        if body is None:
+            body = render_listing(self.offers, page_no)
+        return web.Response(text=body, content_type="text/html")
+
+    async def offer(self, request: web.Request) -> web.Response:
+        if (resp := await self._gate(request)) is not None:
+            return resp
+        self.stats.offers += 1
+        m = re.search(r"-(ID\w+)$", request.match_info["slug"])
+        oid = m.group(1) if m else request.match_info["slug"]
+        body = self._fixture("offers", f"{oid}.html")
+        if body is None:
+            o = self.by_id.get(oid)
+            if o is None:
+                return web.Response(text="<html><body>Nie znaleziono</body></html>", status=404,
+                                    content_type="text/html")
+            body = render_offer(o)
+        return web.Response(text=body, content_type="text/html")
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/", self.homepage)
+        app.router.add_get(LISTING_PATH, self.listing)
+        app.router.add_get("/pl/oferta/{slug}", self.offer)
+        return app
+
+
+async def start_stub(stub: OtodomStub, host: str = "127.0.0.1", port: int = 0):
+    """Startuje serwer w bieżącej pętli. Zwraca (runner, base_url) – port=0 → losowy wolny."""
+    runner = web.AppRunner(stub.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    real_port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    return runner, f"http://{host}:{real_port}"
+
+
+def add_stub_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--results-csv", default="../data/otodom_results.csv",
+                        help="źródło syntetycznych ofert")
+    parser.add_argument("--fixtures", default=None,
+                        help="katalog z nagranym HTML (listing/page_N.html, offers/<ID>.html)")
+    parser.add_argument("--latency", type=float, nargs=2, default=(0.05, 0.25), metavar=("MIN", "MAX"),
+                        help="opóźnienie odpowiedzi w sekundach")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--block-rate", type=float, default=0.0)
+    parser.add_argument("--block-after", type=int, default=None)
+    parser.add_argument("--block-kind", choices=("cloudfront", "cloudflare"), default="cloudfront")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def stub_from_args(args) -> OtodomStub:
+    cfg = StubConfig(latency_min=args.latency[0], latency_max=args.latency[1],
+                     error_rate=args.error_rate, block_rate=args.block_rate,
+                     block_after=args.block_after, block_kind=args.block_kind, seed=args.seed)
+    return OtodomStub(cfg, results_csv=args.results_csv, fixtures=args.fixtures)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokalny zastępnik otodom.pl")
+    add_stub_args(parser)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    stub = stub_from_args(args)
+    print(f"🧪 Stub otodom: {len(stub.offers)} ofert syntetycznych, fixtures={args.fixtures or '—'}")
+    print(f"   listing: http://127.0.0.1:{args.port}{LISTING_PATH}?limit=72&page=1")
+    web.run_app(stub.make_app(), host="127.0.0.1", port=args.port, access_log=None)
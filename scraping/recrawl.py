@@ -0,0 +1,221 @@
+# scraping/recrawl.py
+# Ponowne odwiedzanie ZNANYCH ofert w celu łapania zmian ceny.
+# Kolejka priorytetowa: staleness (od ostatniego pobrania) + zmienność ceny + zainteresowanie (preferencje z interest.py).
+import asyncio
+import csv
+import heapq
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from playwright.async_api import async_playwright
+
+from otodom_scraping import (
+    CONCURRENCY, CloudflareBlocked, CloudfrontBlocked,
+    open_browser_context, scrape_offer,
+)
+from common.logs import setup_logging   # sys.path z korzeniem repo ustawia otodom_scraping
+from interest import preference
+
+RESULTS_FILE = "../data/otodom_results.csv"
+GEO_FILE = "../data/oferty_geo.csv"            # źródło dzielnic (opcjonalne)
+LIVENESS_FILE = "../data/liveness.json"        # zdjęte oferty pomijamy (opcjonalne)
+PRICE_HISTORY_FILE = "../data/price_history.json"
+
+RECRAWL_BUDGET = 40          # ile ofert odświeżamy w jednym przebiegu
+STALENESS_CAP_DAYS = 14      # po tylu dniach staleness przestaje rosnąć
+
+# wagi składowych priorytetu (każda składowa znormalizowana do 0..1)
+W_STALENESS = 1.0
+W_VOLATILITY = 0.7
+W_INTEREST = 0.5
+
+
+def _int_or_none(v) -> Optional[int]:
+    try:
+        return int(float(v)) if v not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def load_history(path: str) -> Dict[str, dict]:
+    """{id: {"url", "last_fetch": ts|None, "history": [[ts, najem, czynsz_adm], ...]}}"""
+    p = Path(path)
+    if not p.exists():
+        return {}
+    try:
+        with p.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"⚠️ Błąd w pliku historii cen {path}: {e} — zaczynam od zera")
+        return {}
+
+
+def save_history(path: str, history: Dict[str, dict]):
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with p.open("w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+
+
+def seed_history(history: Dict[str, dict], results_csv: str):
+    """Oferty z CSV bez historii dostają punkt startowy (ts=0 = cena z pierwszego scrapu)."""
+    p = Path(results_csv)
+    if not p.exists():
+        return
+    with p.open("r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            oid = row.get("id")
+            if not oid or oid in history:
+                continue
+            history[oid] = {
+                "url": row.get("url"),
+                "last_fetch": None,
+                "history": [[0, _int_or_none(row.get("najem_pln")), _int_or_none(row.get("czynsz_adm_pln"))]],
+            }
+
+
+def load_districts(path: str) -> Dict[str, str]:
+    p = Path(path)
+    if not p.exists():
+        return {}
+    with p.open("r", encoding="utf-8", newline="") as f:
+        return {row["id"]: row.get("dzielnica") or "" for row in csv.DictReader(f) if row.get("id")}
+
+
+def load_delisted(path: str) -> Set[str]:
+    p = Path(path)
+    if not p.exists():
+        return set()
+    try:
+        with p.open("r", encoding="utf-8") as f:
+            offers = json.load(f).get("offers", {})
+        return {oid for oid, e in offers.items() if e.get("status") == "delisted"}
+    except (json.JSONDecodeError, ValueError, AttributeError):
+        return set()
+
+
+def volatility(points: List[list]) -> float:
+    """Współczynnik zmienności najmu w historii (0 gdy < 2 pomiarów)."""
+    rents = [p[1] for p in points if p[1]]
+    if len(rents) < 2:
+        return 0.0
+    mean = statistics.fmean(rents)
+    return statistics.pstdev(rents) / mean if mean else 0.0
+
+
+def priority(entry: dict, district: str, now: float) -> float:
+    last = entry.get("last_fetch")
+    age_days = STALENESS_CAP_DAYS if not last else (now - last) / 86400
+    staleness = min(age_days, STALENESS_CAP_DAYS) / STALENESS_CAP_DAYS
+    # 10% CV to już bardzo "ruchliwa" oferta
+    vol = min(volatility(entry.get("history") or []) * 10, 1.0)
+    last_rent = next((p[1] for p in reversed(entry.get("history") or []) if p[1]), None)
+    interest = preference(district, last_rent)   # metrażu historia nie trzyma – neutralnie
+    return W_STALENESS * staleness + W_VOLATILITY * vol + W_INTEREST * interest
+
+
+def pick_batch(history: Dict[str, dict], districts: Dict[str, str], skip: Set[str],
+               budget: int, now: float) -> List[Tuple[float, str]]:
+    """Zwraca `budget` ofert o najwyższym priorytecie jako [(score, id)]."""
+    heap = [(-priority(e, districts.get(oid, ""), now), oid)
+            for oid, e in history.items() if oid not in skip and e.get("url")]
+    heapq.heapify(heap)
+    out = []
+    while heap and len(out) < budget:
+        neg, oid = heapq.heappop(heap)
+        out.append((-neg, oid))
+    return out
+
+
+def record_price(entry: dict, ts: int, rent: Optional[int], admin: Optional[int]) -> Optional[int]:
+    """Dopisuje pomiar (tylko gdy cena się zmieniła). Zwraca poprzedni najem jeśli była zmiana."""
+    entry["last_fetch"] = ts
+    points = entry.setdefault("history", [])
+    prev = points[-1] if points else None
+    if rent is None:
+        return None
+    if prev and prev[1] == rent and prev[2] == admin:
+        return None
+    points.append([ts, rent, admin])
+    return prev[1] if prev else None
+
+
+async def recrawl(context, history: Dict[str, dict], batch: List[Tuple[float, str]]) -> Dict[str, int]:
+    sem = asyncio.Semaphore(CONCURRENCY)
+    stats = {"fetched": 0, "changed": 0, "drops": 0, "failed": 0}
+    blocked = asyncio.Event()
+
+    async def worker(score: float, oid: str):
+        if blocked.is_set():
+            return
+        async with sem:
+            if blocked.is_set():
+                return
+            entry = history[oid]
+            page = await context.new_page()
+            try:
+                # puste zbiory: tytuł JEST już znany – właśnie dlatego tu jesteśmy
+                res = await scrape_offer(page, entry["url"], set(), set())
+            except (CloudflareBlocked, CloudfrontBlocked) as e:
+                print(f"🚨 BAN przy recrawl: {e}")
+                blocked.set()
+                return
+            except Exception as e:
+                print(f"[WARN] Błąd przy {entry['url']}: {e}")
+                stats["failed"] += 1
+                return
+            finally:
+                await page.close()
+
+            ts = int(time.time())
+            stats["fetched"] += 1
+            if not res:
+                entry["last_fetch"] = ts
+                stats["failed"] += 1
+                return
+            old = record_price(entry, ts, res.get("najem_pln"), res.get("czynsz_adm_pln"))
+            if old is not None:
+                stats["changed"] += 1
+                arrow = "📉" if res["najem_pln"] < old else "📈"
+                if res["najem_pln"] < old:
+                    stats["drops"] += 1
+                print(f"{arrow} [{oid}] {old} → {res['najem_pln']} PLN (priorytet {score:.2f})")
+
+    await asyncio.gather(*[worker(score, oid) for score, oid in batch])
+    if blocked.is_set():
+        print("🛑 Przerwano recrawl po wykryciu blokady.")
+    return stats
+
+
+async def main():
+    setup_logging("recrawl")
+    history = load_history(PRICE_HISTORY_FILE)
+    seed_history(history, RESULTS_FILE)
+    districts = load_districts(GEO_FILE)
+    delisted = load_delisted(LIVENESS_FILE)
+
+    batch = pick_batch(history, districts, delisted, RECRAWL_BUDGET, time.time())
+    print(f"🧠 Znanych ofert: {len(history)} (zdjętych: {len(delisted)}) | budżet: {RECRAWL_BUDGET}")
+    if not batch:
+        print("ℹ️ Brak ofert do odświeżenia")
+        return
+    print(f"🎯 Priorytety: {batch[0][0]:.2f} … {batch[-1][0]:.2f}")
+
+    async with async_playwright() as p:
+        browser, context, _ = await open_browser_context(p)
+        try:
+            stats = await recrawl(context, history, batch)
+        finally:
+            save_history(PRICE_HISTORY_FILE, history)
+            await browser.close()
+
+    print(f"\n✅ Odświeżono {stats['fetched']} | zmiany cen: {stats['changed']} "
+          f"(obniżki: {stats['drops']}) | nieudane: {stats['failed']}")
+    print(f"💾 Historia cen → {PRICE_HISTORY_FILE}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,273 @@
+# scraping/reextract.py
+# Ponowna ekstrakcja z ZAPISANEGO HTML ofert (bez przeglądarki i bez ani jednego requestu).
+# Po poprawce w extractors.py:
+#   python reextract.py ../data/html                       # katalog (np. z otodom_scraping.py --save-html)
+#   python reextract.py offers.zip --out ../data/otodom_results.csv --sinks csv,parquet
+# Wejście: katalog z *.html, .zip albo .tar(.gz). Parsowanie (bs4 + regexy) to czyste CPU,
+# więc pliki idą paczkami (CHUNK_SIZE) do ProcessPoolExecutor – skaluje się z liczbą rdzeni.
+# Wynik: ten sam schemat co wyniki scrapera (RESULT_SCHEMA), kolejność jak w wejściu.
+import argparse
+import os
+import re
+import sys
+import tarfile
+import time
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, NavigableString
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:  # opcjonalna zależność – parser z biblioteki standardowej jest ~2x wolniejszy
+    HTML_PARSER = "html.parser"
+
+from otodom_scraping import RESULT_SCHEMA, RESULTS_FILE
+from common.sinks import SINK_KINDS, open_sinks   # sys.path z korzeniem repo ustawia otodom_scraping
+from extractors import (
+    _norm_spaces, _remove_prefix_for_csv, area_from_sources, extract_address_for_geocode, extract_id,
+    prices_from_text,
+)
+
+OUT_FILE = "../data/otodom_results_reextract.csv"   # domyślnie NIE nadpisujemy RESULTS_FILE
+OUTPUT_SINKS = "csv"
+CHUNK_SIZE = 64            # plików na zadanie dla procesu (mniej pickli/IPC niż plik po pliku)
+IN_FLIGHT_PER_WORKER = 2   # ile paczek naraz w kolejce na proces – ogranicza pamięć przy dużych archiwach
+HTML_SUFFIXES = (".html", ".htm")
+OFFER_URL = "https://www.otodom.pl/pl/oferta/{}"
+
+# ten sam zestaw selektorów co w wersji Playwright (otodom_scraping.get_header_location/…)
+LOCATION_SELECTORS = ('a[data-cy="adPageLinkToMap"]', 'a[href*="map"]', '[data-testid="adPageLocation"]',
+                      '[data-cy="adPageBreadcrumbs"] a[href*="map"]')
+DESCRIPTION_SELECTORS = ('[data-cy="adPageSectionDescription"]', '[data-cy="adPageAdDescription"]')
+
+# elementy blokowe – inner_text() przeglądarki łamie na nich linie (ważne dla _lines() w opisie)
+_BLOCK_TAGS = {"address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "figcaption", "figure",
+               "footer", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p",
+               "pre", "section", "table", "tr", "ul"}
+_SKIP_TAGS = {"script", "style", "noscript", "template", "head"}
+_SPACE_RE = re.compile(r"[ \t\r\n\f]+")
+_LINE_RE = re.compile(r" *\n\s*")
+# znacznik pochodzenia zapisywany przez --save-html (format "Mark of the Web" przeglądarek)
+_SAVED_FROM_RE = re.compile(rb"<!--\s*saved from url=\(\d+\)(\S+?)\s*-->")
+
+
+# --- wejście ---
+
+def iter_sources(src: str) -> Iterator[Tuple[str, bytes]]:
+    """(nazwa, surowy HTML) z katalogu / zipa / tara – w stałej kolejności."""
+    p = Path(src)
+    if p.is_dir():
+        for f in sorted(f for f in p.rglob("*") if f.suffix.lower() in HTML_SUFFIXES):
+            yield str(f.relative_to(p)), f.read_bytes()
+    elif zipfile.is_zipfile(p):
+        with zipfile.ZipFile(p) as zf:
+            for name in sorted(n for n in zf.namelist() if n.lower().endswith(HTML_SUFFIXES)):
+                yield name, zf.read(name)
+    elif tarfile.is_tarfile(p):
+        # strumieniowo – .tar.gz nie ma swobodnego dostępu, czytamy po kolei
+        with tarfile.open(p, "r:*") as tf:
+            for m in tf:
+                if m.isfile() and m.name.lower().endswith(HTML_SUFFIXES):
+                    yield m.name, tf.extractfile(m).read()
+    else:
+        raise ValueError(f"Nieobsługiwane wejście (katalog/.zip/.tar): {src}")
+
+
+def chunked(items: Iterator[Tuple[str, bytes]], size: int) -> Iterator[List[Tuple[str, bytes]]]:
+    chunk = []
+    for it in items:
+        chunk.append(it)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- ekstrakcja (w procesie roboczym) ---
+
+def _collect_text(node, out: List[Optional[str]]):
+    """Tekst potomków; None = łamanie linii (blok albo <br>)."""
+    for child in node.children:
+        if isinstance(child, NavigableString):
+            if type(child) is NavigableString:   # bez komentarzy/CDATA/doctype
+                out.append(str(child))
+        elif child.name == "br":
+            out.append(None)
+        elif child.name not in _SKIP_TAGS:
+            block = child.name in _BLOCK_TAGS
+            if block: out.append(None)
+            _collect_text(child, out)
+            if block: out.append(None)
+
+
+def inner_text(el) -> str:
+    """Przybliżenie element.inner_text(): białe znaki ze źródła zwinięte, nowe linie na blokach."""
+    if el is None:
+        return ""
+    out: List[Optional[str]] = []
+    _collect_text(el, out)
+    text = "".join("\n" if s is None else _SPACE_RE.sub(" ", s) for s in out)
+    return _LINE_RE.sub("\n", text).strip()
+
+
+def _header_location(soup) -> Optional[str]:
+    for sel in LOCATION_SELECTORS:
+        t = inner_text(soup.select_one(sel))
+        if t:
+            return t
+    crumbs = [t for t in (inner_text(li) for li in soup.select('[data-cy="adPageBreadcrumbs"] li')) if t]
+    return ", ".join(crumbs) if crumbs else None
+
+
+def _description(soup) -> str:
+    for sel in DESCRIPTION_SELECTORS:
+        t = inner_text(soup.select_one(sel))
+        if t:
+            return t
+    # odpowiednik 'section:has(h2:has-text("Opis"))'
+    for h2 in soup.find_all("h2"):
+        if "opis" in h2.get_text().lower() and h2.find_parent("section") is not None:
+            t = inner_text(h2.find_parent("section"))
+            if t:
+                return t
+    return ""
+
+
+def _table_area(soup) -> Optional[str]:
+    for r in soup.select('[data-sentry-element="ItemGridContainer"]'):
+        cells = r.find_all("div")
+        if len(cells) >= 2 and "powierzch" in _norm_spaces(inner_text(cells[0])).lower():
+            return _norm_spaces(inner_text(cells[1]))
+    return None
+
+
+def _offer_url(raw: bytes, soup, name: str) -> str:
+    m = _SAVED_FROM_RE.search(raw[:2048])
+    if m:
+        return m.group(1).decode("utf-8", "replace")
+    for sel, attr in (('link[rel="canonical"]', "href"), ('meta[property="og:url"]', "content")):
+        el = soup.select_one(sel)
+        if el and el.get(attr):
+            return el[attr]
+    return OFFER_URL.format(Path(name).stem)
+
+
+def extract_offer(name: str, raw: bytes) -> Tuple[Optional[dict], str]:
+    """Zwraca (wiersz | None, wynik) – to samo co _scrape_offer, tylko z HTML zamiast z DOM."""
+    try:
+        markup = raw.decode("utf-8")      # otodom i --save-html to UTF-8; zgadywanie bs4 myli się bez <meta charset>
+    except UnicodeDecodeError:
+        markup = raw
+    soup = BeautifulSoup(markup, HTML_PARSER)
+    title = inner_text(soup.select_one('h1[data-cy="adPageAdTitle"]')) or None
+    if title is None and soup.select_one('[data-cy="adPageHeaderPrice"]') is None:
+        return None, "not_offer"          # blokada CF / strona błędu / listing
+    url = _offer_url(raw, soup, name)
+    header_loc = _header_location(soup)
+    desc = _description(soup)
+    rent_pln, admin_pln, _ = prices_from_text(
+        inner_text(soup.select_one('[data-cy="adPageHeaderPrice"]')),
+        inner_text(soup.select_one('[data-sentry-element="AdditionalPriceWrapper"]')),
+        inner_text(soup.select_one('[data-sentry-element="PriceSection"]')),
+        desc,
+    )
+    metraz_m2, _ = area_from_sources(title, desc, _table_area(soup))
+    adres = extract_address_for_geocode(header_loc, title, desc)
+    if not adres:
+        return None, "no_address"
+    return {
+        "id": extract_id(url),
+        "title": title,
+        "ulica": _remove_prefix_for_csv(adres),
+        "metraz_m2": metraz_m2,
+        "url": url,
+        "najem_pln": rent_pln,
+        "czynsz_adm_pln": admin_pln,
+    }, "ok"
+
+
+def extract_chunk(chunk: List[Tuple[str, bytes]]) -> List[Tuple[str, Optional[dict], str]]:
+    out = []
+    for name, raw in chunk:
+        try:
+            row, outcome = extract_offer(name, raw)
+        except Exception as e:  # jeden zepsuty plik nie może zabić całej paczki
+            row, outcome = None, f"error: {type(e).__name__}: {e}"
+        out.append((name, row, outcome))
+    return out
+
+
+# --- orkiestracja ---
+
+def reextract(src: str, out: str = OUT_FILE, sinks: str = OUTPUT_SINKS, workers: Optional[int] = None,
+              chunk_size: int = CHUNK_SIZE) -> Counter:
+    workers = workers or os.cpu_count() or 1
+    stats: Counter = Counter()
+    seen_ids = set()
+    t0 = time.perf_counter()
+
+    def consume(results):
+        rows = []
+        for name, row, outcome in results:
+            stats["files"] += 1
+            if outcome.startswith("error"):
+                stats["error"] += 1
+                print(f"⚠️ {name}: {outcome}")
+                continue
+            if row is not None and row["id"] in seen_ids:
+                outcome = "duplicate"     # ta sama oferta zapisana kilka razy – zostaje pierwsza
+                row = None
+            stats[outcome] += 1
+            if row is not None:
+                seen_ids.add(row["id"])
+                rows.append(row)
+        sink.write(rows)
+
+    with open_sinks(sinks, RESULT_SCHEMA, out, mode="w") as sink:
+        chunks = chunked(iter_sources(src), chunk_size)
+        if workers == 1:
+            for chunk in chunks:
+                consume(extract_chunk(chunk))
+        else:
+            # okno paczek w locie; wyniki odbieramy w kolejności zgłoszenia → deterministyczny plik
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(extract_chunk, chunk))
+                    if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                        consume(pending.popleft().result())
+                while pending:
+                    consume(pending.popleft().result())
+        described = sink.describe()
+
+    elapsed = time.perf_counter() - t0
+    print(f"✅ Plików: {stats['files']} | ofert: {stats['ok']} | bez adresu: {stats['no_address']} | "
+          f"nie-oferty: {stats['not_offer']} | duplikaty: {stats['duplicate']} | błędy: {stats['error']}")
+    print(f"⏱️ {elapsed:.2f} s ({stats['files'] / elapsed if elapsed else 0:.0f} plików/s, "
+          f"{workers} proc., parser: {HTML_PARSER})")
+    print(f"💾 Zapisano → {described}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ponowna ekstrakcja ofert z zapisanego HTML (bez sieci)")
+    parser.add_argument("src", help="katalog z *.html, archiwum .zip lub .tar(.gz)")
+    parser.add_argument("--out", default=OUT_FILE,
+                        help=f"plik wynikowy (bazowa ścieżka sinków); {RESULTS_FILE} = nadpisz wyniki scrapera")
+    parser.add_argument("--sinks", default=OUTPUT_SINKS,
+                        help=f"formaty wyjścia, po przecinku: {', '.join(SINK_KINDS)}")
+    parser.add_argument("--workers", type=int, default=None, help="liczba procesów (domyślnie: liczba rdzeni)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="plików na zadanie procesu")
+    args = parser.parse_args()
+
+    try:
+        reextract(args.src, args.out, args.sinks, args.workers, args.chunk_size)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,368 @@
+# scraping/seen_store.py
+# Jeden magazyn deduplikacji tytułów zamiast seen_titles.txt + blacklist.txt:
+#   SQLite:  title (po _norm_title) → first_seen, last_seen, url, status ('seen' | 'blacklist')
+#   Bloom:   filtr w RAM (persistowany obok bazy) – „na pewno nie widzieliśmy" bez zaglądania do SQLite
+#   zapisy:  bufor w RAM, flush paczkami (executemany) w wątku – pętla asyncio nie robi I/O per tytuł
+#   TTL:     'seen' starsze niż ttl_days (od last_seen) traktujemy jak nowe – wraca przelistowana oferta;
+#            blacklist nie wygasa
+#   compact: usuwa wygasłe wpisy, VACUUM i przebudowa Bloom (z filtru nie da się usuwać)
+# Start = wczytanie bitów filtra (bez czytania całej historii), sprawdzenie tytułu = kilka hashy
+# + ewentualnie jeden lookup po kluczu głównym – koszt nie rośnie z liczbą tytułów.
+#
+#   python seen_store.py --stats
+#   python seen_store.py --compact
+#   python seen_store.py --blacklist "Tytuł oferty" https://www.otodom.pl/pl/oferta/...-ID123
+import argparse
+import asyncio
+import hashlib
+import math
+import sqlite3
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+SEEN_DB = "../data/seen.sqlite"
+LEGACY_TITLES_FILE = "../data/seen_titles.txt"
+LEGACY_BLACKLIST_FILE = "../data/blacklist.txt"
+TTL_DAYS = 30               # po tylu dniach bez zobaczenia tytuł znów jest „nowy"
+FLUSH_EVERY = 50            # tyle zmian w buforze → flush
+FLUSH_SECONDS = 5.0         # …albo co tyle sekund (zadanie w tle)
+BLOOM_MIN_CAPACITY = 100_000
+BLOOM_FP_RATE = 0.01
+BLOOM_MAGIC = b"SEENBLM1"
+
+STATUS_SEEN = "seen"
+STATUS_BLACKLIST = "blacklist"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS titles (
+    title      TEXT PRIMARY KEY,
+    first_seen INTEGER NOT NULL,
+    last_seen  INTEGER NOT NULL,
+    url        TEXT,
+    status     TEXT NOT NULL DEFAULT 'seen'
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+# first_seen zostaje z pierwszego wpisu; blacklist „wygrywa" z seen; url tylko gdy nowy jest niepusty
+_UPSERT = """
+INSERT INTO titles (title, first_seen, last_seen, url, status) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(title) DO UPDATE SET
+    last_seen = MAX(last_seen, excluded.last_seen),
+    url       = COALESCE(excluded.url, url),
+    status    = CASE WHEN status = 'blacklist' THEN status ELSE excluded.status END
+"""
+
+
+class BloomFilter:
+    """Bity w bytearray, k pozycji z podwójnego hashowania (blake2b → dwa 64-bitowe)."""
+
+    def __init__(self, capacity: int, fp_rate: float = BLOOM_FP_RATE):
+        self.capacity = max(1, capacity)
+        self.m = max(8, int(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.k = max(1, round(self.m / self.capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        h1, h2 = struct.unpack("<QQ", hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest())
+        return ((h1 + i * h2) % self.m for i in range(self.k))
+
+    def add(self, key: str):
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def save(self, path: Path, generation: int):
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(BLOOM_MAGIC + struct.pack("<QQQQQ", self.capacity, self.m, self.k, self.count, generation))
+            f.write(self.bits)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> Tuple[Optional["BloomFilter"], int]:
+        """(filtr, generacja bazy z chwili zapisu) albo (None, -1) gdy pliku brak / jest uszkodzony."""
+        try:
+            with open(path, "rb") as f:
+                head = f.read(len(BLOOM_MAGIC) + 40)
+                if not head.startswith(BLOOM_MAGIC):
+                    return None, -1
+                capacity, m, k, count, generation = struct.unpack("<QQQQQ", head[len(BLOOM_MAGIC):])
+                bits = bytearray(f.read())
+        except (OSError, struct.error):
+            return None, -1
+        if len(bits) != (m + 7) // 8:
+            return None, -1
+        bf = cls.__new__(cls)
+        bf.capacity, bf.m, bf.k, bf.count, bf.bits = capacity, m, k, count, bits
+        return bf, generation
+
+
+class _View:
+    """`tytuł in store.seen` / `tytuł in store.blacklist` – zamiennik dawnych setów."""
+
+    def __init__(self, store: "SeenStore", status: str):
+        self.store, self.status = store, status
+
+    def __contains__(self, title: str) -> bool:
+        return self.store.lookup(title) == self.status
+
+    def __len__(self) -> int:
+        return self.store.counts().get(self.status, 0)
+
+
+class SeenStore:
+    def __init__(self, path: str = SEEN_DB, ttl_days: float = TTL_DAYS,
+                 legacy_titles: Optional[str] = LEGACY_TITLES_FILE,
+                 legacy_blacklist: Optional[str] = LEGACY_BLACKLIST_FILE, readonly: bool = False):
+        """readonly=True – tylko lookup (np. procesy sharded_crawl); zapisy robi jeden właściciel bazy."""
+        self.path = Path(path)
+        self.readonly = readonly
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.bloom_path = self.path.with_suffix(".bloom")
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        # odczyty – w wątku pętli; zapisy (flush) – osobne połączenie w wątku roboczym; WAL pozwala na oba naraz
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self._writer = None if readonly else sqlite3.connect(str(self.path), check_same_thread=False)
+        if self._writer is not None:
+            self._writer.execute("PRAGMA synchronous=NORMAL")
+        self.pending: Dict[str, tuple] = {}     # title → (first_seen, last_seen, url, status)
+        self._inflight: Dict[str, tuple] = {}   # paczka właśnie zapisywana w wątku
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()            # bufor pełny → flush bez czekania na FLUSH_SECONDS
+        self._flusher: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.seen = _View(self, STATUS_SEEN)
+        self.blacklist = _View(self, STATUS_BLACKLIST)
+
+        self.migrated = 0 if readonly else self._migrate_legacy(legacy_titles, legacy_blacklist)
+        self.bloom = self._load_bloom()
+
+    # --- meta / Bloom ---
+    def _meta(self, key: str, default: str = "") -> str:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    @property
+    def generation(self) -> int:
+        """Rośnie z każdym zapisem do bazy – filtr z inną generacją jest nieaktualny."""
+        return int(self._meta("generation", "0"))
+
+    def _load_bloom(self) -> BloomFilter:
+        bloom, gen = BloomFilter.load(self.bloom_path)
+        if bloom is not None and gen == self.generation and bloom.count <= bloom.capacity:
+            return bloom
+        return self._rebuild_bloom()
+
+    def _rebuild_bloom(self) -> BloomFilter:
+        n = self.conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+        bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, 2 * n))
+        for (title,) in self.conn.execute("SELECT title FROM titles"):
+            bloom.add(title)
+        if not self.readonly:
+            bloom.save(self.bloom_path, self.generation)
+        return bloom
+
+    # --- odczyt ---
+    def lookup(self, title: str, now: Optional[float] = None) -> Optional[str]:
+        """Status tytułu ('seen' | 'blacklist') albo None (nowy lub wygasły)."""
+        if not title:
+            return None
+        rec = self.pending.get(title) or self._inflight.get(title)
+        if rec is None:
+            if title not in self.bloom:
+                return None                    # typowy przypadek dla nowych ofert – bez SQLite
+            row = self.conn.execute("SELECT first_seen, last_seen, url, status FROM titles WHERE title = ?",
+                                    (title,)).fetchone()
+            if row is None:
+                return None                    # fałszywy pozytyw filtra
+            rec = row
+        status, last_seen = rec[3], rec[1]
+        if status == STATUS_SEEN and self.ttl and last_seen < (now or time.time()) - self.ttl:
+            return None
+        return status
+
+    def counts(self) -> Dict[str, int]:
+        out = dict(self.conn.execute("SELECT status, COUNT(*) FROM titles GROUP BY status").fetchall())
+        for title, rec in self.pending.items():
+            out[rec[3]] = out.get(rec[3], 0) + 1   # przybliżenie (część może już być w bazie)
+        return out
+
+    # --- zapis (bufor) ---
+    def _put(self, title: str, url: Optional[str], status: str, ts: Optional[float] = None):
+        if not title:
+            return
+        ts = int(ts or time.time())
+        prev = self.pending.get(title)
+        if prev is not None:
+            status = STATUS_BLACKLIST if STATUS_BLACKLIST in (prev[3], status) else status
+            self.pending[title] = (prev[0], max(prev[1], ts), url or prev[2], status)
+        else:
+            self.pending[title] = (ts, ts, url, status)
+            if title not in self.bloom:
+                self.bloom.add(title)
+        if len(self.pending) >= FLUSH_EVERY:
+            self._wake.set()
+
+    def mark_seen(self, title: str, url: Optional[str] = None, ts: Optional[float] = None):
+        """Oferta weszła do wyników (albo widzimy ją znowu) – przesuwa last_seen."""
+        self._put(title, url, STATUS_SEEN, ts)
+
+    def touch(self, title: str, ts: Optional[float] = None):
+        """Tytuł wciąż wisi na listingu – odśwież last_seen, żeby nie wygasł w trakcie."""
+        self._put(title, None, STATUS_SEEN, ts)
+
+    def add_blacklist(self, title: str, url: Optional[str] = None, ts: Optional[float] = None):
+        self._put(title, url, STATUS_BLACKLIST, ts)
+
+    def _write_batch(self, batch: Dict[str, tuple]):
+        rows = [(t, r[0], r[1], r[2], r[3]) for t, r in batch.items()]
+        with self._writer:
+            self._writer.executemany(_UPSERT, rows)
+            self._writer.execute(
+                "INSERT INTO meta (key, value) VALUES ('generation', '1') "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    def flush_sync(self) -> int:
+        if not self.pending:
+            return 0
+        batch, self.pending = self.pending, {}
+        self._write_batch(batch)
+        return len(batch)
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self.pending:
+                return 0
+            self._inflight, self.pending = self.pending, {}
+            try:
+                await asyncio.to_thread(self._write_batch, self._inflight)
+            except Exception:
+                # nie gubimy zmian – wracają do bufora (nowsze wpisy mają pierwszeństwo)
+                self.pending = {**self._inflight, **self.pending}
+                raise
+            finally:
+                n = len(self._inflight)
+                self._inflight = {}
+            return n
+
+    async def _flush_loop(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        """Włącza flush w tle (wołać z działającej pętli)."""
+        if self._flusher is None:
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def aclose(self):
+        if self._flusher is not None:
+            # flaga + wake zamiast cancel(): w 3.11 wait_for potrafi połknąć cancel, gdy wait()
+            # właśnie się skończył – pętla kręciłaby się dalej, a await poniżej wisiał bez końca
+            self._stopping = True
+            self._wake.set()
+            await self._flusher
+            self._flusher = None
+        await self.flush()
+        self.close()
+
+    def close(self):
+        if self.readonly:
+            self.conn.close()
+            return
+        self.flush_sync()
+        if self.bloom.count > self.bloom.capacity:
+            self.bloom = self._rebuild_bloom()      # większy filtr teraz, a nie przy następnym starcie
+        else:
+            self.bloom.save(self.bloom_path, self.generation)
+        self._writer.close()
+        self.conn.close()
+
+    # --- utrzymanie ---
+    def compact(self, now: Optional[float] = None) -> int:
+        """Usuwa wygasłe 'seen', VACUUM, przebudowuje filtr. Zwraca liczbę usuniętych."""
+        self.flush_sync()
+        removed = 0
+        if self.ttl:
+            cutoff = int((now or time.time()) - self.ttl)
+            with self._writer:
+                removed = self._writer.execute("DELETE FROM titles WHERE status = ? AND last_seen < ?",
+                                               (STATUS_SEEN, cutoff)).rowcount
+                self._writer.execute(
+                    "INSERT INTO meta (key, value) VALUES ('generation', '1') "
+                    "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+        self._writer.execute("VACUUM")
+        self.bloom = self._rebuild_bloom()
+        return removed
+
+    def _migrate_legacy(self, titles_file: Optional[str], blacklist_file: Optional[str]) -> int:
+        """Jednorazowy import seen_titles.txt (tytuł/linia) i blacklist.txt (tytuł\\turl/linia)."""
+        if self._meta("migrated"):
+            return 0
+        batch: Dict[str, tuple] = {}
+        for path, status in ((titles_file, STATUS_SEEN), (blacklist_file, STATUS_BLACKLIST)):
+            p = Path(path) if path else None
+            if p is None or not p.exists():
+                continue
+            ts = int(p.stat().st_mtime)   # brak dat per tytuł – przyjmujemy datę pliku
+            with p.open("r", encoding="utf-8") as f:
+                for line in f:
+                    title, _, url = line.rstrip("\n").partition("\t")
+                    title = title.strip()
+                    if title:
+                        prev = batch.get(title)
+                        batch[title] = (ts, ts, url.strip() or (prev[2] if prev else None),
+                                        STATUS_BLACKLIST if prev and prev[3] == STATUS_BLACKLIST else status)
+        if batch:
+            self._write_batch(batch)
+        with self._writer:
+            self._writer.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', ?)",
+                                 (str(int(time.time())),))
+        if batch:
+            print(f"📦 Zmigrowano {len(batch)} tytułów z {titles_file} / {blacklist_file} → {self.path}")
+        return len(batch)
+
+
+if __name__ == "__main__":
+    from extractors import _norm_title
+
+    parser = argparse.ArgumentParser(description="Magazyn deduplikacji tytułów (seen/blacklist)")
+    parser.add_argument("--db", default=SEEN_DB)
+    parser.add_argument("--ttl-days", type=float, default=TTL_DAYS)
+    parser.add_argument("--stats", action="store_true", help="liczby wpisów i rozmiar filtra")
+    parser.add_argument("--compact", action="store_true", help="usuń wygasłe wpisy + VACUUM + nowy filtr")
+    parser.add_argument("--blacklist", nargs=2, metavar=("TYTUŁ", "URL"), help="dodaj ofertę do blacklisty")
+    args = parser.parse_args()
+
+    store = SeenStore(args.db, args.ttl_days)
+    try:
+        if args.blacklist:
+            title_norm = _norm_title(args.blacklist[0])
+            if not title_norm:
+                print("❌ Nie można znormalizować tytułu")
+            else:
+                store.add_blacklist(title_norm, args.blacklist[1])
+                print(f"🚫 Dodano do blacklist: '{title_norm}'")
+        if args.compact:
+            removed = store.compact()
+            print(f"🧹 Usunięto {removed} wygasłych tytułów (TTL {args.ttl_days:g} dni)")
+        if args.stats or not (args.blacklist or args.compact):
+            store.flush_sync()
+            c = store.counts()
+            print(f"🧠 {store.path}: seen={c.get(STATUS_SEEN, 0)} blacklist={c.get(STATUS_BLACKLIST, 0)} | "
+                  f"Bloom: {store.bloom.m / 8 / 1024:.0f} KiB, k={store.bloom.k}, pojemność={store.bloom.capacity}")
+    finally:
+        store.close()
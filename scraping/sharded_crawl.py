@@ -0,0 +1,312 @@
+# scraping/sharded_crawl.py
+# Crawl rozłożony na N procesów – każdy z własnym Chromium, pętlą asyncio i rdzeniem CPU:
+#   koordynator (ten proces)  – rozdaje strony listingu, zbiera wyniki, jedyny zapis (sinki + SeenStore),
+#   worker i (proces spawn)   – własna kolejka zadań (listing → oferty trafiają do SIEBIE – lokalność),
+#                               pusta kolejka → kradnie z kolejek innych (work stealing),
+#   deduplikacja               – wspólny słownik rezerwacji (Manager.dict, setdefault jest atomowy)
+#                               po ID i tytule + SeenStore tylko do odczytu (poprzednie runy).
+# Zablokowany lub wolny worker nie wstrzymuje reszty: jego kolejkę przejmują inni, a koordynator
+# przestaje mu dawać nowe strony listingu.
+#   python sharded_crawl.py --workers 4 --target 800
+import argparse
+import asyncio
+import itertools
+import math
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+from collections import Counter
+from typing import Dict, List
+
+from otodom_scraping import (
+    BLACKLIST_FILE, CONCURRENCY, LISTING_BASE, OFFERS_PER_PAGE, OUTPUT_SINKS, RESULT_SCHEMA, RESULTS_FILE,
+    SAVE_EVERY, SEEN_DB, SEEN_TTL_DAYS, TARGET_OFFERS, TITLES_FILE, CloudflareBlocked, CloudfrontBlocked,
+    _norm_title, extract_id,
+)
+from common.logs import LOG_DIR, get_logger, kv, setup_logging   # sys.path z korzeniem repo ustawia otodom_scraping
+from common.sinks import SINK_KINDS, open_sinks
+from seen_store import SeenStore
+
+WORKERS = min(4, os.cpu_count() or 1)
+WORKER_CONCURRENCY = CONCURRENCY     # oferty naraz w JEDNYM workerze
+MAX_PAGES = 60                       # bezpiecznik paginacji
+IDLE_POLL_S = 0.3                    # worker bez pracy (ani do ukradzenia) – co tyle sprawdza ponownie
+LISTING_RETRIES = 2                  # nieudana strona listingu wraca do kolejki (dowolnego workera) tyle razy
+IDLE_TIMEOUT_S = 180                 # koordynator: tyle bez żadnej wiadomości → koniec (np. padnięty proces)
+
+log = get_logger("sharded")
+
+
+# --- worker (osobny proces) ---
+
+class _Worker:
+    def __init__(self, wid: int, queues: List, results, claims, stop):
+        self.wid = wid
+        self.queues = queues
+        self.own = queues[wid]
+        self.results = results
+        self.claims = claims
+        self.stop = stop
+        self.stats: Counter = Counter()
+        self.blocked = False
+        self._seq = itertools.count()
+        self.inflight: Dict[int, tuple] = {}   # zadania wzięte, a jeszcze niezgłoszone koordynatorowi
+
+    def take(self):
+        """Najpierw własna kolejka, potem kradzież z pozostałych (w losowej kolejności)."""
+        try:
+            return self.own.get_nowait()
+        except queue.Empty:
+            pass
+        others = [i for i in range(len(self.queues)) if i != self.wid]
+        random.shuffle(others)
+        for i in others:
+            try:
+                item = self.queues[i].get_nowait()
+            except queue.Empty:
+                continue
+            self.stats["stolen"] += 1
+            return item
+        return None
+
+    def claim(self, oid: str, t_norm: str) -> bool:
+        # token unikalny per rezerwacja – ta sama oferta na dwóch stronach tego samego workera też jest duplikatem;
+        # ten sam tytuł pod innym ID (przeklejone ogłoszenie) również
+        token = f"{self.wid}:{next(self._seq)}"
+        return self.claims.setdefault(f"id:{oid}", token) == token and \
+            self.claims.setdefault(f"t:{t_norm}", token) == token
+
+    async def run(self):
+        from playwright.async_api import async_playwright
+        from otodom_scraping import open_browser_context, open_listing_page, scrape_offer
+
+        store = SeenStore(SEEN_DB, SEEN_TTL_DAYS, readonly=True)
+        async with async_playwright() as p:
+            browser, context, _ = await open_browser_context(p)
+            listing_lock = asyncio.Lock()
+            listing_page = await context.new_page()
+
+            async def handle(item):
+                kind = item[0]
+                if kind == "listing":
+                    page_no = item[1]
+                    async with listing_lock:
+                        try:
+                            entries = await open_listing_page(listing_page, f"{LISTING_BASE}&page={page_no}")
+                        except (CloudflareBlocked, CloudfrontBlocked):
+                            raise
+                        except Exception as e:
+                            log.warning("[w%d] Listing str. %d nieudany: %s", self.wid, page_no, e,
+                                        extra=kv(worker=self.wid, stage="listing", page=page_no))
+                            entries = None
+                    fresh = 0
+                    for it in entries or []:
+                        t_norm = _norm_title(it["title"])
+                        if not t_norm or store.lookup(t_norm) or not self.claim(extract_id(it["url"]), t_norm):
+                            continue
+                        self.own.put(("offer", it["url"]))
+                        fresh += 1
+                    self.stats["listings"] += 1
+                    self.results.put(("listing", self.wid, page_no, None if entries is None else len(entries), fresh))
+                else:
+                    url = item[1]
+                    page = await context.new_page()
+                    try:
+                        res = await scrape_offer(page, url, store.seen, store.blacklist)
+                    except (CloudflareBlocked, CloudfrontBlocked):
+                        self.own.put(item)          # oddaj – przejmie ją inny worker
+                        raise
+                    except Exception as e:
+                        log.warning("[w%d] Błąd przy %s: %s", self.wid, url, e,
+                                    extra=kv(worker=self.wid, offer_id=extract_id(url), stage="offer"))
+                        res = None
+                    finally:
+                        await page.close()
+                    self.stats["offers"] += 1
+                    self.results.put(("offer", self.wid, url, res))
+
+            async def lane():
+                while not self.stop.is_set() and not self.blocked:
+                    item = self.take()
+                    if item is None:
+                        await asyncio.sleep(IDLE_POLL_S)
+                        continue
+                    token = next(self._seq)
+                    self.inflight[token] = item
+                    try:
+                        await handle(item)
+                    except (CloudflareBlocked, CloudfrontBlocked) as e:
+                        log.error("🚨 [w%d] Blokada: %s — worker kończy, kolejkę przejmą inni", self.wid, e,
+                                  extra=kv(worker=self.wid, stage="block_check"))
+                        self.blocked = True
+                        if item[0] == "listing":
+                            self.results.put(("listing", self.wid, item[1], None, 0))
+                    # inny wyjątek (padnięta przeglądarka, anulowanie) → zadanie zostaje w inflight
+                    del self.inflight[token]
+
+            try:
+                await asyncio.gather(*(lane() for _ in range(WORKER_CONCURRENCY)))
+            finally:
+                store.close()
+                await browser.close()
+
+
+def worker_main(wid: int, queues: List, results, claims, stop, log_level: str):
+    setup_logging(f"shard{wid}", log_level, LOG_DIR)
+    w = _Worker(wid, queues, results, claims, stop)
+    status = "ok"
+    try:
+        asyncio.run(w.run())
+    except BaseException as e:
+        status = "crashed"
+        log.error("[w%d] Worker padł: %s", wid, e, exc_info=True, extra=kv(worker=wid, stage="worker"))
+    finally:
+        # niedokończone zadania wracają do kolejki – ukradnie je inny worker, koordynator ich nie gubi
+        for item in w.inflight.values():
+            w.own.put(item)
+        if w.inflight:
+            log.warning("[w%d] Oddaję %d niedokończonych zadań", wid, len(w.inflight),
+                        extra=kv(worker=wid, stage="worker", requeued=len(w.inflight)))
+        results.put(("done", wid, "blocked" if w.blocked else status, dict(w.stats)))
+
+
+# --- koordynator ---
+
+def crawl(workers: int = WORKERS, target: int = TARGET_OFFERS, sinks: str = OUTPUT_SINKS,
+          log_level: str = "INFO") -> Dict[str, object]:
+    setup_logging("sharded", log_level, LOG_DIR)
+    ctx = mp.get_context("spawn")          # Playwright/Chromium nie znoszą fork()
+    manager = ctx.Manager()
+    queues = [ctx.Queue() for _ in range(workers)]
+    results = ctx.Queue()
+    claims = manager.dict()
+    stop = ctx.Event()
+
+    # właściciel bazy tytułów: migracja + zapisy tylko tutaj (workery czytają)
+    store = SeenStore(SEEN_DB, SEEN_TTL_DAYS, TITLES_FILE, BLACKLIST_FILE)
+    sink = open_sinks(sinks, RESULT_SCHEMA, RESULTS_FILE, batch_size=SAVE_EVERY)
+    procs = [ctx.Process(target=worker_main, args=(i, queues, results, claims, stop, log_level),
+                         name=f"shard{i}", daemon=True) for i in range(workers)]
+    for pr in procs:
+        pr.start()
+    print(f"🧩 {workers} workerów × {WORKER_CONCURRENCY} ofert naraz | cel: {target} | wyjście: {sink.describe()}")
+
+    alive = set(range(workers))
+    blocked = set()
+    next_page, listings_open, listings_over = 1, 0, False
+    offers_open, collected = 0, 0
+    per_worker: Dict[int, dict] = {}
+    listing_tries: Counter = Counter()
+    rr = 0
+    t0 = time.perf_counter()
+
+    def issue_listing():
+        nonlocal next_page, listings_open, rr
+        active = sorted(alive - blocked)
+        if not active or listings_over or next_page > MAX_PAGES:
+            return
+        if collected + offers_open >= target:
+            return
+        wid = active[rr % len(active)]
+        rr += 1
+        queues[wid].put(("listing", next_page))
+        next_page += 1
+        listings_open += 1
+
+    # rozbieg: po jednej stronie listingu na workera (sharding stron), dalsze wg postępu
+    pages_needed = math.ceil(target / OFFERS_PER_PAGE)
+    for _ in range(min(workers, pages_needed)):
+        issue_listing()
+
+    last_msg = time.monotonic()
+    try:
+        while alive:
+            try:
+                msg = results.get(timeout=1.0)
+            except queue.Empty:
+                if time.monotonic() - last_msg > IDLE_TIMEOUT_S:
+                    print(f"⚠️ Brak wiadomości od {IDLE_TIMEOUT_S} s – kończę")
+                    break
+                for i in list(alive):
+                    if not procs[i].is_alive():
+                        alive.discard(i)
+                continue
+            last_msg = time.monotonic()
+            kind, wid = msg[0], msg[1]
+            if kind == "listing":
+                _, _, page_no, n_entries, fresh = msg
+                listings_open -= 1
+                offers_open += fresh
+                if n_entries == 0:
+                    listings_over = True          # koniec wyników – dalsze strony też będą puste
+                elif n_entries is None:
+                    listing_tries[page_no] += 1
+                    if listing_tries[page_no] <= LISTING_RETRIES:
+                        queues[wid].put(("listing", page_no))   # z kolejki zablokowanego ukradnie ją inny
+                        listings_open += 1
+                else:
+                    print(f"📄 [w{wid}] str. {page_no}: {n_entries} ofert, nowe: {fresh} | "
+                          f"zebrane {collected}/{target}, w kolejkach {offers_open}")
+                issue_listing()
+            elif kind == "offer":
+                _, _, url, row = msg
+                offers_open -= 1
+                if row:
+                    sink.write([row])
+                    collected += 1
+                    if row.get("title"):
+                        store.mark_seen(_norm_title(row["title"]), url)
+                if collected + offers_open < target and listings_open == 0:
+                    issue_listing()
+            elif kind == "done":
+                _, _, status, stats = msg
+                alive.discard(wid)
+                per_worker[wid] = {"status": status, **stats}
+                if status == "blocked":
+                    blocked.add(wid)
+                    print(f"🛑 Worker {wid} zablokowany – pozostali: {len(alive - blocked)}")
+                elif status == "crashed":
+                    print(f"💥 Worker {wid} padł – jego zadania przejmą pozostali ({len(alive - blocked)})")
+
+            if collected >= target:
+                stop.set()
+            elif not alive - blocked:
+                stop.set()
+            elif listings_open == 0 and offers_open <= 0 and (listings_over or next_page > MAX_PAGES
+                                                                or collected + offers_open >= target):
+                stop.set()                       # nic w kolejkach i nic do wydania
+            if stop.is_set() and not any(procs[i].is_alive() for i in alive):
+                break
+    finally:
+        stop.set()
+        for pr in procs:
+            pr.join(timeout=30)
+            if pr.is_alive():
+                pr.terminate()
+        sink.close()
+        store.flush_sync()
+        store.close()
+        manager.shutdown()
+
+    elapsed = time.perf_counter() - t0
+    print(f"\n🎉 Zebrano {collected} ofert w {elapsed:.0f} s ({collected / elapsed if elapsed else 0:.2f}/s) "
+          f"| stron listingu: {next_page - 1}")
+    for wid in sorted(per_worker):
+        s = per_worker[wid]
+        print(f"   • w{wid}: {s['status']}, listingi {s.get('listings', 0)}, oferty {s.get('offers', 0)}, "
+              f"ukradzione {s.get('stolen', 0)}")
+    print(f"💾 Zapisano {sink.written} rekordów → {sink.describe()}")
+    return {"collected": collected, "seconds": round(elapsed, 2), "workers": per_worker}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl otodom na N procesach z work stealing")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="liczba procesów (każdy z własnym Chromium)")
+    parser.add_argument("--target", type=int, default=TARGET_OFFERS, help="ile ofert zebrać")
+    parser.add_argument("--sinks", default=OUTPUT_SINKS,
+                        help=f"formaty wyjścia, po przecinku: {', '.join(SINK_KINDS)}")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args()
+    crawl(args.workers, args.target, args.sinks, args.log_level)
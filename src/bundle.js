@@ -0,0 +1,27 @@
+// Paczka danych z pipeline'u (processing/data_bundle.py) – wspólne dla mapy, listy bez koordynatów
+// i statystyk. Manifest jest rewalidowany przy każdym wejściu, plik z hashem w nazwie
+// przeglądarka trzyma w cache.
+async function fetchBundle(kind) {
+    const r = await fetch('/data/bundle/manifest.json', { cache: 'no-cache' });
+    if (!r.ok) throw new Error(`manifest: HTTP ${r.status}`);
+    const manifest = await r.json();
+    if (!manifest[kind]) throw new Error(`manifest: brak ${kind}`);
+    const b = await fetch('/data/bundle/' + manifest[kind].file);
+    if (!b.ok) throw new Error(`${manifest[kind].file}: HTTP ${b.status}`);
+    return b.json();
+}
+
+// Kolumnowa paczka → tablica obiektów jak z CSV (dzielnica rozwinięta ze słownika)
+function decodeBundle(bundle) {
+    const cols = bundle.columns;
+    const keys = Object.keys(cols);
+    const districts = bundle.dicts.dzielnica;
+    const rows = new Array(bundle.count);
+    for (let i = 0; i < bundle.count; i++) {
+        const offer = {};
+        keys.forEach(k => { offer[k] = cols[k][i]; });
+        offer.dzielnica = offer.dzielnica >= 0 ? districts[offer.dzielnica] : null;
+        rows[i] = offer;
+    }
+    return rows;
+}
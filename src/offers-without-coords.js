@@ -1,7 +1,40 @@
 console.log("[BUILD]", "offers-without-coords.js loaded at", new Date().toISOString());
 
+// Load data: paczka z pipeline'u (bundle.js), a gdy jej nie ma – CSV
+async function loadData() {
+    try {
+        handleOffers(decodeBundle(await fetchBundle('offers')));
+    } catch (e) {
+        console.warn('Brak paczki danych, ładuję CSV:', e.message);
+        loadCsv();
+    }
+}
+
+function handleOffers(rows) {
+    console.log("rows:", rows.length);
+    rows = rows.filter(offer => offer.status !== 'delisted');
+    
+    // Filter offers without coordinates
+    const offersWithoutCoords = rows.filter(offer => {
+        const lat = parseFloat(offer.lat);
+        const lon = parseFloat(offer.lon);
+        return !Number.isFinite(lat) || !Number.isFinite(lon);
+    });
+    
+    console.log("Offers without coordinates:", offersWithoutCoords.length);
+    
+    // Update total count
+    document.getElementById('total-offers-without-coords').textContent = offersWithoutCoords.length;
+    
+    // Update navbar count with total offers
+    document.getElementById('total-offers').textContent = rows.length;
+    
+    // Display offers
+    displayOffersWithoutCoords(offersWithoutCoords);
+}
+
 // Load data from CSV file
-function loadData() {
+function loadCsv() {
     const csvUrl = '/data/oferty_geo.csv?nocache=' + Date.now();
     console.log("=== Loading CSV file ===", csvUrl);
 
@@ -11,25 +44,7 @@ function loadData() {
         skipEmptyLines: true,
         complete: function(results) {
             console.log("=== Papa.parse results ===");
-            console.log("rows (Papa):", results.data.length);
-            
-            // Filter offers without coordinates
-            const offersWithoutCoords = results.data.filter(offer => {
-                const lat = parseFloat(offer.lat);
-                const lon = parseFloat(offer.lon);
-                return !Number.isFinite(lat) || !Number.isFinite(lon);
-            });
-            
-            console.log("Offers without coordinates:", offersWithoutCoords.length);
-            
-            // Update total count
-            document.getElementById('total-offers-without-coords').textContent = offersWithoutCoords.length;
-            
-            // Update navbar count with total offers
-            document.getElementById('total-offers').textContent = results.data.length;
-            
-            // Display offers
-            displayOffersWithoutCoords(offersWithoutCoords);
+            handleOffers(results.data);
         },
         error: function(error) {
             console.error('=== Error loading CSV ===', error);
@@ -2,10 +2,15 @@ console.log("[BUILD]", "script.js loaded at", new Date().toISOString());
 
 // Global variables
 let map;
-let markers = [];
+let markersLayer;
 let allOffers = [];
 let filteredOffers = [];
 let mapOffers = [];
+let mapClusters = [];
+let apiMode = false;
+let totalOffersCount = 0;
+let currentFilters = {};
+let clusterRequestSeq = 0;
 
 // Initialize the application
 document.addEventListener('DOMContentLoaded', function() {
@@ -19,113 +24,190 @@ function initializeMap() {
     // Kraków center coordinates
     const krakowCenter = [50.0647, 19.9450];
     
-    map = L.map('map').setView(krakowCenter, 12);
+    // preferCanvas: wektorowe markery (circleMarker) rysowane na jednym canvasie
+    map = L.map('map', { preferCanvas: true }).setView(krakowCenter, 12);
     
     // Add OpenStreetMap tiles
     L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
         attribution: '© OpenStreetMap contributors'
     }).addTo(map);
+    
+    markersLayer = L.layerGroup().addTo(map);
+}
+
+// Load data: najpierw API (processing/api_server.py), potem paczka danych, na końcu cały CSV
+async function loadData() {
+    try {
+        const meta = await fetchJson('/api/districts');
+        apiMode = true;
+        totalOffersCount = meta.total_offers;
+        populateDistrictFilter(meta.districts.map(d => d.name));
+        updateTotalOffers();
+        // klastry liczy serwer dla widocznego obszaru i zoomu – odświeżamy po każdym ruchu mapy
+        map.on('moveend', onMapMoved);
+        await refreshClusters();
+    } catch (e) {
+        console.warn('API niedostępne, ładuję paczkę danych:', e.message);
+        apiMode = false;
+        loadBundle();
+    }
 }
 
-// Load data from CSV file
-function loadData() {
+async function fetchJson(url) {
+    const r = await fetch(url, { cache: 'no-store' });
+    if (!r.ok) throw new Error(`${url}: HTTP ${r.status}`);
+    return r.json();
+}
+
+function normalizeOffer(offer) {
+    offer.najem_pln = offer.najem_pln || 0;
+    offer.czynsz_adm_pln = offer.czynsz_adm_pln || 0;
+    offer.metraz_m2 = offer.metraz_m2 || null;
+    return offer;
+}
+
+// Leaflet nie czeka na promise z handlera moveend – błąd łapiemy tutaj; API przestało odpowiadać
+// → mapa przechodzi na paczkę danych (jak przy starcie bez serwera)
+function onMapMoved() {
+    refreshClusters().catch(e => {
+        if (!apiMode) return;
+        console.warn('API niedostępne przy odświeżaniu mapy, ładuję paczkę danych:', e.message);
+        map.off('moveend', onMapMoved);
+        apiMode = false;
+        mapClusters = [];
+        loadBundle();
+    });
+}
+
+// Klastry + pojedyncze oferty dla bieżącego widoku i filtrów
+async function refreshClusters() {
+    const seq = ++clusterRequestSeq;
+    const b = map.getBounds();
+    const params = new URLSearchParams({
+        bbox: [b.getWest(), b.getSouth(), b.getEast(), b.getNorth()].map(v => v.toFixed(5)).join(','),
+        zoom: String(map.getZoom())
+    });
+    Object.entries(currentFilters).forEach(([k, v]) => {
+        if (v !== null && v !== undefined && v !== '') params.set(k, v);
+    });
+    const res = await fetchJson('/api/clusters?' + params.toString());
+    if (seq !== clusterRequestSeq || !apiMode) return;   // nowszy ruch mapy już wysłał zapytanie / mapa już na paczce
+    mapClusters = res.clusters;
+    mapOffers = res.points.map(normalizeOffer);
+    filteredOffers = mapOffers;
+    updateMap();
+}
+
+// Wspólna obróbka wierszy z paczki albo z CSV
+function handleOffers(rows) {
+    console.log("rows:", rows.length);
+    console.log("first row:", rows[0]);
+    console.log("last row:", rows[rows.length-1]);
+    // Oferty zdjęte z otodom (liveness) nie trafiają ani na mapę, ani do licznika
+    rows = rows.filter(offer => offer.status !== 'delisted');
+    // Separate offers with and without coordinates
+    const offersWithCoords = rows.filter(offer => {
+        const lat = parseFloat(offer.lat);
+        const lon = parseFloat(offer.lon);
+        return Number.isFinite(lat) && Number.isFinite(lon);
+    });
+    
+    const offersWithoutCoords = rows.filter(offer => {
+        const lat = parseFloat(offer.lat);
+        const lon = parseFloat(offer.lon);
+        return !Number.isFinite(lat) || !Number.isFinite(lon);
+    });
+    
+    // Convert numeric fields for offers with coordinates
+    offersWithCoords.forEach(offer => {
+        offer.lat = parseFloat(offer.lat);
+        offer.lon = parseFloat(offer.lon);
+        offer.najem_pln = parseFloat(offer.najem_pln) || 0;
+        offer.czynsz_adm_pln = parseFloat(offer.czynsz_adm_pln) || 0;
+        offer.metraz_m2 = parseFloat(offer.metraz_m2) || null;
+    });
+    
+    // Convert numeric fields for offers without coordinates
+    offersWithoutCoords.forEach(offer => {
+        offer.najem_pln = parseFloat(offer.najem_pln) || 0;
+        offer.czynsz_adm_pln = parseFloat(offer.czynsz_adm_pln) || 0;
+        offer.metraz_m2 = parseFloat(offer.metraz_m2) || null;
+    });
+    
+    // Store all offers (with and without coordinates)
+    allOffers = [...offersWithCoords, ...offersWithoutCoords];
+    
+    // For map display, use only offers with coordinates
+    filteredOffers = [...offersWithCoords];
+    
+    // Store offers with coordinates separately for map
+    mapOffers = [...offersWithCoords];
+    
+    // Log statistics
+    console.log(`Loaded ${allOffers.length} total offers`);
+    console.log(`- ${offersWithCoords.length} offers with coordinates (shown on map)`);
+    console.log(`- ${offersWithoutCoords.length} offers without coordinates (not shown on map)`);
+    
+    // Debug: check for null/undefined values
+    const nullLat = offersWithCoords.filter(o => o.lat === null || o.lat === undefined).length;
+    const nullLon = offersWithCoords.filter(o => o.lon === null || o.lon === undefined).length;
+    console.log(`- ${nullLat} offers with null lat`);
+    console.log(`- ${nullLon} offers with null lon`);
+    
+    // (opcjonalny) sanity check – łagodny box
+    const withinBox = offersWithCoords.filter(o =>
+        o.lat >= 49.90 && o.lat <= 50.15 && o.lon >= 19.70 && o.lon <= 20.20
+    );
+    console.log(`- ${withinBox.length} offers within wide Krakow box`);
+    
+    // Debug: check for offers with zero prices
+    const zeroPriceOffers = offersWithCoords.filter(o => 
+        (o.najem_pln || 0) === 0
+    ).length;
+    console.log(`- ${zeroPriceOffers} offers with zero rent price`);
+    
+    // Use all offers with coordinates (no hard filtering)
+    mapOffers = [...offersWithCoords];
+    
+    // Debug: check what's actually being displayed
+    console.log(`=== FINAL STATS ===`);
+    console.log(`- mapOffers.length: ${mapOffers.length}`);
+    console.log(`- allOffers.length: ${allOffers.length}`);
+    console.log(`- filteredOffers.length: ${filteredOffers.length}`);
+    
+    // Check for any offers with invalid data that might be filtered out
+    const invalidOffers = mapOffers.filter(o => 
+        !o.id || !o.title || !o.ulica || !o.url
+    );
+    console.log(`- Invalid offers (missing required fields): ${invalidOffers.length}`);
+    
+    updateMap();
+    populateDistrictFilter();
+    updateTotalOffers();
+}
+
+// Bez serwera API: paczka z pipeline'u (fetchBundle/decodeBundle z bundle.js)
+async function loadBundle() {
+    try {
+        handleOffers(decodeBundle(await fetchBundle('offers')));
+    } catch (e) {
+        console.warn('Brak paczki danych, ładuję CSV:', e.message);
+        loadCsv();
+    }
+}
+
+// Ostatni fallback: cały CSV parsowany w przeglądarce
+function loadCsv() {
     const csvUrl = '/data/oferty_geo.csv?nocache=' + Date.now(); // ⬅ ważne: bezwzględna ścieżka
     console.log("=== Loading CSV file ===", csvUrl);
 
-    // szybka diagnostyka
-    fetch(csvUrl, { cache: 'no-store' })
-        .then(r => (console.log("CSV status:", r.status), r.text()))
-        .then(t => console.log("CSV rows(text split):", t.split('\n').length, "bytes:", t.length))
-        .catch(e => console.error("CSV fetch error:", e));
-
     Papa.parse(csvUrl, {
         download: true,
         header: true,
         skipEmptyLines: true,
         complete: function(results) {
             console.log("=== Papa.parse results ===");
-            console.log("rows (Papa):", results.data.length);
-            console.log("first row:", results.data[0]);
-            console.log("last row:", results.data[results.data.length-1]);
-            // Separate offers with and without coordinates
-            const offersWithCoords = results.data.filter(offer => {
-                const lat = parseFloat(offer.lat);
-                const lon = parseFloat(offer.lon);
-                return Number.isFinite(lat) && Number.isFinite(lon);
-            });
-            
-            const offersWithoutCoords = results.data.filter(offer => {
-                const lat = parseFloat(offer.lat);
-                const lon = parseFloat(offer.lon);
-                return !Number.isFinite(lat) || !Number.isFinite(lon);
-            });
-            
-            // Convert numeric fields for offers with coordinates
-            offersWithCoords.forEach(offer => {
-                offer.lat = parseFloat(offer.lat);
-                offer.lon = parseFloat(offer.lon);
-                offer.najem_pln = parseFloat(offer.najem_pln) || 0;
-                offer.czynsz_adm_pln = parseFloat(offer.czynsz_adm_pln) || 0;
-                offer.metraz_m2 = parseFloat(offer.metraz_m2) || null;
-            });
-            
-            // Convert numeric fields for offers without coordinates
-            offersWithoutCoords.forEach(offer => {
-                offer.najem_pln = parseFloat(offer.najem_pln) || 0;
-                offer.czynsz_adm_pln = parseFloat(offer.czynsz_adm_pln) || 0;
-                offer.metraz_m2 = parseFloat(offer.metraz_m2) || null;
-            });
-            
-            // Store all offers (with and without coordinates)
-            allOffers = [...offersWithCoords, ...offersWithoutCoords];
-            
-            // For map display, use only offers with coordinates
-            filteredOffers = [...offersWithCoords];
-            
-            // Store offers with coordinates separately for map
-            mapOffers = [...offersWithCoords];
-            
-            // Log statistics
-            console.log(`Loaded ${allOffers.length} total offers`);
-            console.log(`- ${offersWithCoords.length} offers with coordinates (shown on map)`);
-            console.log(`- ${offersWithoutCoords.length} offers without coordinates (not shown on map)`);
-            
-            // Debug: check for null/undefined values
-            const nullLat = offersWithCoords.filter(o => o.lat === null || o.lat === undefined).length;
-            const nullLon = offersWithCoords.filter(o => o.lon === null || o.lon === undefined).length;
-            console.log(`- ${nullLat} offers with null lat`);
-            console.log(`- ${nullLon} offers with null lon`);
-            
-            // (opcjonalny) sanity check – łagodny box
-            const withinBox = offersWithCoords.filter(o =>
-                o.lat >= 49.90 && o.lat <= 50.15 && o.lon >= 19.70 && o.lon <= 20.20
-            );
-            console.log(`- ${withinBox.length} offers within wide Krakow box`);
-            
-            // Debug: check for offers with zero prices
-            const zeroPriceOffers = offersWithCoords.filter(o => 
-                (o.najem_pln || 0) === 0
-            ).length;
-            console.log(`- ${zeroPriceOffers} offers with zero rent price`);
-            
-            // Use all offers with coordinates (no hard filtering)
-            mapOffers = [...offersWithCoords];
-            
-            // Debug: check what's actually being displayed
-            console.log(`=== FINAL STATS ===`);
-            console.log(`- mapOffers.length: ${mapOffers.length}`);
-            console.log(`- allOffers.length: ${allOffers.length}`);
-            console.log(`- filteredOffers.length: ${filteredOffers.length}`);
-            
-            // Check for any offers with invalid data that might be filtered out
-            const invalidOffers = mapOffers.filter(o => 
-                !o.id || !o.title || !o.ulica || !o.url
-            );
-            console.log(`- Invalid offers (missing required fields): ${invalidOffers.length}`);
-            
-            updateMap();
-            populateDistrictFilter();
-            updateTotalOffers();
+            handleOffers(results.data);
         },
         error: function(error) {
             console.error('=== Error loading CSV ===');
@@ -177,54 +259,65 @@ function setupEventListeners() {
 
 // Update map with current offers
 function updateMap() {
-    // Clear existing markers
-    markers.forEach(marker => map.removeLayer(marker));
-    markers = [];
+    // Clear existing markers (jedna warstwa – clearLayers zamiast zdejmowania po jednym)
+    markersLayer.clearLayers();
     
     console.log(`=== UPDATE MAP ===`);
     console.log(`- mapOffers.length: ${mapOffers.length}`);
     
-    // Add new markers from mapOffers (offers with valid coordinates)
-    const prices = mapOffers.map(offer => offer.najem_pln + (offer.czynsz_adm_pln || 0)).filter(price => price > 0);
-    
-    // Debug price ranges
-    if (prices.length > 0) {
-        const realisticPrices = prices.filter(p => p <= 5000);
-        const expensivePrices = prices.filter(p => p > 5000);
-        console.log('Realistic prices (≤5k):', realisticPrices.length, 'offers, range:', 
-                   realisticPrices.length > 0 ? `${Math.min(...realisticPrices)}-${Math.max(...realisticPrices)} PLN` : 'none');
-        console.log('Expensive prices (>5k):', expensivePrices.length, 'offers');
-    }
+    // Skala kolorów liczona RAZ na przerysowanie; potem kolor = wyszukiwanie binarne
+    const prices = mapOffers.map(offer => offer.najem_pln + (offer.czynsz_adm_pln || 0))
+        .concat(mapClusters.map(c => c.median_price))
+        .filter(price => price > 0);
+    const priceColor = buildPriceScale(prices);
     
-    let markersAdded = 0;
+    // Markery na canvasie (preferCanvas) – bez elementu DOM na ofertę; popup budowany dopiero przy otwarciu
     mapOffers.forEach(offer => {
         const totalCost = offer.najem_pln + (offer.czynsz_adm_pln || 0);
-        const color = getPriceColor(totalCost, prices);
-        
-        // Create custom icon with price-based color
-        const customIcon = L.divIcon({
-            className: 'custom-marker',
-            html: `<div style="background-color: ${color}; width: 20px; height: 20px; border-radius: 50%; border: 2px solid white; box-shadow: 0 2px 4px rgba(0,0,0,0.3);"></div>`,
-            iconSize: [20, 20],
-            iconAnchor: [10, 10]
-        });
-        
-        const marker = L.marker([offer.lat, offer.lon], { icon: customIcon })
-            .addTo(map)
-            .bindPopup(createPopupContent(offer))
+        L.circleMarker([offer.lat, offer.lon], {
+            radius: 9,
+            fillColor: priceColor(totalCost),
+            fillOpacity: 1,
+            color: 'white',
+            weight: 2
+        })
+            .bindPopup(() => createPopupContent(offer))
             .on('mouseover', function() {
                 this.openPopup();
             })
             .on('mouseout', function() {
                 this.closePopup();
             })
-            .on('click', () => showOfferDetails(offer));
-        
-        markers.push(marker);
-        markersAdded++;
+            .on('click', () => showOfferDetails(offer))
+            .addTo(markersLayer);
+    });
+    
+    mapClusters.forEach(cluster => {
+        createClusterMarker(cluster, priceColor(cluster.median_price)).addTo(markersLayer);
     });
     
-    console.log(`- Markers actually added to map: ${markersAdded}`);
+    console.log(`- Markers actually added to map: ${mapOffers.length}, clusters: ${mapClusters.length}`);
+}
+
+// Klaster z serwera: kółko z liczbą ofert, kolor wg mediany kosztu; klik przybliża do jego zasięgu
+function createClusterMarker(cluster, color) {
+    const size = Math.round(28 + 8 * Math.log10(cluster.count));
+    const icon = L.divIcon({
+        className: 'custom-marker',
+        html: `<div style="background-color: ${color}; width: ${size}px; height: ${size}px; line-height: ${size}px; border-radius: 50%; border: 2px solid white; box-shadow: 0 2px 4px rgba(0,0,0,0.3); text-align: center; font-weight: bold; color: #222;">${cluster.count}</div>`,
+        iconSize: [size, size],
+        iconAnchor: [size / 2, size / 2]
+    });
+    return L.marker([cluster.lat, cluster.lon], { icon })
+        .bindTooltip(`${cluster.count} ofert · mediana ${Math.round(cluster.median_price)} PLN/mies.`)
+        .on('click', () => {
+            const [[s, w], [n, e]] = cluster.bounds;
+            if (s === n && w === e) {
+                map.setView([s, w], Math.min(map.getZoom() + 2, map.getMaxZoom()));
+            } else {
+                map.fitBounds(cluster.bounds, { padding: [20, 20] });
+            }
+        });
 }
 
 // Extract area from title
@@ -249,33 +342,36 @@ function extractArea(title) {
     return null;
 }
 
-// Generate color based on price (green = cheap, red = expensive, burgundy = expensive)
-function getPriceColor(price, prices) {
-    if (prices.length === 0) return '#00ff00';
-    
-    // Cap max price at 5000 PLN for gradient (student-friendly)
-    const MAX_GRADIENT_PRICE = 5000;
-    
-    // Sort prices and filter realistic ones
-    const realisticPrices = prices.filter(p => p <= MAX_GRADIENT_PRICE);
-    
-    if (realisticPrices.length === 0) return '#00ff00';
-    
-    // Use min and max from realistic prices
-    const minPrice = Math.min(...realisticPrices);
-    const maxPrice = Math.max(...realisticPrices);
-    
-    // If price is above 5k, return burgundy
-    if (price > MAX_GRADIENT_PRICE) {
-        return '#800020'; // Burgundy for expensive offers
+// Generate color scale based on price (green = cheap, red = expensive, burgundy = above 5k).
+// Progi to kwantyle cen (sortowanie raz, O(n log n)); zwraca funkcję price → kolor w O(log k).
+const MAX_GRADIENT_PRICE = 5000; // student-friendly cap
+const PRICE_QUANTILES = 20;
+
+function buildPriceScale(prices) {
+    const realistic = prices.filter(p => p <= MAX_GRADIENT_PRICE).sort((a, b) => a - b);
+    if (realistic.length === 0) return () => '#00ff00';
+    
+    // breakpoints[i] = i-ty kwantyl; colors[i] = kolor przedziału (breakpoints[i-1], breakpoints[i]]
+    const breakpoints = [];
+    const colors = [];
+    for (let i = 1; i <= PRICE_QUANTILES; i++) {
+        breakpoints.push(realistic[Math.min(realistic.length - 1, Math.ceil(i / PRICE_QUANTILES * realistic.length) - 1)]);
+        colors.push(gradientColor((i - 1) / (PRICE_QUANTILES - 1)));
     }
     
-    // Clamp price to realistic range
-    const clampedPrice = Math.max(minPrice, Math.min(maxPrice, price));
-    
-    // Calculate ratio within realistic range
-    const ratio = (clampedPrice - minPrice) / (maxPrice - minPrice);
-    
+    return function(price) {
+        if (price > MAX_GRADIENT_PRICE) return '#800020'; // Burgundy for expensive offers
+        let lo = 0, hi = breakpoints.length - 1;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (price <= breakpoints[mid]) hi = mid; else lo = mid + 1;
+        }
+        return colors[lo];
+    };
+}
+
+// ratio 0 = najtańsze, 1 = najdroższe
+function gradientColor(ratio) {
     // Invert ratio so that cheap = green, expensive = red
     const invertedRatio = 1 - ratio;
     
@@ -284,17 +380,11 @@ function getPriceColor(price, prices) {
     if (invertedRatio <= 0.6) {
         // Red to Yellow (invertedRatio 0-0.6)
         const localRatio = invertedRatio / 0.6; // 0-1
-        const r = 255;
-        const g = Math.round(255 * localRatio);
-        const b = 0;
-        return `rgb(${r}, ${g}, ${b})`;
+        return `rgb(255, ${Math.round(255 * localRatio)}, 0)`;
     } else if (invertedRatio <= 0.9) {
         // Yellow to Green (invertedRatio 0.6-0.9)
         const localRatio = (invertedRatio - 0.6) / 0.3; // 0-1
-        const r = Math.round(255 * (1 - localRatio));
-        const g = 255;
-        const b = 0;
-        return `rgb(${r}, ${g}, ${b})`;
+        return `rgb(${Math.round(255 * (1 - localRatio))}, 255, 0)`;
     } else {
         // Pure Green (invertedRatio 0.9-1.0)
         return `rgb(0, 255, 0)`;
@@ -371,6 +461,20 @@ function showOfferDetails(offer) {
                 <span class="value price">${totalCost} PLN/month</span>
             </div>
             
+            ${parseFloat(offer.fair_price_pln) ? `
+            <div class="detail-row">
+                <span class="label">Fair Rent (model):</span>
+                <span class="value price">${Math.round(parseFloat(offer.fair_price_pln))} PLN/month (${parseFloat(offer.deal_score) > 0 ? '+' : ''}${parseFloat(offer.deal_score)}%)</span>
+            </div>
+            ` : ''}
+            
+            ${offer.alias_ids ? `
+            <div class="detail-row">
+                <span class="label">Also listed as:</span>
+                <span class="value">${offer.alias_ids.split(';').join(', ')}</span>
+            </div>
+            ` : ''}
+            
             <a href="${offer.url}" target="_blank" class="link">
                 View listing on Otodom →
             </a>
@@ -472,7 +576,21 @@ function closeModal() {
 }
 
 // Apply filters
-function applyFilters() {
+async function applyFilters() {
+    if (apiMode) {
+        currentFilters = {
+            price_min: document.getElementById('min-price').value,
+            price_max: document.getElementById('max-price').value,
+            district: document.getElementById('district-filter').value
+        };
+        try {
+            await refreshClusters();
+        } catch (e) {
+            console.error('API filter error:', e);
+        }
+        return;
+    }
+
     const minPrice = parseFloat(document.getElementById('min-price').value) || 0;
     const maxPrice = parseFloat(document.getElementById('max-price').value) || Infinity;
     const selectedDistrict = document.getElementById('district-filter').value;
@@ -502,6 +620,10 @@ function clearFilters() {
     document.getElementById('max-price').value = '';
     document.getElementById('district-filter').value = '';
     
+    if (apiMode) {
+        applyFilters();
+        return;
+    }
     filteredOffers = [...allOffers];
     mapOffers = filteredOffers.filter(o =>
         o.lat && o.lon && !isNaN(parseFloat(o.lat)) && !isNaN(parseFloat(o.lon))
@@ -513,8 +635,8 @@ function clearFilters() {
 
 
 // Populate district filter
-function populateDistrictFilter() {
-    const districts = [...new Set(allOffers.map(offer => offer.dzielnica).filter(Boolean))].sort();
+function populateDistrictFilter(names) {
+    const districts = names || [...new Set(allOffers.map(offer => offer.dzielnica).filter(Boolean))].sort();
     const select = document.getElementById('district-filter');
     
     districts.forEach(district => {
@@ -528,7 +650,7 @@ function populateDistrictFilter() {
 // Update total offers count
 function updateTotalOffers() {
     // Show total offers (with and without coordinates)
-    document.getElementById('total-offers').textContent = allOffers.length;
+    document.getElementById('total-offers').textContent = apiMode ? totalOffersCount : allOffers.length;
 }
 
 
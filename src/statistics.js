@@ -1,7 +1,7 @@
 console.log("[BUILD]", "statistics.js loaded at", new Date().toISOString());
 
 // Global variables
-let allOffers = [];
+let stats = null; // precomputed aggregates from the pipeline (data/stats.json)
 let chartInstances = {}; // Store chart references to prevent duplication
 
 // Initialize the statistics page
@@ -10,134 +10,79 @@ document.addEventListener('DOMContentLoaded', function() {
     setupNavigation();
 });
 
-// Load data from CSV file
+// Load precomputed statistics: najpierw z paczki (fetchBundle z bundle.js),
+// bez paczki – data/stats.json jak dawniej
+async function fetchStats() {
+    try {
+        return await fetchBundle('stats');
+    } catch (e) {
+        console.warn('Brak paczki danych, ładuję stats.json:', e.message);
+    }
+    const r = await fetch('/data/stats.json', { cache: 'no-cache' });
+    if (!r.ok) throw new Error(`HTTP ${r.status}`);
+    return r.json();
+}
+
 function loadData() {
-    const csvUrl = '/data/oferty_geo.csv?nocache=' + Date.now();
-    console.log("=== Loading CSV file ===", csvUrl);
+    console.log("=== Loading stats ===");
     
-    Papa.parse(csvUrl, {
-        download: true,
-        header: true,
-        complete: function(results) {
-            console.log("=== Papa.parse results ===");
-            console.log("rows (Papa):", results.data.length);
-            
-            // Deduplicate offers by ID
-            const offerMap = new Map();
-            results.data.forEach(offer => {
-                if (offer.id && !offerMap.has(offer.id)) {
-                    offerMap.set(offer.id, offer);
-                }
-            });
-            
-            allOffers = [...offerMap.values()].filter(offer => 
-                offer.lat && offer.lon && 
-                !isNaN(parseFloat(offer.lat)) && 
-                !isNaN(parseFloat(offer.lon))
-            );
-            
-            console.log("Offers with coordinates:", allOffers.length);
-            
-            // Convert numeric fields
-            allOffers.forEach(offer => {
-                offer.lat = parseFloat(offer.lat);
-                offer.lon = parseFloat(offer.lon);
-                offer.najem_pln = parseFloat(offer.najem_pln) || 0;
-                offer.czynsz_adm_pln = parseFloat(offer.czynsz_adm_pln) || 0;
-                offer.metraz_m2 = parseFloat(offer.metraz_m2) || null;
-            });
+    fetchStats()
+        .then(data => {
+            stats = data;
+            console.log("stats.json version:", stats.version, "generated:", stats.generated_at);
+            console.log("Offers with coordinates:", stats.total_offers);
             
             updateTotalOffers();
             updateStatsModal();
-        },
-        error: function(error) {
-            console.error('=== Error loading CSV ===', error);
-            alert('Error loading data. Check if CSV file exists.');
-        }
-    });
+        })
+        .catch(error => {
+            console.error('=== Error loading stats.json ===', error);
+            alert('Error loading data. Run processing/data_bundle.py (or geo_processing.py) to generate data/stats.json.');
+        });
 }
 
 // Update total offers count
 function updateTotalOffers() {
-    document.getElementById('total-offers').textContent = allOffers.length;
+    document.getElementById('total-offers').textContent = stats.total_offers;
 }
 
 // Update statistics in page
 function updateStatsModal() {
-    const rents = allOffers.map(offer => offer.najem_pln).filter(price => price > 0);
-    const areas = allOffers.map(offer => parseFloat(offer.metraz_m2)).filter(area => area > 0);
-    const adminFees = allOffers.map(offer => offer.czynsz_adm_pln).filter(fee => fee > 0);
+    const o = stats.overview;
     
-    if (rents.length > 0) {
+    if (o.avg_rent !== null) {
         // Basic rent statistics
-        const avgRent = Math.round(rents.reduce((a, b) => a + b, 0) / rents.length);
-        const medianRent = calculateMedian(rents);
-        
-        document.getElementById('avg-rent').textContent = avgRent.toLocaleString();
-        document.getElementById('median-rent').textContent = medianRent.toLocaleString();
-        document.getElementById('total-offers').textContent = allOffers.length;
+        document.getElementById('avg-rent').textContent = Math.round(o.avg_rent).toLocaleString();
+        document.getElementById('median-rent').textContent = o.median_rent.toLocaleString();
+        document.getElementById('total-offers').textContent = stats.total_offers;
         
         // Area statistics
-        if (areas.length > 0) {
-            const avgArea = Math.round(areas.reduce((a, b) => a + b, 0) / areas.length);
-            document.getElementById('avg-area').textContent = avgArea;
+        if (o.avg_area !== null) {
+            document.getElementById('avg-area').textContent = Math.round(o.avg_area);
         }
         
         // Price per m² calculations
-        const offersWithArea = allOffers.filter(offer => 
-            offer.najem_pln > 0 && offer.metraz_m2 > 0
-        );
+        if (o.avg_price_per_m2 !== null) {
+            document.getElementById('avg-price-per-m2').textContent = Math.round(o.avg_price_per_m2).toLocaleString();
+            document.getElementById('avg-total-per-m2').textContent = Math.round(o.avg_total_per_m2).toLocaleString();
+        }
         
-        if (offersWithArea.length > 0) {
-            const pricePerM2 = offersWithArea.map(offer => offer.najem_pln / offer.metraz_m2);
-            const totalPerM2 = offersWithArea.map(offer => 
-                (offer.najem_pln + (offer.czynsz_adm_pln || 0)) / offer.metraz_m2
-            );
+        // Admin fee statistics
+        const fees = stats.admin_fees;
+        if (o.admin_fee_share_pct !== null) {
+            document.getElementById('admin-fee-share').textContent = Math.round(o.admin_fee_share_pct) + '%';
             
-            const avgPricePerM2 = Math.round(pricePerM2.reduce((a, b) => a + b, 0) / pricePerM2.length);
-            const avgTotalPerM2 = Math.round(totalPerM2.reduce((a, b) => a + b, 0) / totalPerM2.length);
+            document.getElementById('avg-admin-fee').textContent = Math.round(fees.avg).toLocaleString();
+            document.getElementById('median-admin-fee').textContent = Math.round(fees.median).toLocaleString();
+            document.getElementById('admin-fee-range').textContent = `${fees.min.toLocaleString()} - ${fees.max.toLocaleString()}`;
             
-            document.getElementById('avg-price-per-m2').textContent = avgPricePerM2.toLocaleString();
-            document.getElementById('avg-total-per-m2').textContent = avgTotalPerM2.toLocaleString();
+            if (fees.avg_per_m2 !== null) {
+                document.getElementById('admin-fee-per-m2').textContent = Math.round(fees.avg_per_m2).toLocaleString();
+            }
         }
         
-                 // Admin fee statistics - fixed calculation
-         const offersWithBoth = allOffers.filter(offer => 
-             offer.najem_pln > 0 && offer.czynsz_adm_pln > 0
-         );
-         
-         if (offersWithBoth.length > 0) {
-             const adminSum = offersWithBoth.reduce((sum, offer) => sum + offer.czynsz_adm_pln, 0);
-             const totalSum = offersWithBoth.reduce((sum, offer) => sum + offer.najem_pln + offer.czynsz_adm_pln, 0);
-             const adminFeeShare = Math.round((adminSum / totalSum) * 100);
-             document.getElementById('admin-fee-share').textContent = adminFeeShare + '%';
-             
-             // Update admin fee stats
-             const adminFees = offersWithBoth.map(o => o.czynsz_adm_pln);
-             const avgAdminFee = Math.round(adminFees.reduce((a, b) => a + b, 0) / adminFees.length);
-             const medianAdminFee = Math.round(calculateMedian(adminFees));
-             const minAdminFee = Math.min(...adminFees);
-             const maxAdminFee = Math.max(...adminFees);
-             
-             document.getElementById('avg-admin-fee').textContent = avgAdminFee.toLocaleString();
-             document.getElementById('median-admin-fee').textContent = medianAdminFee.toLocaleString();
-             document.getElementById('admin-fee-range').textContent = `${minAdminFee.toLocaleString()} - ${maxAdminFee.toLocaleString()}`;
-             
-             // Admin fee per m²
-             const offersWithAreaAndFee = offersWithBoth.filter(offer => offer.metraz_m2 > 0);
-             if (offersWithAreaAndFee.length > 0) {
-                 const adminFeePerM2 = offersWithAreaAndFee.map(offer => offer.czynsz_adm_pln / offer.metraz_m2);
-                 const avgAdminFeePerM2 = Math.round(adminFeePerM2.reduce((a, b) => a + b, 0) / adminFeePerM2.length);
-                 document.getElementById('admin-fee-per-m2').textContent = avgAdminFeePerM2.toLocaleString();
-             }
-         }
-        
         // Data quality
-        const completeRecords = allOffers.filter(offer => 
-            offer.najem_pln > 0 && offer.metraz_m2 > 0 && offer.lat && offer.lon
-        ).length;
-        const dataQuality = Math.round((completeRecords / allOffers.length) * 100);
-        document.getElementById('data-quality').textContent = dataQuality + '%';
+        document.getElementById('data-quality').textContent = Math.round(o.data_quality_pct) + '%';
         
         // Update tables and charts
         updateDistrictTable();
@@ -145,26 +90,13 @@ function updateStatsModal() {
     }
 }
 
-// Helper function to calculate median (without rounding)
-function calculateMedian(arr) {
-    const sorted = arr.slice().sort((a, b) => a - b);
-    const middle = Math.floor(sorted.length / 2);
-    if (sorted.length % 2 === 0) {
-        return (sorted[middle - 1] + sorted[middle]) / 2;
-    }
-    return sorted[middle];
-}
-
-// Helper function to calculate percentiles
-function calculatePercentile(arr, percentile) {
-    const sorted = arr.slice().sort((a, b) => a - b);
-    const index = (percentile / 100) * (sorted.length - 1);
-    const lower = Math.floor(index);
-    const upper = Math.ceil(index);
-    const weight = index - lower;
-    
-    if (upper === lower) return sorted[lower];
-    return sorted[lower] * (1 - weight) + sorted[upper] * weight;
+// Helper function to build histogram labels from {min, bin_size, counts}
+function histogramLabels(hist, format) {
+    return hist.counts.map((_, i) => {
+        const start = hist.min + i * hist.bin_size;
+        const end = hist.min + (i + 1) * hist.bin_size;
+        return format(start, end);
+    });
 }
 
 // Helper function to create chart safely (destroy previous instance)
@@ -181,75 +113,22 @@ function createChart(canvasId, config) {
 
 // Update district table
 function updateDistrictTable() {
-    const districtStats = {};
-    
-    allOffers.forEach(offer => {
-        if (!offer.dzielnica) return;
-        
-        if (!districtStats[offer.dzielnica]) {
-            districtStats[offer.dzielnica] = {
-                offers: [],
-                rents: [],
-                areas: [],
-                pricePerM2: [],
-                totalPerM2: [],
-                adminFees: []
-            };
-        }
-        
-        districtStats[offer.dzielnica].offers.push(offer);
-        
-        if (offer.najem_pln > 0) {
-            districtStats[offer.dzielnica].rents.push(offer.najem_pln);
-        }
-        
-        if (offer.metraz_m2 > 0) {
-            districtStats[offer.dzielnica].areas.push(offer.metraz_m2);
-        }
-        
-        if (offer.najem_pln > 0 && offer.metraz_m2 > 0) {
-            districtStats[offer.dzielnica].pricePerM2.push(offer.najem_pln / offer.metraz_m2);
-            const total = offer.najem_pln + (offer.czynsz_adm_pln || 0);
-            districtStats[offer.dzielnica].totalPerM2.push(total / offer.metraz_m2);
-        }
-        
-        if (offer.czynsz_adm_pln > 0) {
-            districtStats[offer.dzielnica].adminFees.push(offer.czynsz_adm_pln);
-        }
-    });
-    
     const tableBody = document.getElementById('district-table-body');
     let tableHTML = '';
     
-    Object.entries(districtStats)
-        .sort(([,a], [,b]) => b.offers.length - a.offers.length)
-        .forEach(([district, stats]) => {
-            const medianRent = stats.rents.length > 0 ? calculateMedian(stats.rents) : 0;
-            const medianArea = stats.areas.length > 0 ? Math.round(calculateMedian(stats.areas)) : 0;
-            const medianPricePerM2 = stats.pricePerM2.length > 0 ? Math.round(calculateMedian(stats.pricePerM2)) : 0;
-            const medianTotalPerM2 = stats.totalPerM2.length > 0 ? Math.round(calculateMedian(stats.totalPerM2)) : 0;
-            
-                         // Calculate admin fee share - fixed calculation
-             let adminFeeShare = 0;
-             const offersWithBoth = stats.offers.filter(o => o.najem_pln > 0 && o.czynsz_adm_pln > 0);
-             if (offersWithBoth.length > 0) {
-                 const adminSum = offersWithBoth.reduce((sum, o) => sum + o.czynsz_adm_pln, 0);
-                 const totalSum = offersWithBoth.reduce((sum, o) => sum + o.najem_pln + o.czynsz_adm_pln, 0);
-                 adminFeeShare = Math.round((adminSum / totalSum) * 100);
-             }
-            
-            tableHTML += `
-                <tr>
-                    <td>${district}</td>
-                    <td>${stats.offers.length}</td>
-                    <td>${medianRent.toLocaleString()}</td>
-                    <td>${medianArea}</td>
-                    <td>${medianPricePerM2.toLocaleString()}</td>
-                    <td>${medianTotalPerM2.toLocaleString()}</td>
-                    <td>${adminFeeShare}%</td>
-                </tr>
-            `;
-        });
+    stats.districts.forEach(d => {
+        tableHTML += `
+            <tr>
+                <td>${d.name}</td>
+                <td>${d.offers}</td>
+                <td>${(d.median_rent || 0).toLocaleString()}</td>
+                <td>${Math.round(d.median_area || 0)}</td>
+                <td>${Math.round(d.median_price_per_m2 || 0).toLocaleString()}</td>
+                <td>${Math.round(d.median_total_per_m2 || 0).toLocaleString()}</td>
+                <td>${Math.round(d.admin_fee_share_pct || 0)}%</td>
+            </tr>
+        `;
+    });
     
     tableBody.innerHTML = tableHTML;
 }
@@ -324,27 +203,12 @@ function updateSectionCharts(section) {
 
 // Price distribution chart
 function updatePriceChart() {
-    const rents = allOffers.map(offer => offer.najem_pln).filter(price => price > 0);
+    const hist = stats.histograms.rent;
     
-    if (rents.length === 0) return;
+    if (!hist) return;
     
-    // Create histogram data with protection against equal values
-    const maxPrice = Math.max(...rents);
-    const minPrice = Math.min(...rents);
-    const binCount = 20;
-    const binSize = (maxPrice - minPrice) / binCount || 1;
-    
-    const bins = new Array(binCount).fill(0);
-    rents.forEach(price => {
-        const binIndex = Math.min(Math.floor((price - minPrice) / binSize), binCount - 1);
-        bins[binIndex]++;
-    });
-    
-    const labels = bins.map((_, i) => {
-        const start = minPrice + i * binSize;
-        const end = minPrice + (i + 1) * binSize;
-        return `${Math.round(start).toLocaleString()} - ${Math.round(end).toLocaleString()}`;
-    });
+    const bins = hist.counts;
+    const labels = histogramLabels(hist, (start, end) => `${Math.round(start).toLocaleString()} - ${Math.round(end).toLocaleString()}`);
     
     createChart('price-chart', {
         type: 'bar',
@@ -388,16 +252,11 @@ function updatePriceChart() {
 
 // Area vs Price scatter chart
 function updateScatterChart() {
-    const offersWithArea = allOffers.filter(offer => 
-        offer.najem_pln > 0 && offer.metraz_m2 > 0
-    );
+    const points = stats.points.area_rent;
     
-    if (offersWithArea.length === 0) return;
+    if (points.length === 0) return;
     
-    const data = offersWithArea.map(offer => ({
-        x: offer.metraz_m2,
-        y: offer.najem_pln
-    }));
+    const data = points.map(([x, y]) => ({ x, y }));
     
     createChart('scatter-chart', {
         type: 'scatter',
@@ -439,35 +298,12 @@ function updateScatterChart() {
 
 // District comparison chart
 function updateDistrictChart() {
-    const districtStats = {};
-    
-    allOffers.forEach(offer => {
-        if (!offer.dzielnica) return;
-        
-        if (!districtStats[offer.dzielnica]) {
-            districtStats[offer.dzielnica] = {
-                offers: [],
-                totalPerM2: []
-            };
-        }
-        
-        districtStats[offer.dzielnica].offers.push(offer);
-        
-        if (offer.najem_pln > 0 && offer.metraz_m2 > 0) {
-            const total = offer.najem_pln + (offer.czynsz_adm_pln || 0);
-            districtStats[offer.dzielnica].totalPerM2.push(total / offer.metraz_m2);
-        }
-    });
-    
-    const districts = Object.entries(districtStats)
-        .filter(([, stats]) => stats.totalPerM2.length > 0)
-        .sort(([,a], [,b]) => calculateMedian(b.totalPerM2) - calculateMedian(a.totalPerM2))
-        .slice(0, 10);
+    const districts = stats.district_total_per_m2_top;
     
     if (districts.length === 0) return;
     
-    const labels = districts.map(([district]) => district);
-    const data = districts.map(([, stats]) => calculateMedian(stats.totalPerM2));
+    const labels = districts.map(d => d.name);
+    const data = districts.map(d => d.median_total_per_m2);
     
     createChart('district-chart', {
         type: 'bar',
@@ -511,27 +347,12 @@ function updateDistrictChart() {
 
 // Admin fee distribution chart
 function updateAdminFeeChart() {
-    const adminFees = allOffers.map(offer => offer.czynsz_adm_pln).filter(fee => fee > 0);
+    const hist = stats.histograms.admin_fee;
     
-    if (adminFees.length === 0) return;
+    if (!hist) return;
     
-    // Create histogram data with protection against equal values
-    const maxFee = Math.max(...adminFees);
-    const minFee = Math.min(...adminFees);
-    const binCount = 15;
-    const binSize = (maxFee - minFee) / binCount || 1;
-    
-    const bins = new Array(binCount).fill(0);
-    adminFees.forEach(fee => {
-        const binIndex = Math.min(Math.floor((fee - minFee) / binSize), binCount - 1);
-        bins[binIndex]++;
-    });
-    
-    const labels = bins.map((_, i) => {
-        const start = minFee + i * binSize;
-        const end = minFee + (i + 1) * binSize;
-        return `${Math.round(start).toLocaleString()} - ${Math.round(end).toLocaleString()}`;
-    });
+    const bins = hist.counts;
+    const labels = histogramLabels(hist, (start, end) => `${Math.round(start).toLocaleString()} - ${Math.round(end).toLocaleString()}`);
     
     createChart('admin-fee-chart', {
         type: 'bar',
@@ -575,27 +396,12 @@ function updateAdminFeeChart() {
 
 // Area distribution chart
 function updateAreaDistributionChart() {
-    const areas = allOffers.map(offer => offer.metraz_m2).filter(area => area > 0);
-    
-    if (areas.length === 0) return;
+    const hist = stats.histograms.area;
     
-    // Create histogram data with protection against equal values
-    const maxArea = Math.max(...areas);
-    const minArea = Math.min(...areas);
-    const binCount = 15;
-    const binSize = (maxArea - minArea) / binCount || 1;
-    
-    const bins = new Array(binCount).fill(0);
-    areas.forEach(area => {
-        const binIndex = Math.min(Math.floor((area - minArea) / binSize), binCount - 1);
-        bins[binIndex]++;
-    });
+    if (!hist) return;
     
-    const labels = bins.map((_, i) => {
-        const start = minArea + i * binSize;
-        const end = minArea + (i + 1) * binSize;
-        return `${Math.round(start)} - ${Math.round(end)} m²`;
-    });
+    const bins = hist.counts;
+    const labels = histogramLabels(hist, (start, end) => `${Math.round(start)} - ${Math.round(end)} m²`);
     
     createChart('area-distribution', {
         type: 'bar',
@@ -639,17 +445,11 @@ function updateAreaDistributionChart() {
 
 // Price boxplot chart
 function updatePriceBoxplot() {
-    const rents = allOffers.map(offer => offer.najem_pln).filter(price => price > 0);
+    const quartiles = stats.rent_quartiles;
     
-    if (rents.length === 0) return;
+    if (!quartiles) return;
     
-    // Calculate quartiles
-    const sorted = rents.slice().sort((a, b) => a - b);
-    const q1 = sorted[Math.floor(sorted.length * 0.25)];
-    const q2 = calculateMedian(rents);
-    const q3 = sorted[Math.floor(sorted.length * 0.75)];
-    const min = Math.min(...rents);
-    const max = Math.max(...rents);
+    const { min, q1, median: q2, q3, max } = quartiles;
     
     createChart('price-boxplot', {
         type: 'bar',
@@ -711,16 +511,14 @@ function updatePriceBoxplot() {
 
 // Geographic scatter chart
 function updateGeoScatterChart() {
-    const offersWithGeo = allOffers.filter(offer => 
-        offer.lat && offer.lon && offer.najem_pln > 0
-    );
+    const points = stats.points.geo;
     
-    if (offersWithGeo.length === 0) return;
+    if (points.length === 0) return;
     
-    const data = offersWithGeo.map(offer => ({
-        x: offer.lon,
-        y: offer.lat,
-        r: Math.min(offer.najem_pln / 100, 20) // Size based on price
+    const data = points.map(([lon, lat, rent]) => ({
+        x: lon,
+        y: lat,
+        r: Math.min(rent / 100, 20) // Size based on price
     }));
     
     createChart('geo-scatter', {
@@ -763,23 +561,12 @@ function updateGeoScatterChart() {
 
 // Distance from center chart
 function updateDistanceChart() {
-    // Kraków center coordinates
-    const krakowCenter = { lat: 50.0647, lon: 19.9450 };
-    
-    const offersWithGeo = allOffers.filter(offer => 
-        offer.lat && offer.lon && offer.najem_pln > 0
-    );
+    const points = stats.points.distance_rent;
     
-    if (offersWithGeo.length === 0) return;
+    if (points.length === 0) return;
     
-    // Calculate distances
-    const distances = offersWithGeo.map(offer => {
-        const distance = calculateDistance(
-            krakowCenter.lat, krakowCenter.lon,
-            offer.lat, offer.lon
-        );
-        return { distance, price: offer.najem_pln };
-    });
+    // Distances from Kraków center are computed in the pipeline
+    const distances = points.map(([distance, price]) => ({ distance, price }));
     
     createChart('distance-chart', {
         type: 'scatter',
@@ -819,28 +606,11 @@ function updateDistanceChart() {
     });
 }
 
-// Helper function to calculate distance between two points
-function calculateDistance(lat1, lon1, lat2, lon2) {
-    const R = 6371; // Earth's radius in km
-    const dLat = (lat2 - lat1) * Math.PI / 180;
-    const dLon = (lon2 - lon1) * Math.PI / 180;
-    const a = Math.sin(dLat/2) * Math.sin(dLat/2) +
-              Math.cos(lat1 * Math.PI / 180) * Math.cos(lat2 * Math.PI / 180) *
-              Math.sin(dLon/2) * Math.sin(dLon/2);
-    const c = 2 * Math.atan2(Math.sqrt(a), Math.sqrt(1-a));
-    return R * c;
-}
-
 // Price segments analysis
 function updatePriceSegments() {
-    const rents = allOffers.map(offer => offer.najem_pln).filter(price => price > 0);
+    const { budget, mid: midRange, premium, luxury } = stats.segments;
     
-    if (rents.length === 0) return;
-    
-    const budget = rents.filter(price => price <= 2000).length;
-    const midRange = rents.filter(price => price > 2000 && price <= 3000).length;
-    const premium = rents.filter(price => price > 3000 && price <= 4000).length;
-    const luxury = rents.filter(price => price > 4000).length;
+    if (budget + midRange + premium + luxury === 0) return;
     
     document.getElementById('budget-count').textContent = budget;
     document.getElementById('mid-count').textContent = midRange;
@@ -848,6 +618,7 @@ function updatePriceSegments() {
     document.getElementById('luxury-count').textContent = luxury;
     
     // Create price segments chart
+    
     createChart('price-segments-chart', {
         type: 'doughnut',
         data: {
@@ -887,28 +658,9 @@ function updatePriceSegments() {
 
 // Best deals table
 function updateDealsTable() {
-    const offersWithCompleteData = allOffers.filter(offer => 
-        offer.najem_pln > 0 && offer.metraz_m2 > 0 && offer.dzielnica
-    );
-    
-    if (offersWithCompleteData.length === 0) return;
-    
-    // Calculate value score (lower price/m² = better value)
-    const offersWithScore = offersWithCompleteData.map(offer => {
-        const totalCost = offer.najem_pln + (offer.czynsz_adm_pln || 0);
-        const pricePerM2 = totalCost / offer.metraz_m2;
-        return {
-            ...offer,
-            totalCost,
-            pricePerM2,
-            valueScore: 1000 / pricePerM2 // Higher score = better value
-        };
-    });
+    const topDeals = stats.deals;
     
-    // Get top 10 deals
-    const topDeals = offersWithScore
-        .sort((a, b) => b.valueScore - a.valueScore)
-        .slice(0, 10);
+    if (topDeals.length === 0) return;
     
     const tableBody = document.getElementById('deals-table-body');
     let tableHTML = '';
@@ -917,10 +669,11 @@ function updateDealsTable() {
         tableHTML += `
             <tr>
                 <td>${deal.dzielnica}</td>
-                <td>${Math.round(deal.pricePerM2).toLocaleString()}</td>
-                <td>${Math.round(deal.totalCost).toLocaleString()}</td>
+                <td>${Math.round(deal.price_per_m2).toLocaleString()}</td>
+                <td>${Math.round(deal.total_cost).toLocaleString()}</td>
                 <td>${deal.metraz_m2}</td>
-                <td>${Math.round(deal.valueScore)}</td>
+                <td>${deal.fair_price_pln ? Math.round(deal.fair_price_pln).toLocaleString() : '–'}</td>
+                <td>${deal.fair_price_pln ? `${deal.value_score > 0 ? '+' : ''}${deal.value_score}%` : Math.round(deal.value_score)}</td>
             </tr>
         `;
     });
@@ -930,12 +683,7 @@ function updateDealsTable() {
 
 // Data quality chart
 function updateDataQualityChart() {
-    const totalOffers = allOffers.length;
-    const withRent = allOffers.filter(o => o.najem_pln > 0).length;
-    const withArea = allOffers.filter(o => o.metraz_m2 > 0).length;
-    const withAdminFee = allOffers.filter(o => o.czynsz_adm_pln > 0).length;
-    const withDistrict = allOffers.filter(o => o.dzielnica).length;
-    const withGeo = allOffers.filter(o => o.lat && o.lon).length;
+    const q = stats.data_quality;
     
     createChart('data-quality-chart', {
         type: 'bar',
@@ -944,11 +692,11 @@ function updateDataQualityChart() {
             datasets: [{
                 label: 'Data Completeness (%)',
                 data: [
-                    Math.round((withRent / totalOffers) * 100),
-                    Math.round((withArea / totalOffers) * 100),
-                    Math.round((withAdminFee / totalOffers) * 100),
-                    Math.round((withDistrict / totalOffers) * 100),
-                    Math.round((withGeo / totalOffers) * 100)
+                    Math.round(q.rent_pct),
+                    Math.round(q.area_pct),
+                    Math.round(q.admin_fee_pct),
+                    Math.round(q.district_pct),
+                    Math.round(q.coords_pct)
                 ],
                 backgroundColor: 'rgba(102, 126, 234, 0.6)',
                 borderColor: 'rgba(102, 126, 234, 1)',
@@ -980,27 +728,13 @@ function updateDataQualityChart() {
 
 // Rings chart (distance from center)
 function updateRingsChart() {
-    const krakowCenter = { lat: 50.0647, lon: 19.9450 };
-    
-    const offersWithGeo = allOffers.filter(offer => 
-        offer.lat && offer.lon && offer.najem_pln > 0
-    );
-    
-    if (offersWithGeo.length === 0) return;
-    
-    // Calculate distances and group into rings
-    const distances = offersWithGeo.map(offer => {
-        const distance = calculateDistance(
-            krakowCenter.lat, krakowCenter.lon,
-            offer.lat, offer.lon
-        );
-        return { distance, price: offer.najem_pln };
-    });
+    const rings = stats.distance_rings;
+    const ring0_1 = rings['0-1'];
+    const ring1_3 = rings['1-3'];
+    const ring3_5 = rings['3-5'];
+    const ring5_plus = rings['5+'];
     
-    const ring0_1 = distances.filter(d => d.distance <= 1).length;
-    const ring1_3 = distances.filter(d => d.distance > 1 && d.distance <= 3).length;
-    const ring3_5 = distances.filter(d => d.distance > 3 && d.distance <= 5).length;
-    const ring5_plus = distances.filter(d => d.distance > 5).length;
+    if (ring0_1 + ring1_3 + ring3_5 + ring5_plus === 0) return;
     
     createChart('rings-chart', {
         type: 'doughnut',
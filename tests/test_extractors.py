@@ -0,0 +1,25 @@
+# tests/test_extractors.py
+# Regresja ekstraktorów tekstowych na korpusie scraping/extract_corpus.json – te same przypadki
+# co extract_bench.py, ale jako osobne testy pytest (jeden przypadek = jeden test).
+#   poetry run pytest tests/
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scraping"))
+from extract_bench import cases, load_corpus
+
+CASES = [(section, fn, expected, label)
+         for section, items in cases(load_corpus()).items()
+         for fn, expected, label in items]
+
+
+@pytest.mark.parametrize("section, fn, expected, label", CASES,
+                         ids=[f"{c[0]}-{i}" for i, c in enumerate(CASES)])
+def test_extract_corpus(section, fn, expected, label):
+    assert fn() == expected, f"{section}: {label!r}"
+
+
+def test_corpus_covers_every_section():
+    assert {section for section, *_ in CASES} == {"address", "area", "prices", "titles", "districts"}